@@ -0,0 +1,176 @@
+"""
+Shared Claude API client for Ad Infinitum scripts.
+Keeps one pooled HTTP session so repeated and concurrent calls reuse connections,
+and sends every request through the shared rate limiter; post_message() hedges
+requests that run past the p95 latency. stream_message() reads
+the response as server-sent events so callers can abandon a generation that can
+no longer pass validation.
+"""
+
+import json
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import Hedger, RateLimiter, request_with_retry
+from response_cache import cached_request, get_cache
+
+# API Configuration (ANTHROPIC_BASE_URL lets the scripts run against a local stand-in server)
+API_BASE = os.environ.get('ANTHROPIC_BASE_URL', 'https://api.anthropic.com').rstrip('/')
+API_URL = f"{API_BASE}/v1/messages"
+BATCHES_URL = f"{API_BASE}/v1/messages/batches"
+API_VERSION = "2023-06-01"
+MODEL = "claude-3-haiku-20240307"
+
+# One limiter per process so every script/thread shares the account budget
+limiter = RateLimiter()
+hedger = Hedger()
+
+_session = None
+_pool_size = 0
+_session_lock = threading.Lock()
+
+def get_session(pool_size=10):
+    """Return the shared HTTP session, growing its connection pool if needed.
+
+    Growing swaps in a larger adapter on the same session rather than replacing
+    it, so threads holding the session keep working; requests already in flight
+    finish on the old adapter's connections, which are dropped with it.
+    """
+    global _session, _pool_size
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        if pool_size > _pool_size:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            # Replacing the values of the existing prefixes (not mount(), which reorders
+            # the dict) is safe while other threads look adapters up
+            _session.adapters['https://'] = adapter
+            _session.adapters['http://'] = adapter
+            _pool_size = pool_size
+        return _session
+
+def build_headers(api_key):
+    """Standard headers for the Messages API"""
+    return {
+        "x-api-key": api_key,
+        "anthropic-version": API_VERSION,
+        "content-type": "application/json"
+    }
+
+def estimate_tokens(data):
+    """Rough token cost of a request (input chars / 4 plus max output)"""
+    return len(json.dumps(data.get('messages', []))) // 4 + data.get('max_tokens', 0)
+
+def valid_message(response):
+    """True unless a 200's body is cut off or lacks the text content every caller reads"""
+    if response.status_code != 200:
+        return True
+    try:
+        return isinstance(response.json()['content'][0]['text'], str)
+    except (ValueError, KeyError, IndexError, TypeError):
+        return False
+
+def post_message(api_key, data, timeout=30, variant=0):
+    """POST a Messages API request on the pooled session and return the raw response.
+
+    Successful responses are served from / stored in the response cache; `variant`
+    distinguishes deliberate re-samples of the same prompt (e.g. retry attempts).
+    Network requests are paced by the shared limiter, retried on 429/5xx and
+    malformed bodies, and hedged when slow.
+    """
+    headers = build_headers(api_key)
+    session = get_session()
+    tokens = estimate_tokens(data)
+    return cached_request(
+        get_cache(), API_URL, data,
+        lambda: request_with_retry(
+            lambda: hedger.send(
+                API_URL, lambda: session.post(API_URL, headers=headers, json=data, timeout=timeout),
+                before_hedge=lambda: limiter.acquire(tokens)),
+            limiter, tokens=tokens, validate=valid_message),
+        variant=variant, validate=valid_message)
+
+def stream_message(api_key, data, check=None, timeout=30, variant=0):
+    """Stream a Messages API request, calling check(text_so_far) as text arrives.
+
+    Returns (text, reason): reason is None if the message completed, else what
+    check() returned when it asked to stop - the connection is closed right away
+    so no more output tokens are generated. Completed messages are cached as
+    regular message bodies, so post_message() and stream_message() share hits.
+    Raises requests.HTTPError for a non-200 response.
+    """
+    cache = get_cache()
+    key = cache.make_key(API_URL, data, variant)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit.json()['content'][0]['text'], None
+
+    headers = build_headers(api_key)
+    session = get_session()
+    response = request_with_retry(
+        lambda: session.post(API_URL, headers=headers, json={**data, "stream": True}, timeout=timeout, stream=True),
+        limiter, tokens=estimate_tokens(data))
+    response.raise_for_status()
+
+    chunks = []
+    message = None
+    try:
+        for line in response.iter_lines():
+            if not line.startswith(b'data:'):
+                continue
+            event = json.loads(line[5:])
+            if event['type'] == 'message_start':
+                message = event['message']
+            elif event['type'] == 'content_block_delta' and event['delta'].get('type') == 'text_delta':
+                chunks.append(event['delta']['text'])
+                if check is not None:
+                    reason = check(''.join(chunks))
+                    if reason:
+                        return ''.join(chunks), reason
+            elif event['type'] == 'message_delta' and message is not None:
+                message.update(event.get('delta', {}))
+            elif event['type'] == 'error':
+                raise RuntimeError(event['error'].get('message', 'stream error'))
+    finally:
+        response.close()
+
+    text = ''.join(chunks)
+    if message is not None:
+        message['content'] = [{"type": "text", "text": text}]
+        cache.put(key, 200, json.dumps(message, ensure_ascii=False))
+    return text, None
+
+def create_batch(api_key, batch_requests, timeout=120):
+    """Submit a Message Batch of {"custom_id", "params"} entries and return the batch object"""
+    headers = build_headers(api_key)
+    session = get_session()
+    response = request_with_retry(
+        lambda: session.post(BATCHES_URL, headers=headers, json={"requests": batch_requests}, timeout=timeout),
+        limiter)
+    response.raise_for_status()
+    return response.json()
+
+def get_batch(api_key, batch_id, timeout=30):
+    """Fetch the current state of a Message Batch"""
+    headers = build_headers(api_key)
+    session = get_session()
+    response = request_with_retry(
+        lambda: session.get(f"{BATCHES_URL}/{batch_id}", headers=headers, timeout=timeout),
+        limiter)
+    response.raise_for_status()
+    return response.json()
+
+def iter_batch_results(api_key, batch, timeout=120):
+    """Yield the parsed JSONL result lines of an ended batch"""
+    headers = build_headers(api_key)
+    session = get_session()
+    results_url = batch.get('results_url') or f"{BATCHES_URL}/{batch['id']}/results"
+    response = request_with_retry(
+        lambda: session.get(results_url, headers=headers, timeout=timeout, stream=True),
+        limiter)
+    response.raise_for_status()
+    for line in response.iter_lines():
+        if line:
+            yield json.loads(line)
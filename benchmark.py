@@ -0,0 +1,232 @@
+"""
+End-to-end throughput benchmark for the Ad Infinitum build stages.
+Starts the local mock server (mock_api_server.py) with the chosen latency and
+fault rates, points the scripts at it and runs the pipeline's process ->
+examples -> passages -> fix stages over a fixed slice of words_raw.json,
+reporting for each stage: words/sec, p50/p95/p99 time per word, retries,
+hedged requests, outcomes and peak Python memory. The response cache and the
+dictionary archive are switched off so every run does the same requests.
+
+    py benchmark.py                                   # first 200 words, default latency and faults
+    py benchmark.py --words 500 --latency 0.3 --rate-429 0.02 --malformed 0.01
+    py benchmark.py --workers examples=16 --save data/benchmark_baseline.json
+    py benchmark.py --workers examples=32 --baseline data/benchmark_baseline.json
+
+Needs api_key.txt like the generators (the mock ignores its content).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from mock_api_server import add_fault_arguments, fake_passage, fault_options, start_in_thread
+
+# Fix Unicode encoding for Windows console
+sys.stdout.reconfigure(encoding='utf-8')
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+raw_path = os.path.join(script_dir, 'data/words_raw.json')
+
+STAGES = ['process', 'examples', 'passages', 'fix']
+
+# The mock has no account limits, so the client-side limiters shouldn't be what's measured
+# (set these yourself to benchmark under real limits)
+UNTHROTTLED = {'ANTHROPIC_RPM': '100000', 'ANTHROPIC_TPM': '100000000', 'DICTIONARY_RPM': '100000'}
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def seed_entries(words, stages):
+    """Starting entries: bare words for a run that includes process, else stand-in definitions"""
+    if 'process' in stages:
+        return [{'word': w} for w in words]
+    return [{'word': w, 'definition': f"To {w} something, in a stand-in sense used for testing.",
+             'partOfSpeech': 'verb', 'level': 1} for w in words]
+
+def repeat_word(entry):
+    """Make the passage use the word twice, so fix has something to fix (the mock's
+    passages never do); words without a passage get the mock's"""
+    from validators import count_word_occurrences
+
+    word = entry['word']
+    passage = entry.get('passage') or fake_passage(word)
+    if count_word_occurrences(word, passage) == 1:
+        passage = f"{passage} Later critics chose to {word} the same question."
+    entry['passage'] = passage
+
+def run_stage(stage, entries, workers, trace_memory, verbose):
+    """Run one pipeline stage over every entry with `workers` threads; returns its measurements"""
+    import api_client
+    import pipeline
+    import process_vocab
+    from rate_limiter import retry_counts
+
+    func = pipeline.STAGE_FUNCTIONS[stage]
+    hedgers = (api_client.hedger, process_vocab.dictionary_hedger)
+
+    def timed(entry):
+        start = time.perf_counter()
+        try:
+            status = func(entry)
+        except Exception:
+            status = 'error'
+        return status, time.perf_counter() - start
+
+    if stage == 'fix':
+        for entry in entries:
+            repeat_word(entry)
+
+    retries_before = dict(retry_counts)
+    hedged_before = sum(h.counts['hedged'] for h in hedgers)
+    if trace_memory:
+        tracemalloc.reset_peak()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+    start = time.perf_counter()
+    with output, ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(timed, entries))
+    elapsed = time.perf_counter() - start
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    # Skipped words cost nothing, so they'd only flatter the latency figures
+    latencies = sorted(seconds for status, seconds in results if status != 'skipped')
+    retries = {str(reason): n - retries_before.get(reason, 0)
+               for reason, n in retry_counts.items() if n > retries_before.get(reason, 0)}
+    return {
+        'words': len(entries),
+        'workers': workers,
+        'seconds': round(elapsed, 3),
+        'words_per_sec': round(len(entries) / elapsed, 2) if elapsed else 0.0,
+        'p50': round(percentile(latencies, 0.50), 4),
+        'p95': round(percentile(latencies, 0.95), 4),
+        'p99': round(percentile(latencies, 0.99), 4),
+        'retries': retries,
+        'hedged': sum(h.counts['hedged'] for h in hedgers) - hedged_before,
+        'statuses': statuses,
+        'peak_mb': round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1) if trace_memory else None,
+    }
+
+def print_report(results, baseline=None, settings=None):
+    print(f"\n{'stage':<9} {'words/s':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'retries':>8} {'hedged':>7} {'peak MB':>8}  outcomes")
+    for stage, r in results.items():
+        peak = f"{r['peak_mb']:.1f}" if r['peak_mb'] is not None else '-'
+        outcomes = ', '.join(f"{status} {n}" for status, n in sorted(r['statuses'].items()))
+        print(f"{stage:<9} {r['words_per_sec']:>8.1f} {r['p50']:>7.3f} {r['p95']:>7.3f} {r['p99']:>7.3f} "
+              f"{sum(r['retries'].values()):>8} {r['hedged']:>7} {peak:>8}  {outcomes}")
+        if r['retries']:
+            print(f"{'':<9} retries: {', '.join(f'{reason} x{n}' for reason, n in sorted(r['retries'].items()))}")
+
+    if not baseline:
+        return
+    print(f"\nAgainst the baseline:")
+    for stage, r in results.items():
+        before = baseline['stages'].get(stage)
+        if not before:
+            continue
+        def change(field):
+            return (r[field] - before[field]) / before[field] * 100 if before[field] else 0.0
+        print(f"  {stage:<9} words/s {before['words_per_sec']:.1f} -> {r['words_per_sec']:.1f} ({change('words_per_sec'):+.0f}%), "
+              f"p95 {before['p95']:.3f} -> {r['p95']:.3f}s ({change('p95'):+.0f}%)")
+    if baseline.get('settings') != settings:
+        print("  (baseline was run with different settings)")
+
+def settings_of(args):
+    """The options that decide what a run measures, for comparing against a baseline"""
+    return {'words': args.words, 'offset': args.offset, 'stages': args.stages, **fault_options(args)}
+
+def parse_workers(values, stages):
+    from pipeline import DEFAULT_WORKERS
+
+    workers = {stage: DEFAULT_WORKERS[stage] for stage in stages}
+    for value in values:
+        stage, _, count = value.partition('=')
+        if stage not in STAGES or not count.isdigit() or int(count) < 1:
+            raise SystemExit(f"Invalid --workers value: {value} (expected stage=N, stage one of {', '.join(STAGES)})")
+        workers[stage] = int(count)
+    return workers
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--words', type=int, default=200, help='words to run through each stage')
+    parser.add_argument('--offset', type=int, default=0, help='first word of the slice in words_raw.json')
+    parser.add_argument('--stages', default=','.join(STAGES), help='comma-separated stages to run, in order')
+    parser.add_argument('--workers', action='append', default=[], metavar='STAGE=N',
+                        help='threads for one stage (repeatable; default: the pipeline defaults)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help="skip peak memory tracking (tracemalloc slows CPU-bound stages)")
+    parser.add_argument('--verbose', action='store_true', help="show the stages' own output")
+    parser.add_argument('--save', help='write the results as JSON (e.g. a baseline)')
+    parser.add_argument('--baseline', help='results saved by an earlier run to compare against')
+    add_fault_arguments(parser, latency=0.1, rate_429=0.01, rate_5xx=0.01, malformed=0.005)
+    parser.set_defaults(seed=1)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    args.stages = [s for s in STAGES if s in {s.strip() for s in args.stages.split(',')}]
+    if not os.path.exists(os.path.join(script_dir, 'api_key.txt')):
+        raise SystemExit("api_key.txt is missing; any content works against the mock server")
+
+    server, base_url = start_in_thread(**fault_options(args))
+    scratch = tempfile.mkdtemp(prefix='ad_benchmark_')
+    os.environ.update({'ANTHROPIC_BASE_URL': base_url, 'DICTIONARY_BASE_URL': base_url, 'AD_CACHE': 'off',
+                       'AD_DICT_ARCHIVE': os.path.join(scratch, 'dictionary_archive.sqlite')})
+    for name, value in UNTHROTTLED.items():
+        os.environ.setdefault(name, value)
+
+    # Imported only now: these read the environment above at import time (and the stage
+    # modules must be loaded before their output is captured)
+    import api_client
+    import fix_passages
+    import generate_examples
+    import generate_passages
+    import pipeline
+    import process_vocab
+    from lemma_groups import lemma_map, normalize_words
+
+    workers = parse_workers(args.workers, args.stages)
+    with open(raw_path, 'r', encoding='utf-8') as f:
+        words = normalize_words(json.load(f))[args.offset:args.offset + args.words]
+    pipeline.LEMMAS.update(lemma_map(words))
+    api_client.get_session(pool_size=max(workers.values()))
+    entries = seed_entries(words, args.stages)
+
+    print(f"Mock server {base_url}: latency {args.latency}s (sigma {args.latency_sigma}), "
+          f"429 {args.rate_429:.1%}, 5xx {args.rate_5xx:.1%}, malformed {args.malformed:.1%}")
+    print(f"{len(entries)} words from {os.path.relpath(raw_path, script_dir)} "
+          f"(offset {args.offset}); stages: {' -> '.join(f'{s}({workers[s]})' for s in args.stages)}")
+
+    if not args.no_memory:
+        tracemalloc.start()
+    results = {}
+    for stage in args.stages:
+        print(f"  {stage}...", flush=True)
+        results[stage] = run_stage(stage, entries, workers[stage], not args.no_memory, args.verbose)
+    server.shutdown()
+    shutil.rmtree(scratch, ignore_errors=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(results, baseline, settings_of(args))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'settings': settings_of(args), 'workers': workers, 'stages': results}, f, indent=1)
+        print(f"\nSaved results to: {args.save}")
+
+if __name__ == "__main__":
+    main()
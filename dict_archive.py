@@ -0,0 +1,205 @@
+"""
+Archive of raw dictionary responses for Ad Infinitum.
+process_vocab keeps only one sense of each dictionary entry; the full JSON
+payload is stored here (zlib-compressed, keyed by word) so extraction logic can
+be changed and re-run over every word without touching the network.
+
+    py dict_archive.py stats
+    py dict_archive.py backfill              # archive dictionary payloads already in the response cache
+    py dict_archive.py rederive              # rebuild partOfSpeech from the archive
+    py dict_archive.py rederive --dry-run --fields definition,tldr
+
+Definitions, examples and TL;DRs that a generator has replaced (per the word
+store) are never overwritten, so rederive can't undo paid-for generation.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+# Fix Unicode encoding for Windows console
+sys.stdout.reconfigure(encoding='utf-8')
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.join(script_dir, 'data/dictionary_archive.sqlite')
+words_path = os.path.join(script_dir, 'data/words_processed.json')
+
+# Fields rederive can rebuild (the ones process_vocab.build_entry derives from the dictionary)
+DERIVED_FIELDS = ('definition', 'partOfSpeech', 'example', 'tldr')
+# Rebuilt by default: only the dictionary ever sets these
+DEFAULT_FIELDS = ('partOfSpeech',)
+
+# Stages that replace a dictionary-derived field with generated text
+GENERATED_BY = {
+    'definition': ('passages', 'enrich'),
+    'tldr': ('passages', 'enrich'),
+    'example': ('examples', 'enrich'),
+}
+
+def archive_key(word):
+    return ' '.join(word.split()).casefold()
+
+class DictionaryArchive:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS payloads (
+                key TEXT PRIMARY KEY,
+                word TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                body BLOB NOT NULL,
+                fetched_at REAL NOT NULL
+            )""")
+        self.conn.commit()
+
+    def get(self, word):
+        """Return (status, body text) for an archived lookup, or None"""
+        with self.lock:
+            row = self.conn.execute("SELECT status, body FROM payloads WHERE key = ?",
+                                    (archive_key(word),)).fetchone()
+        if row is None:
+            return None
+        return row[0], zlib.decompress(row[1]).decode('utf-8')
+
+    def put(self, word, status, body):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO payloads (key, word, status, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (archive_key(word), word, status, zlib.compress(body.encode('utf-8'), 9), time.time()))
+            self.conn.commit()
+
+    def delete(self, word):
+        with self.lock:
+            self.conn.execute("DELETE FROM payloads WHERE key = ?", (archive_key(word),))
+            self.conn.commit()
+
+    def stats(self):
+        with self.lock:
+            count, found, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(status = 200), 0), COALESCE(SUM(LENGTH(body)), 0) FROM payloads").fetchone()
+        return {'entries': count, 'found': found, 'bytes': size}
+
+_archive = None
+_archive_lock = threading.Lock()
+
+def get_archive():
+    """Process-wide archive (AD_DICT_ARCHIVE overrides the path)"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = DictionaryArchive(os.environ.get('AD_DICT_ARCHIVE', DEFAULT_PATH))
+        return _archive
+
+def backfill(archive):
+    """Copy dictionary payloads out of the response cache (found words only: 404 bodies don't name the word)"""
+    from response_cache import get_cache
+
+    cache = get_cache()
+    if cache.conn is None:
+        return 0
+    with cache.lock:
+        rows = cache.conn.execute("SELECT status, body FROM responses WHERE status = 200").fetchall()
+
+    added = 0
+    for status, body in rows:
+        try:
+            data = json.loads(body)
+        except json.JSONDecodeError:
+            continue
+        # Dictionary payloads are lists of entries with word + meanings; Messages API bodies are objects
+        if isinstance(data, list) and data and isinstance(data[0], dict) and 'meanings' in data[0] and data[0].get('word'):
+            if archive.get(data[0]['word']) is None:
+                archive.put(data[0]['word'], status, body)
+                added += 1
+    return added
+
+def generated_keys(store, fields):
+    """{field: keys of words whose field a generator has replaced}"""
+    return {field: store.keys_with_results(GENERATED_BY[field]) for field in fields if field in GENERATED_BY}
+
+def rederive(words, fields, lemmas, generated=None):
+    """Re-run process_vocab's extraction over archived payloads.
+
+    Words with nothing archived are left untouched, as are fields whose derived
+    value is empty and fields listed for the word in `generated` (see
+    generated_keys). Returns (changed words, fields kept because they were generated).
+    """
+    import process_vocab
+    from word_store import normalize_key
+
+    generated = generated or {}
+    changed = kept = 0
+    for word_entry in words:
+        word = word_entry.get('word', '')
+        entry, found = process_vocab.build_entry(word, lemmas.get(word), fetch=False)
+        if not found:
+            continue
+        key = normalize_key(word)
+        updates = {}
+        for field in fields:
+            if not entry[field] or entry[field] == word_entry.get(field):
+                continue
+            if key in generated.get(field, ()):
+                kept += 1
+                continue
+            updates[field] = entry[field]
+        if updates:
+            word_entry.update(updates)
+            changed += 1
+    return changed, kept
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('command', nargs='?', default='stats', choices=['stats', 'backfill', 'rederive'])
+    parser.add_argument('--fields', default=','.join(DEFAULT_FIELDS),
+                        help=f"comma-separated fields to rebuild (any of {', '.join(DERIVED_FIELDS)})")
+    parser.add_argument('--dry-run', action='store_true', help='report changes without writing')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    archive = get_archive()
+
+    if args.command == 'backfill':
+        print(f"Archived {backfill(archive)} payloads from the response cache")
+
+    elif args.command == 'rederive':
+        from journal import atomic_write_json
+        from lemma_groups import lemma_map
+        from word_store import WordStore
+
+        fields = [f.strip() for f in args.fields.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in DERIVED_FIELDS]
+        if unknown:
+            raise SystemExit(f"Unknown field(s): {', '.join(unknown)} (expected {', '.join(DERIVED_FIELDS)})")
+
+        with open(words_path, 'r', encoding='utf-8') as f:
+            words = json.load(f)
+
+        start = time.perf_counter()
+        generated = generated_keys(WordStore(), fields)
+        changed, kept = rederive(words, fields, lemma_map([w.get('word', '') for w in words]), generated)
+        print(f"Re-derived {', '.join(fields)} for {len(words)} words in {time.perf_counter() - start:.1f}s: {changed} changed")
+        if kept:
+            print(f"Kept {kept} generated values (definitions/examples/TL;DRs from the generators)")
+
+        if not args.dry_run and changed:
+            atomic_write_json(words_path, words, ensure_ascii=False, indent=2)
+            print(f"Saved to: {words_path}")
+
+    stats = archive.stats()
+    print(f"Archive: {archive.path}")
+    print(f"  Entries: {stats['entries']} ({stats['found']} with definitions)")
+    print(f"  Size: {stats['bytes'] / 1024 / 1024:.1f} MB compressed")
+
+if __name__ == "__main__":
+    main()
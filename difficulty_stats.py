@@ -0,0 +1,240 @@
+"""
+Answer-based difficulty statistics for Ad Infinitum.
+Reads every user's wordProgress (timesReviewed / timesCorrect per word) and
+wrongAnswers from Firestore, aggregates them per word with NumPy, and re-levels
+words by how hard students actually find them:
+  - accuracy: share of answers that were correct (shrunk toward the overall
+    accuracy for words with few answers)
+  - difficulty: how much worse students do on the word than their accuracy on
+    everything else predicts, so strong students picking hard levels don't make
+    those words look easy
+  - discrimination: correlation between getting the word right and overall
+    ability; near zero or negative usually means a confusing question
+
+Re-leveling only moves words with enough answers and keeps the number of words
+per level unchanged, so module sizes stay the same.
+
+    py difficulty_stats.py fetch              # download to data/progress_export.ndjson
+    py difficulty_stats.py analyze            # report only
+    py difficulty_stats.py analyze --apply    # write new levels locally + data/releveling_delta.ndjson
+    py firestore_export.py upload --delta data/releveling_delta.ndjson
+
+Needs numpy (pip install numpy).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from firestore_export import field_hashes, get_client, load_manifest, write_delta
+from word_store import normalize_key
+
+# Fix Unicode encoding for Windows console
+sys.stdout.reconfigure(encoding='utf-8')
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+words_path = os.path.join(script_dir, 'data/words_processed.json')
+export_path = os.path.join(script_dir, 'data/progress_export.ndjson')
+releveling_path = os.path.join(script_dir, 'data/releveling_delta.ndjson')
+
+# A word is re-leveled only after this many answers from this many students
+MIN_RESPONSES = 30
+MIN_USERS = 10
+# Pseudo-answers at the overall accuracy added to every word and student
+PRIOR_RESPONSES = 10
+LOW_DISCRIMINATION = 0.1
+
+def fetch(client, path=export_path):
+    """Download progress records and wrong answers as NDJSON; returns (records, users with wrong answers)"""
+    records = wrong_users = 0
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for doc_path, fields in client.query_collection_group('wordProgress'):
+            # users/{uid}/wordProgress/{wordId}
+            parts = doc_path.split('/')
+            f.write(json.dumps({'user': parts[1], 'word': parts[3],
+                                'reviewed': int(fields.get('timesReviewed') or 0),
+                                'correct': int(fields.get('timesCorrect') or 0)}) + "\n")
+            records += 1
+        for uid, fields in client.list_documents('users'):
+            wrong = [item['wordId'] for item in fields.get('wrongAnswers') or []
+                     if isinstance(item, dict) and item.get('wordId')]
+            if wrong:
+                f.write(json.dumps({'user': uid, 'wrong': wrong}) + "\n")
+                wrong_users += 1
+    os.replace(tmp_path, path)
+    return records, wrong_users
+
+def load_export(path=export_path):
+    """Parse an export into integer-coded arrays.
+
+    Returns (user, word, reviewed, correct, wrong, user_ids, word_ids): one
+    array entry per progress record, wrong as word indexes of saved wrong
+    answers, and the id lists the indexes refer to. The arrays are cached next
+    to the export (path + '.npz'), so only the first analysis of an export
+    parses the JSON.
+    """
+    cache_path = path + '.npz'
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        with np.load(cache_path) as cached:
+            return (cached['user'], cached['word'], cached['reviewed'], cached['correct'], cached['wrong'],
+                    cached['user_ids'].tolist(), cached['word_ids'].tolist())
+
+    user_index, word_index = {}, {}
+    user, word, reviewed, correct, wrong = [], [], [], [], []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if 'wrong' in record:
+                wrong.extend(word_index.setdefault(w, len(word_index)) for w in record['wrong'])
+                continue
+            user.append(user_index.setdefault(record['user'], len(user_index)))
+            word.append(word_index.setdefault(record['word'], len(word_index)))
+            reviewed.append(record['reviewed'])
+            correct.append(record['correct'])
+    arrays = {
+        'user': np.array(user, dtype=np.int32), 'word': np.array(word, dtype=np.int32),
+        'reviewed': np.array(reviewed, dtype=np.float64), 'correct': np.array(correct, dtype=np.float64),
+        'wrong': np.array(wrong, dtype=np.int32),
+        'user_ids': np.array(list(user_index), dtype=str), 'word_ids': np.array(list(word_index), dtype=str),
+    }
+    with open(cache_path, 'wb') as f:
+        np.savez(f, **arrays)
+    return (arrays['user'], arrays['word'], arrays['reviewed'], arrays['correct'], arrays['wrong'],
+            list(user_index), list(word_index))
+
+def word_statistics(user, word, reviewed, correct, n_words):
+    """Per-word statistics as arrays of length n_words (dict of name -> array)"""
+    answered = reviewed > 0
+    user, word, reviewed = user[answered], word[answered], reviewed[answered]
+    correct = np.minimum(correct[answered], reviewed)
+
+    responses = np.bincount(word, reviewed, n_words)
+    right = np.bincount(word, correct, n_words)
+    students = np.bincount(word, minlength=n_words)
+    overall = right.sum() / max(responses.sum(), 1)
+
+    accuracy = (right + PRIOR_RESPONSES * overall) / (responses + PRIOR_RESPONSES)
+
+    # Each student's accuracy on their other words (leave-one-out), shrunk toward the overall rate
+    user_responses = np.bincount(user, reviewed)
+    user_right = np.bincount(user, correct)
+    other_responses = user_responses[user] - reviewed
+    ability = (user_right[user] - correct + PRIOR_RESPONSES * overall) / (other_responses + PRIOR_RESPONSES)
+
+    # Expected minus actual correct answers, per answer
+    difficulty = np.bincount(word, reviewed * ability - correct, n_words) / (responses + PRIOR_RESPONSES)
+
+    # Answer-weighted correlation between ability and the student's accuracy on this word
+    outcome = correct / reviewed
+    weight = np.where(responses > 0, responses, 1)
+    mean_x = np.bincount(word, reviewed * ability, n_words) / weight
+    mean_y = right / weight
+    cov = np.bincount(word, reviewed * ability * outcome, n_words) / weight - mean_x * mean_y
+    var_x = np.bincount(word, reviewed * ability ** 2, n_words) / weight - mean_x ** 2
+    var_y = np.bincount(word, reviewed * outcome ** 2, n_words) / weight - mean_y ** 2
+    spread = np.sqrt(np.clip(var_x, 0, None) * np.clip(var_y, 0, None))
+    discrimination = np.divide(cov, spread, out=np.full(n_words, np.nan), where=spread > 1e-12)
+
+    return {'responses': responses, 'students': students, 'accuracy': accuracy,
+            'difficulty': difficulty, 'discrimination': discrimination, 'overall': overall}
+
+def relevel(levels, difficulty, eligible):
+    """New levels: eligible words re-ranked by difficulty into the same per-level counts"""
+    index = np.flatnonzero(eligible)
+    order = index[np.argsort(difficulty[index], kind='stable')]
+    new_levels = levels.copy()
+    new_levels[order] = np.sort(levels[index])
+    return new_levels
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('command', choices=['fetch', 'analyze'])
+    parser.add_argument('--export', default=export_path, help='progress export file')
+    parser.add_argument('--project', help='Firebase project ID (default: projectId in js/config.js)')
+    parser.add_argument('--apply', action='store_true',
+                        help='write the new levels to words_processed.json and the re-leveling delta')
+    parser.add_argument('--show', type=int, default=10, help='words to list per category')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    if args.command == 'fetch':
+        records, wrong_users = fetch(get_client(args.project), args.export)
+        print(f"Exported {records} progress records and wrong answers of {wrong_users} students to {args.export}")
+        return
+
+    start = time.perf_counter()
+    user, word, reviewed, correct, wrong, user_ids, word_ids = load_export(args.export)
+    loaded = time.perf_counter()
+    stats = word_statistics(user, word, reviewed, correct, len(word_ids))
+    missed = np.bincount(wrong, minlength=len(word_ids))
+    aggregated = time.perf_counter()
+
+    print(f"Loaded {len(user)} progress records ({int(reviewed.sum())} answers, {len(user_ids)} students, "
+          f"{len(word_ids)} words) in {loaded - start:.2f}s; aggregated in {aggregated - loaded:.3f}s")
+    print(f"Overall accuracy: {stats['overall']:.1%}")
+
+    # Line the statistics up with the local word list through the export manifest
+    with open(words_path, 'r', encoding='utf-8') as f:
+        words = json.load(f)
+    manifest = load_manifest()
+    key_of_id = {entry['id']: key for key, entry in manifest.items()}
+    position = {normalize_key(w.get('word', '')): i for i, w in enumerate(words)}
+    local = np.array([position.get(key_of_id.get(word_id), -1) for word_id in word_ids])
+    known = local >= 0
+    if not known.all():
+        print(f"{int((~known).sum())} words with answers aren't in the manifest/word list (skipped)")
+
+    levels = np.array([(words[i].get('level') or 1) if i >= 0 else 0 for i in local])
+    eligible = known & (stats['responses'] >= MIN_RESPONSES) & (stats['students'] >= MIN_USERS)
+    new_levels = relevel(levels, stats['difficulty'], eligible)
+
+    print(f"\nLevel   words   accuracy")
+    for level in range(1, 6):
+        in_level = known & (levels == level) & (stats['responses'] > 0)
+        if in_level.any():
+            mean = np.average(stats['accuracy'][in_level], weights=stats['responses'][in_level])
+            print(f"  {level}     {int(in_level.sum()):>5}   {mean:>7.1%}")
+
+    def show(title, indexes):
+        print(f"\n{title}:")
+        for i in indexes[:args.show]:
+            print(f"  {words[local[i]]['word']} (level {levels[i]}): {stats['accuracy'][i]:.0%} correct, "
+                  f"{int(stats['responses'][i])} answers, {int(missed[i])} saved misses, "
+                  f"discrimination {stats['discrimination'][i]:+.2f}")
+
+    ranked = np.flatnonzero(eligible)[np.argsort(-stats['difficulty'][eligible])]
+    show("Hardest words", ranked)
+    flagged = np.flatnonzero(eligible & (stats['discrimination'] < LOW_DISCRIMINATION))
+    show(f"Low discrimination (< {LOW_DISCRIMINATION}, check the question)", flagged)
+
+    moved = np.flatnonzero(new_levels != levels)
+    print(f"\n{int(eligible.sum())} words have enough answers; {len(moved)} change level")
+    for i in moved[:args.show]:
+        print(f"  {words[local[i]]['word']}: {levels[i]} -> {new_levels[i]}")
+
+    if args.apply and len(moved):
+        from journal import atomic_write_json
+
+        writes = []
+        for i in moved:
+            entry = words[local[i]]
+            entry['level'] = int(new_levels[i])
+            key = normalize_key(entry['word'])
+            fields = {'level': entry['level']}
+            writes.append({'op': 'update', 'key': key, 'id': manifest[key]['id'],
+                           'fields': fields, 'hashes': field_hashes(fields)})
+        atomic_write_json(words_path, words, ensure_ascii=False, indent=2)
+        write_delta(writes, releveling_path)
+        print(f"\nSaved levels to: {words_path}")
+        print(f"Wrote {len(writes)} updates to {releveling_path}")
+        print(f"\nNext step: py firestore_export.py upload --delta {os.path.relpath(releveling_path, script_dir)}")
+
+if __name__ == "__main__":
+    main()
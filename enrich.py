@@ -0,0 +1,260 @@
+"""
+Single-call word enrichment using Claude API
+Asks for definition, part of speech, TL;DR, example, passage and Korean gloss in
+one structured response per word, validates each field locally and applies the
+ones that pass. Replaces separate generate_examples / generate_passages /
+fix_passages calls and fills the korean field process_vocab leaves empty.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import api_client
+from generate_passages import choose_definition
+from journal import Journal, compact, recover
+from text_normalize import generate_tldr
+from validators import (parse_json_object, validate_definition, validate_example, validate_korean,
+                        validate_part_of_speech, validate_passage, validate_tldr)
+from word_store import normalize_key, open_stage
+
+# Fix Unicode encoding for Windows console
+sys.stdout.reconfigure(encoding='utf-8')
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Load API key from file
+api_key_path = os.path.join(script_dir, 'api_key.txt')
+with open(api_key_path, 'r') as f:
+    API_KEY = f.read().strip()
+
+input_path = os.path.join(script_dir, 'data/words_processed.json')
+output_path = os.path.join(script_dir, 'data/words_processed.json')
+journal_path = os.path.join(script_dir, 'data/enrich_journal.jsonl')
+
+FIELD_VALIDATORS = {
+    'definition': validate_definition,
+    'partOfSpeech': validate_part_of_speech,
+    'tldr': validate_tldr,
+    'example': validate_example,
+    'passage': validate_passage,
+    'korean': validate_korean,
+}
+
+# Attempts per word while required fields are still missing
+MAX_ATTEMPTS = 2
+
+def request_enrichment(word, current_definition, part_of_speech, attempt=0):
+    """Ask for every field of one word in a single call; returns the parsed JSON object or None"""
+
+    prompt = f"""Create study material for the SAT vocabulary word "{word}"{f' ({part_of_speech})' if part_of_speech else ''}.
+
+Current definition: {current_definition if current_definition else "MISSING"}
+
+Provide:
+- definition: a clear, concise 1-sentence definition (improve the current one if it is missing or poor)
+- partOfSpeech: one of noun, verb, adjective, adverb, preposition, conjunction, phrase, phrasal verb, idiom
+- tldr: a 1-3 word gist of the meaning
+- example: ONE example sentence, 15-25 words long, suitable for SAT-level students, that uses "{word}" exactly once and does not include the definition
+- passage: a 3-sentence college-level reading passage (science, history, philosophy, literature or social issues) where "{word}" appears exactly ONCE and is essential to understanding the text
+- korean: a short Korean translation (Hangul) of the word's meaning
+
+Return ONLY a JSON object with exactly these keys:
+{{"definition": "...", "partOfSpeech": "...", "tldr": "...", "example": "...", "passage": "...", "korean": "..."}}"""
+
+    data = {
+        "model": api_client.MODEL,
+        "max_tokens": 500,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ]
+    }
+
+    try:
+        response = api_client.post_message(API_KEY, data, timeout=60, variant=attempt)
+        if response.status_code == 200:
+            result = response.json()
+            return parse_json_object(result['content'][0]['text'])
+        else:
+            print(f"  API Error {response.status_code}: {response.text[:100]}")
+            return None
+    except Exception as e:
+        print(f"  Request error: {e}")
+        return None
+
+def validate_fields(word, obj, current_definition=''):
+    """Split a response object into (valid_fields, {field: reason}) using the local validators.
+
+    The example is checked against the definition the word will end up with
+    (see apply_enrichment), like generate_examples does.
+    """
+    valid = {}
+    problems = {}
+    for field, validator in FIELD_VALIDATORS.items():
+        value = obj.get(field)
+        value = value.strip() if isinstance(value, str) else None
+        if field == 'example':
+            definition = current_definition
+            if 'definition' in valid:
+                definition = choose_definition(current_definition, valid['definition'])
+            reason = validator(word, value, definition)
+        else:
+            reason = validator(word, value)
+        if reason is None:
+            valid[field] = value
+        else:
+            problems[field] = reason
+    return valid, problems
+
+def enrich_word(word, current_definition, part_of_speech):
+    """Enrich one word, re-asking while fields fail validation.
+
+    Returns (fields, problems): the validated fields to apply and the reasons
+    for any field that never passed.
+    """
+    fields = {}
+    for attempt in range(MAX_ATTEMPTS):
+        obj = request_enrichment(word, current_definition, part_of_speech, attempt)
+        if obj is not None:
+            # Keep fields that passed on an earlier attempt
+            fields, _ = validate_fields(word, {**obj, **fields}, current_definition)
+        if len(fields) == len(FIELD_VALIDATORS):
+            break
+
+    _, problems = validate_fields(word, fields, current_definition)
+    return fields, problems
+
+def apply_enrichment(word_entry, fields):
+    """Merge validated fields into a word entry; returns the fields actually changed"""
+    changes = dict(fields)
+    current = word_entry.get('definition', '')
+    definition = choose_definition(current, changes['definition']) if 'definition' in changes else current
+    if definition == current:
+        changes.pop('definition', None)
+        # The returned TL;DR sums up the definition that wasn't used; the kept definition
+        # keeps its TL;DR, or gets one derived from it like process_vocab does
+        changes.pop('tldr', None)
+        tldr = generate_tldr(current)
+        if tldr and not word_entry.get('tldr'):
+            changes['tldr'] = tldr
+    else:
+        changes['definition'] = definition
+        # A new definition needs a TL;DR of its own, even if the model's didn't pass
+        if 'tldr' not in changes:
+            changes['tldr'] = generate_tldr(definition) or word_entry.get('tldr', '')
+    if 'partOfSpeech' in changes:
+        changes['partOfSpeech'] = changes['partOfSpeech'].lower()
+        # Keep the dictionary's part of speech when it has one
+        if word_entry.get('partOfSpeech'):
+            del changes['partOfSpeech']
+    word_entry.update(changes)
+    return changes
+
+def enrichment_status(problems):
+    if not problems:
+        return 'done'
+    return 'error' if len(problems) == len(FIELD_VALIDATORS) else 'partial'
+
+async def enrich_async(jobs, concurrency):
+    """Run enrich_word for (i, word, definition, pos) jobs with bounded concurrency.
+
+    Yields (i, word, fields, problems) in completion order.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    api_client.get_session(pool_size=concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def run(i, word, definition, pos):
+            async with semaphore:
+                fields, problems = await loop.run_in_executor(executor, enrich_word, word, definition, pos)
+            return i, word, fields, problems
+
+        tasks = [asyncio.create_task(run(*job)) for job in jobs]
+        for task in asyncio.as_completed(tasks):
+            yield await task
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='number of in-flight API requests (1 = sequential)')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    # Load words
+    print("Loading words...")
+    with open(input_path, 'r', encoding='utf-8') as f:
+        words = json.load(f)
+
+    print(f"Loaded {len(words)} words")
+
+    # Load stage status (plus anything journaled by an interrupted run)
+    store, _ = open_stage('enrich', words)
+    recovered = recover(words, journal_path, store, 'enrich')
+    processed = store.done_keys('enrich')
+
+    jobs = []
+    for i, word_entry in enumerate(words):
+        word = word_entry.get('word', '')
+        if word and normalize_key(word) not in processed:
+            jobs.append((i, word, word_entry.get('definition', ''), word_entry.get('partOfSpeech', '')))
+
+    print(f"Words to enrich: {len(jobs)}")
+
+    if len(jobs) == 0:
+        if recovered:
+            compact(words, journal_path, output_path)
+        print("All words already enriched!")
+        return
+
+    print(f"\nEstimated cost: ~${len(jobs) * 0.0008:.2f}")
+    print("Starting enrichment...\n")
+
+    counts = {'done': 0, 'partial': 0, 'error': 0}
+    journal = Journal(journal_path, store, 'enrich')
+
+    def record_result(i, word, fields, problems):
+        status = enrichment_status(problems)
+        counts[status] += 1
+        print(f"[{sum(counts.values())}/{len(jobs)}] {word}...", end=" ", flush=True)
+
+        changes = apply_enrichment(words[i], fields)
+        if status == 'done':
+            print("OK")
+        else:
+            print(f"{status.upper()} ({', '.join(f'{field}: {reason}' for field, reason in problems.items())})")
+
+        # Partial/error words stay eligible for the next run
+        journal.append(i, word, changes, status=status)
+
+    if args.concurrency > 1:
+        print(f"Running with {args.concurrency} concurrent requests\n")
+
+        async def run_all():
+            async for result in enrich_async(jobs, args.concurrency):
+                record_result(*result)
+
+        asyncio.run(run_all())
+    else:
+        for i, word, definition, pos in jobs:
+            fields, problems = enrich_word(word, definition, pos)
+            record_result(i, word, fields, problems)
+
+    # Final save: fold the journal into the main file
+    print(f"\n\nSaving final results...")
+    journal.close()
+    compact(words, journal_path, output_path)
+
+    print(f"\nDone!")
+    print(f"  Complete: {counts['done']}")
+    print(f"  Partial: {counts['partial']}")
+    print(f"  Errors: {counts['error']}")
+    print(f"\nNext step: Export the changes with py firestore_export.py plan, then upload")
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ import json
 import os
 import sys
 
+from journal import atomic_write_json
+
 # Fix Unicode encoding for Windows console
 sys.stdout.reconfigure(encoding='utf-8')
 
@@ -14,18 +16,6 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 input_path = os.path.join(script_dir, 'data/words_processed.json')
 output_path = os.path.join(script_dir, 'data/words_processed.json')
 
-# Load processed words
-with open(input_path, 'r', encoding='utf-8') as f:
-    words = json.load(f)
-
-print(f"Loaded {len(words)} words")
-
-# Count missing
-missing_def = 0
-missing_example = 0
-filled_def = 0
-filled_example = 0
-
 # Common word patterns for generating basic definitions
 def generate_basic_definition(word):
     """Generate a basic placeholder definition based on word patterns"""
@@ -86,32 +76,57 @@ def generate_basic_example(word, definition):
     idx = sum(ord(c) for c in word) % len(templates)
     return templates[idx]
 
-# Process each word
-for word_entry in words:
+def fill_entry(word_entry):
+    """Fill a missing definition/example in place; returns (filled_def, filled_example)"""
     word = word_entry.get('word', '')
+    filled_def = False
+    filled_example = False
 
     # Fill missing definition
     if not word_entry.get('definition') or word_entry['definition'].strip() == '':
-        missing_def += 1
         word_entry['definition'] = generate_basic_definition(word)
         word_entry['tldr'] = word.capitalize()  # Simple TL;DR is just the word
-        filled_def += 1
+        filled_def = True
 
     # Fill missing example
     if not word_entry.get('example') or word_entry['example'].strip() == '':
-        missing_example += 1
         word_entry['example'] = generate_basic_example(word, word_entry.get('definition', ''))
-        filled_example += 1
-
-# Save updated words
-with open(output_path, 'w', encoding='utf-8') as f:
-    json.dump(words, f, ensure_ascii=False, indent=2)
-
-print(f"\nResults:")
-print(f"  Words missing definitions: {missing_def}")
-print(f"  Words missing examples: {missing_example}")
-print(f"  Filled definitions: {filled_def}")
-print(f"  Filled examples: {filled_example}")
-print(f"\nSaved to: {output_path}")
-print(f"\nNote: Words with '(Definition needed for: ...)' should be manually reviewed.")
-print(f"After running this, re-import via import.html to update Firebase.")
+        filled_example = True
+
+    return filled_def, filled_example
+
+def main():
+    # Load processed words
+    with open(input_path, 'r', encoding='utf-8') as f:
+        words = json.load(f)
+
+    print(f"Loaded {len(words)} words")
+
+    # Count missing
+    missing_def = 0
+    missing_example = 0
+    filled_def = 0
+    filled_example = 0
+
+    # Process each word
+    for word_entry in words:
+        did_def, did_example = fill_entry(word_entry)
+        missing_def += did_def
+        filled_def += did_def
+        missing_example += did_example
+        filled_example += did_example
+
+    # Save updated words (atomic so a crash can't leave a half-written file)
+    atomic_write_json(output_path, words, ensure_ascii=False, indent=2)
+
+    print(f"\nResults:")
+    print(f"  Words missing definitions: {missing_def}")
+    print(f"  Words missing examples: {missing_example}")
+    print(f"  Filled definitions: {filled_def}")
+    print(f"  Filled examples: {filled_example}")
+    print(f"\nSaved to: {output_path}")
+    print(f"\nNote: Words with '(Definition needed for: ...)' should be manually reviewed.")
+    print(f"After running this, export the changes with py firestore_export.py plan, then upload.")
+
+if __name__ == "__main__":
+    main()
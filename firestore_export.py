@@ -0,0 +1,363 @@
+"""
+Incremental Firestore export for Ad Infinitum.
+Instead of clearing the words collection and re-importing everything, keeps a
+manifest of what Firestore holds (stable document ID + per-field content hashes
+for every word) and writes only the documents that were added, changed or
+deleted. A changed word is one update of just its changed fields, so a
+one-passage fix is one write, and edits made in the admin pages to other
+fields (e.g. level) are left alone. Document IDs never change, so users'
+wordProgress entries stay valid.
+
+    py firestore_export.py adopt      # once: record the IDs of the documents already in Firestore
+    py firestore_export.py plan       # write the pending changes to data/firestore_delta.ndjson
+    py firestore_export.py upload     # commit them in batches of up to 500 writes
+    py firestore_export.py status
+
+Writes go through the Firestore REST API. Set FIRESTORE_EMULATOR_HOST
+(e.g. localhost:8080) to use the local emulator; otherwise FIRESTORE_TOKEN must
+hold an OAuth access token (gcloud auth print-access-token).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+import requests
+
+from journal import atomic_write_json
+from rate_limiter import RateLimiter, request_with_retry
+from word_store import content_hash, normalize_key
+
+# Fix Unicode encoding for Windows console
+sys.stdout.reconfigure(encoding='utf-8')
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+words_path = os.path.join(script_dir, 'data/words_processed.json')
+manifest_path = os.path.join(script_dir, 'data/firestore_manifest.json')
+delta_path = os.path.join(script_dir, 'data/firestore_delta.ndjson')
+config_path = os.path.join(script_dir, 'js/config.js')
+
+COLLECTION = 'words'
+
+# Fields import.html writes, with the defaults it uses for missing values
+EXPORT_FIELDS = {
+    'word': '', 'definition': '', 'tldr': '', 'korean': '',
+    'partOfSpeech': '', 'example': '', 'passage': '', 'level': 1,
+}
+
+# Firestore's limit on writes per commit
+BATCH_LIMIT = 500
+
+def doc_id(word):
+    """Stable document ID for a word that isn't in Firestore yet"""
+    return hashlib.sha1(normalize_key(word).encode('utf-8')).hexdigest()[:20]
+
+def export_fields(word_entry):
+    return {field: word_entry.get(field) or default for field, default in EXPORT_FIELDS.items()}
+
+def field_hashes(fields):
+    return {field: content_hash({field: value})[:16] for field, value in fields.items()}
+
+def load_manifest(path=manifest_path):
+    """{word key: {'id', 'hash', 'fields': {field: hash}}} for every exported document"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['documents']
+
+def save_manifest(documents, path=manifest_path):
+    atomic_write_json(path, {'collection': COLLECTION, 'documents': documents},
+                      ensure_ascii=False, indent=1, sort_keys=True)
+
+def plan_delta(words, manifest):
+    """Writes that bring Firestore from `manifest` to `words`.
+
+    Each write is {'op': 'set'|'update'|'delete', 'key', 'id', 'fields', 'hashes'};
+    updates carry only the fields whose hash changed.
+    """
+    writes = []
+    seen = set()
+    for word_entry in words:
+        key = normalize_key(word_entry.get('word', ''))
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        fields = export_fields(word_entry)
+        hashes = field_hashes(fields)
+        exported = manifest.get(key)
+        if exported is None:
+            writes.append({'op': 'set', 'key': key, 'id': doc_id(key), 'fields': fields, 'hashes': hashes})
+            continue
+        changed = {field: value for field, value in fields.items() if exported['fields'].get(field) != hashes[field]}
+        if changed:
+            writes.append({'op': 'update', 'key': key, 'id': exported['id'], 'fields': changed,
+                           'hashes': {field: hashes[field] for field in changed}})
+
+    for key, exported in manifest.items():
+        if key not in seen:
+            writes.append({'op': 'delete', 'key': key, 'id': exported['id'], 'fields': {}, 'hashes': {}})
+    return writes
+
+def apply_write(manifest, write):
+    """Record a committed write in the manifest"""
+    if write['op'] == 'delete':
+        manifest.pop(write['key'], None)
+        return
+    entry = manifest.setdefault(write['key'], {'id': write['id'], 'fields': {}})
+    entry['fields'].update(write['hashes'])
+    entry['hash'] = content_hash(entry['fields'])
+
+def write_delta(writes, path=delta_path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for write in writes:
+            f.write(json.dumps(write, ensure_ascii=False) + "\n")
+
+def read_delta(path=delta_path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def chunk_writes(writes, size=BATCH_LIMIT):
+    return [writes[n:n + size] for n in range(0, len(writes), size)]
+
+# --- Firestore REST API ---
+
+def default_project():
+    """projectId from js/config.js, so the export targets the app's own project"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        match = re.search(r'projectId:\s*"([^"]+)"', f.read())
+    return match.group(1) if match else None
+
+def encode_value(value):
+    if value is None:
+        return {'nullValue': None}
+    if isinstance(value, dict):
+        return {'mapValue': {'fields': {field: encode_value(item) for field, item in value.items()}}}
+    if isinstance(value, list):
+        return {'arrayValue': {'values': [encode_value(item) for item in value]}}
+    if isinstance(value, bool):
+        return {'booleanValue': value}
+    if isinstance(value, int):
+        return {'integerValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def decode_value(value):
+    if 'integerValue' in value:
+        return int(value['integerValue'])
+    if 'doubleValue' in value:
+        return value['doubleValue']
+    if 'booleanValue' in value:
+        return value['booleanValue']
+    if 'arrayValue' in value:
+        return [decode_value(item) for item in value['arrayValue'].get('values', [])]
+    if 'mapValue' in value:
+        return {field: decode_value(item) for field, item in value['mapValue'].get('fields', {}).items()}
+    if 'timestampValue' in value:
+        return value['timestampValue']
+    return value.get('stringValue', '')
+
+class FirestoreClient:
+    def __init__(self, project, emulator_host=None, token=None):
+        self.session = requests.Session()
+        if emulator_host:
+            base = f"http://{emulator_host}/v1"
+            token = 'owner'  # the emulator accepts any bearer token and skips security rules
+        else:
+            base = "https://firestore.googleapis.com/v1"
+        if not token:
+            raise SystemExit("Set FIRESTORE_TOKEN (gcloud auth print-access-token) or FIRESTORE_EMULATOR_HOST")
+        self.session.headers['Authorization'] = f"Bearer {token}"
+        self.database = f"projects/{project}/databases/(default)"
+        self.base = base
+        self.limiter = RateLimiter(600, 600)
+
+    def doc_name(self, id):
+        return f"{self.database}/documents/{COLLECTION}/{id}"
+
+    def to_write(self, write):
+        if write['op'] == 'delete':
+            return {'delete': self.doc_name(write['id'])}
+        document = {'name': self.doc_name(write['id']),
+                    'fields': {field: encode_value(value) for field, value in write['fields'].items()}}
+        if write['op'] == 'update':
+            return {'update': document, 'updateMask': {'fieldPaths': sorted(write['fields'])}}
+        # New documents get createdAt like import.html's serverTimestamp()
+        return {'update': document,
+                'updateTransforms': [{'fieldPath': 'createdAt', 'setToServerValue': 'REQUEST_TIME'}]}
+
+    def commit(self, writes):
+        """Commit up to BATCH_LIMIT delta writes atomically"""
+        self.commit_writes([self.to_write(write) for write in writes])
+
+    def update_write(self, path, fields):
+        """REST write setting just `fields` on the document at `path` (e.g. users/{uid})"""
+        return {'update': {'name': f"{self.database}/documents/{path}",
+                           'fields': {field: encode_value(value) for field, value in fields.items()}},
+                'updateMask': {'fieldPaths': sorted(fields)}}
+
+    def commit_writes(self, rest_writes):
+        """Commit up to BATCH_LIMIT REST API writes atomically"""
+        url = f"{self.base}/{self.database}/documents:commit"
+        body = {'writes': rest_writes}
+        response = request_with_retry(lambda: self.session.post(url, json=body, timeout=60), self.limiter)
+        response.raise_for_status()
+
+    def list_documents(self, collection=COLLECTION):
+        """Yield (id, fields) for every document in a collection (e.g. 'users' or 'users/{uid}/wordProgress')"""
+        url = f"{self.base}/{self.database}/documents/{collection}"
+        params = {'pageSize': 300}
+        while True:
+            response = request_with_retry(lambda: self.session.get(url, params=params, timeout=60), self.limiter)
+            response.raise_for_status()
+            page = response.json()
+            for document in page.get('documents', []):
+                fields = {field: decode_value(value) for field, value in document.get('fields', {}).items()}
+                yield document['name'].rsplit('/', 1)[1], fields
+            if not page.get('nextPageToken'):
+                break
+            params['pageToken'] = page['nextPageToken']
+
+    def query_collection_group(self, collection_id, page_size=5000):
+        """Yield (document path, fields) for every document in every `collection_id`
+        subcollection (e.g. all users' wordProgress), paging by document name"""
+        url = f"{self.base}/{self.database}/documents:runQuery"
+        query = {'from': [{'collectionId': collection_id, 'allDescendants': True}],
+                 'orderBy': [{'field': {'fieldPath': '__name__'}}],
+                 'limit': page_size}
+        while True:
+            response = request_with_retry(
+                lambda: self.session.post(url, json={'structuredQuery': query}, timeout=120), self.limiter)
+            response.raise_for_status()
+            documents = [item['document'] for item in response.json() if 'document' in item]
+            for document in documents:
+                fields = {field: decode_value(value) for field, value in document.get('fields', {}).items()}
+                yield document['name'].split('/documents/', 1)[1], fields
+            if len(documents) < page_size:
+                break
+            query['startAt'] = {'values': [{'referenceValue': documents[-1]['name']}], 'before': False}
+
+def get_client(project):
+    return FirestoreClient(project or default_project(),
+                           emulator_host=os.environ.get('FIRESTORE_EMULATOR_HOST'),
+                           token=os.environ.get('FIRESTORE_TOKEN'))
+
+# --- Commands ---
+
+def adopt(client, manifest):
+    """Add the documents already in Firestore to the manifest, keyed by word.
+
+    Their hashes are of what Firestore holds, so the next plan updates exactly
+    the fields that differ locally. When a word has several documents, the one
+    already in the manifest (else the most complete one) is kept. Returns
+    (adopted, duplicates) with duplicates as (key, id) pairs left untouched.
+    """
+    documents = {}
+    for id, fields in client.list_documents():
+        key = normalize_key(fields.get('word', ''))
+        if key:
+            documents.setdefault(key, []).append((id, fields))
+
+    duplicates = []
+    for key, candidates in documents.items():
+        known = manifest.get(key, {}).get('id')
+        candidates.sort(key=lambda doc: (doc[0] != known, -sum(1 for field in EXPORT_FIELDS if doc[1].get(field))))
+        id, fields = candidates[0]
+        duplicates.extend((key, other) for other, _ in candidates[1:])
+        remote = {field: fields.get(field) or default for field, default in EXPORT_FIELDS.items()}
+        manifest[key] = {'id': id, 'fields': field_hashes(remote)}
+        manifest[key]['hash'] = content_hash(manifest[key]['fields'])
+    return len(documents), duplicates
+
+def field_differences(writes):
+    """{field: number of updates that change it}"""
+    counts = {}
+    for write in writes:
+        if write['op'] == 'update':
+            for field in write['fields']:
+                counts[field] = counts.get(field, 0) + 1
+    return counts
+
+def upload(client, writes, manifest):
+    """Commit writes batch by batch, saving the manifest after each batch so an interrupted upload resumes"""
+    batches = chunk_writes(writes)
+    for n, batch in enumerate(batches, 1):
+        client.commit(batch)
+        for write in batch:
+            apply_write(manifest, write)
+        save_manifest(manifest)
+        print(f"  Batch {n}/{len(batches)}: {len(batch)} writes")
+
+def summarize(writes):
+    counts = {'set': 0, 'update': 0, 'delete': 0}
+    for write in writes:
+        counts[write['op']] += 1
+    return counts
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('command', choices=['adopt', 'plan', 'upload', 'status'])
+    parser.add_argument('--input', default=words_path, help='words file to export')
+    parser.add_argument('--project', help='Firebase project ID (default: projectId in js/config.js)')
+    parser.add_argument('--delta', default=delta_path, help='upload: delta file to commit')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    manifest = load_manifest()
+
+    if args.command == 'adopt':
+        adopted, duplicates = adopt(get_client(args.project), manifest)
+        save_manifest(manifest)
+        print(f"Adopted {adopted} existing documents into {manifest_path}")
+        if duplicates:
+            print(f"{len(duplicates)} duplicate documents left untouched (delete them in the console):")
+            for key, id in duplicates[:20]:
+                print(f"  {key}: {id}")
+
+        # Fields edited in the admin pages differ from the local file; plan would overwrite them
+        with open(args.input, 'r', encoding='utf-8') as f:
+            differences = field_differences(plan_delta(json.load(f), manifest))
+        if differences:
+            print("Local values differ from Firestore (the next upload writes the local ones):")
+            for field, count in sorted(differences.items()):
+                print(f"  {field}: {count} words")
+        return
+
+    if args.command == 'upload':
+        if not os.path.exists(args.delta):
+            raise SystemExit(f"No pending delta; run: py firestore_export.py plan")
+        writes = read_delta(args.delta)
+        counts = summarize(writes)
+        print(f"Uploading {len(writes)} writes ({counts['set']} new, {counts['update']} updated, "
+              f"{counts['delete']} deleted) in {len(chunk_writes(writes))} batches...")
+        upload(get_client(args.project), writes, manifest)
+        os.remove(args.delta)
+        print("Done! Firestore matches the manifest.")
+        return
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        words = json.load(f)
+    writes = plan_delta(words, manifest)
+    counts = summarize(writes)
+
+    if args.command == 'status':
+        print(f"Manifest: {len(manifest)} documents")
+        print(f"Local: {len(words)} words")
+    elif writes:
+        write_delta(writes)
+        print(f"Wrote {len(writes)} writes to {delta_path} ({len(chunk_writes(writes))} batches)")
+    elif os.path.exists(delta_path):
+        # An older plan must not be uploaded once there is nothing left to do
+        os.remove(delta_path)
+        print(f"Removed the stale {os.path.basename(delta_path)}")
+    if not manifest and words and args.command == 'plan':
+        print("Manifest is empty: if the collection already has words, run 'adopt' first "
+              "or every word will be added a second time.")
+    print(f"Pending: {counts['set']} new, {counts['update']} updated, {counts['delete']} deleted")
+
+if __name__ == "__main__":
+    main()
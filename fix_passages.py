@@ -1,18 +1,25 @@
 """
 Fix passages that contain the target word more than once.
 Regenerates only those passages with a stricter prompt.
+
+    py fix_passages.py                            # up to 3 attempts in sequence
+    py fix_passages.py --stream                   # abandon a passage as soon as it repeats the word
+    py fix_passages.py --candidates 3 --stream    # 3 candidates at once, keep the first valid one
 """
 
+import argparse
 import json
 import os
 import sys
-import time
-import re
-import requests
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-sys.stdout.reconfigure(encoding='utf-8')
+import api_client
+from journal import Journal, compact, recover
+from validators import count_word_occurrences, count_word_occurrences_many, passage_violation
+from word_store import normalize_key, open_stage
 
-API_URL = "https://api.anthropic.com/v1/messages"
+sys.stdout.reconfigure(encoding='utf-8')
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -22,15 +29,15 @@ with open(api_key_path, 'r') as f:
 
 input_path = os.path.join(script_dir, 'data/words_processed.json')
 output_path = os.path.join(script_dir, 'data/words_processed.json')
-progress_path = os.path.join(script_dir, 'data/fix_passage_progress.json')
+journal_path = os.path.join(script_dir, 'data/fix_passage_journal.jsonl')
 
-def count_word_occurrences(word, text):
-    """Count how many times word appears in text (whole word only)"""
-    pattern = r'\b' + re.escape(word.lower()) + r'\b'
-    return len(re.findall(pattern, text.lower(), re.IGNORECASE))
+def generate_fixed_passage(word, definition, part_of_speech, attempt=0, stream=False, stop=None):
+    """Generate a passage with EXACTLY one occurrence of the word.
 
-def generate_fixed_passage(word, definition, part_of_speech):
-    """Generate a passage with EXACTLY one occurrence of the word"""
+    With stream=True the response is checked as it arrives and abandoned as soon
+    as it can no longer be valid, so the caller can retry straight away. Setting
+    the `stop` event abandons it too (another candidate already won).
+    """
 
     prompt = f"""Write a 3-sentence college-level reading passage for the vocabulary word "{word}" ({part_of_speech}).
 
@@ -46,14 +53,8 @@ CRITICAL REQUIREMENTS:
 
 Return ONLY the 3-sentence passage, nothing else. Double-check that "{word}" appears exactly once before responding."""
 
-    headers = {
-        "x-api-key": API_KEY,
-        "anthropic-version": "2023-06-01",
-        "content-type": "application/json"
-    }
-
     data = {
-        "model": "claude-3-haiku-20240307",
+        "model": api_client.MODEL,
         "max_tokens": 250,
         "messages": [
             {"role": "user", "content": prompt}
@@ -61,7 +62,21 @@ Return ONLY the 3-sentence passage, nothing else. Double-check that "{word}" app
     }
 
     try:
-        response = requests.post(API_URL, headers=headers, json=data, timeout=30)
+        if stream:
+            def check(text):
+                if stop is not None and stop.is_set():
+                    return 'superseded'
+                return passage_violation(word, text)
+
+            passage, reason = api_client.stream_message(API_KEY, data, check=check, variant=attempt)
+            if reason:
+                if reason != 'superseded':
+                    print(f"abort({reason})...", end=" ", flush=True)
+                return None, False
+            passage = passage.strip()
+            return passage, count_word_occurrences(word, passage) == 1
+
+        response = api_client.post_message(API_KEY, data, timeout=30, variant=attempt)
         if response.status_code == 200:
             result = response.json()
             passage = result['content'][0]['text'].strip()
@@ -79,48 +94,104 @@ Return ONLY the 3-sentence passage, nothing else. Double-check that "{word}" app
         print(f"  Request error: {e}")
         return None, False
 
-def load_progress():
-    if os.path.exists(progress_path):
-        with open(progress_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {'processed': []}
-
-def save_progress(progress):
-    with open(progress_path, 'w', encoding='utf-8') as f:
-        json.dump(progress, f)
+def fix_passage(word, definition, part_of_speech, attempts=3, stream=False):
+    """Try up to `attempts` times to get a good passage.
+
+    Returns (passage, status) where status is 'done', 'imperfect' (last
+    attempt still had the wrong count) or 'error' (no passage at all).
+    """
+    best = None
+    for attempt in range(attempts):
+        passage, is_valid = generate_fixed_passage(word, definition, part_of_speech, attempt, stream)
+
+        if passage and is_valid:
+            return passage, 'done'
+        elif passage:
+            best = passage
+            new_count = count_word_occurrences(word, passage)
+            if attempt < attempts - 1:
+                print(f"retry({new_count})...", end=" ", flush=True)
+
+    # An aborted stream leaves no passage, so keep the last complete one
+    return best, ('imperfect' if best else 'error')
+
+def fix_passage_best_of(word, definition, part_of_speech, candidates=3, stream=False):
+    """Request `candidates` passages at once and keep the first valid one.
+
+    Every candidate starts straight away. With stream=True the others are closed
+    at their next chunk once a valid passage arrives, so they stop generating;
+    without it they can't be interrupted and finish (and are billed) in the
+    background. If none is valid, the candidate whose count is closest to one is
+    kept. Same return value as fix_passage.
+    """
+    executor = ThreadPoolExecutor(max_workers=candidates)
+    stop = threading.Event()
+    pending = {executor.submit(generate_fixed_passage, word, definition, part_of_speech, attempt, stream, stop)
+               for attempt in range(candidates)}
+    best = None
+    try:
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                passage, is_valid = future.result()
+                if passage and is_valid:
+                    stop.set()
+                    return passage, 'done'
+                if passage and (best is None or
+                                abs(count_word_occurrences(word, passage) - 1) < abs(count_word_occurrences(word, best) - 1)):
+                    best = passage
+    finally:
+        executor.shutdown(wait=False)
+
+    return best, ('imperfect' if best else 'error')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--candidates', type=int, default=1,
+                        help='passages to request in parallel per word (1 = sequential retries); '
+                             'add --stream to cut the others off once one is valid')
+    parser.add_argument('--stream', action='store_true',
+                        help='stream responses and abort a passage as soon as it repeats the word')
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+
     print("Loading words...")
     with open(input_path, 'r', encoding='utf-8') as f:
         words = json.load(f)
 
     print(f"Loaded {len(words)} words")
 
-    progress = load_progress()
-    processed_words = set(progress.get('processed', []))
+    store, _ = open_stage('fix', words)
+    recovered = recover(words, journal_path, store, 'fix')
+    processed_words = store.done_keys('fix')
 
-    # Find words with multiple occurrences in passage
-    words_to_fix = []
-    for i, w in enumerate(words):
-        word = w.get('word', '')
-        passage = w.get('passage', '')
-        if word and passage and word not in processed_words:
-            occurrences = count_word_occurrences(word, passage)
-            if occurrences > 1:
-                words_to_fix.append((i, w, occurrences))
+    # Find words with multiple occurrences in passage (one batch pass over the corpus)
+    pending = [(i, w) for i, w in enumerate(words)
+               if w.get('word') and w.get('passage') and normalize_key(w['word']) not in processed_words]
+    counts = count_word_occurrences_many((w['word'], w['passage']) for _, w in pending)
+    words_to_fix = [(i, w, occurrences) for (i, w), occurrences in zip(pending, counts) if occurrences > 1]
 
     print(f"Passages to fix: {len(words_to_fix)}")
 
     if len(words_to_fix) == 0:
+        if recovered:
+            compact(words, journal_path, output_path)
         print("All passages are good!")
         return
 
     print(f"\nEstimated cost: ~${len(words_to_fix) * 0.0005:.2f}")
     print("Starting regeneration...\n")
 
+    if args.candidates > 1:
+        api_client.get_session(pool_size=args.candidates)
+        print(f"Requesting {args.candidates} candidates per word\n")
+
     fixed = 0
     still_bad = 0
     errors = 0
+    journal = Journal(journal_path, store, 'fix')
 
     for idx, (i, word_entry, old_count) in enumerate(words_to_fix):
         word = word_entry.get('word', '')
@@ -129,55 +200,37 @@ def main():
 
         print(f"[{idx+1}/{len(words_to_fix)}] {word} (had {old_count})...", end=" ", flush=True)
 
-        # Try up to 3 times to get a good passage
-        success = False
-        for attempt in range(3):
-            passage, is_valid = generate_fixed_passage(word, definition, pos)
-
-            if passage and is_valid:
-                words[i]['passage'] = passage
-                fixed += 1
-                success = True
-                print("OK")
-                break
-            elif passage:
-                new_count = count_word_occurrences(word, passage)
-                if attempt < 2:
-                    print(f"retry({new_count})...", end=" ", flush=True)
-                    time.sleep(0.3)
-
-        if not success:
-            if passage:
-                # Use the last attempt anyway, even if not perfect
-                words[i]['passage'] = passage
-                still_bad += 1
-                print(f"KEPT ({count_word_occurrences(word, passage)})")
-            else:
-                errors += 1
-                print("ERROR")
-
-        progress['processed'].append(word)
-
-        # Save every 50 words
-        if (idx + 1) % 50 == 0:
-            print(f"\n--- Saving ({fixed} fixed, {still_bad} imperfect, {errors} errors) ---\n")
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(words, f, ensure_ascii=False, indent=2)
-            save_progress(progress)
+        if args.candidates > 1:
+            passage, status = fix_passage_best_of(word, definition, pos, args.candidates, args.stream)
+        else:
+            passage, status = fix_passage(word, definition, pos, stream=args.stream)
+
+        if status == 'done':
+            words[i]['passage'] = passage
+            fixed += 1
+            print("OK")
+        elif status == 'imperfect':
+            # Use the last attempt anyway, even if not perfect
+            words[i]['passage'] = passage
+            still_bad += 1
+            print(f"KEPT ({count_word_occurrences(word, passage)})")
+        else:
+            errors += 1
+            print("ERROR")
 
-        time.sleep(0.2)
+        # One fsync'd journal line per word; imperfect passages stay eligible for another run
+        journal.append(i, word, {'passage': passage} if passage else {}, status=status)
 
-    # Final save
+    # Final save: fold the journal into the main file
     print(f"\n\nSaving final results...")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(words, f, ensure_ascii=False, indent=2)
-    save_progress(progress)
+    journal.close()
+    compact(words, journal_path, output_path)
 
     print(f"\nDone!")
     print(f"  Fixed: {fixed}")
     print(f"  Still imperfect: {still_bad}")
     print(f"  Errors: {errors}")
-    print(f"\nNext step: Clear Firebase and re-import via import.html")
+    print(f"\nNext step: Export the changes with py firestore_export.py plan, then upload")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,271 @@
+"""
+Word-frequency index for data-driven difficulty levels.
+Packs a frequency list into one binary file (sorted words + offset and rank
+arrays) that is memory-mapped, not parsed, when loaded. level_words() ranks the
+whole vocabulary in one pass and cuts it into equal-sized levels, so each
+level's Firestore query serves a module of the same size.
+
+Build it once from any frequency list - "word count" lines (e.g. count_1w.txt)
+or one word per line, most frequent first:
+    py frequency_index.py build path/to/count_1w.txt
+
+Then:
+    py frequency_index.py report          # current vs frequency-based levels
+    py frequency_index.py level           # write frequency-based levels into words_processed.json
+    py frequency_index.py bench
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from word_matcher import FUNCTION_WORDS, tokenize
+
+# Fix Unicode encoding for Windows console
+sys.stdout.reconfigure(encoding='utf-8')
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+index_path = os.path.join(script_dir, 'data/frequency_index.bin')
+words_path = os.path.join(script_dir, 'data/words_processed.json')
+
+MAGIC = b'ADFI'
+VERSION = 1
+HEADER = struct.Struct('<4sIII')  # magic, version, word count, blob length
+
+LEVELS = 5
+
+# Suffix -> replacement tried when a form isn't in the list itself ("abhorred" -> "abhor")
+SUFFIX_BASES = [
+    ('ies', 'y'), ('ied', 'y'), ('ily', 'y'), ('iest', 'y'), ('ier', 'y'),
+    ('ing', ''), ('ing', 'e'), ('ed', ''), ('ed', 'e'), ('es', ''), ('s', ''),
+    ('ly', ''), ('est', ''), ('er', ''),
+]
+
+def build_index(source_path, output_path=index_path):
+    """Pack a frequency list into the binary index; returns the number of words"""
+    counts = {}
+    with open(source_path, 'r', encoding='utf-8') as f:
+        for rank, line in enumerate(f):
+            parts = line.split()
+            if not parts:
+                continue
+            word = parts[0].casefold()
+            # Without counts, the line order is the frequency order
+            count = float(parts[1]) if len(parts) > 1 else -rank
+            counts[word] = max(count, counts.get(word, count))
+
+    by_frequency = sorted(counts, key=lambda w: -counts[w])
+    rank_of = {word: rank for rank, word in enumerate(by_frequency, 1)}
+
+    encoded = sorted(word.encode('utf-8') for word in counts)
+    offsets = array('I', [0])
+    ranks = array('I')
+    for word in encoded:
+        offsets.append(offsets[-1] + len(word))
+        ranks.append(rank_of[word.decode('utf-8')])
+    blob = b''.join(encoded)
+
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(encoded), len(blob)))
+        offsets.tofile(f)
+        ranks.tofile(f)
+        f.write(blob)
+    os.replace(tmp_path, output_path)
+    return len(encoded)
+
+class FrequencyIndex:
+    """Read-only view of a built index; words are found by binary search over the mapped file"""
+
+    def __init__(self, path=index_path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size, blob_length = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} frequency index")
+
+        view = memoryview(self.map)
+        start = HEADER.size
+        self.offsets = view[start:start + 4 * (self.size + 1)].cast('I')
+        start += 4 * (self.size + 1)
+        self.ranks = view[start:start + 4 * self.size].cast('I')
+        self.blob_start = start + 4 * self.size
+
+    def word_at(self, i):
+        return self.map[self.blob_start + self.offsets[i]:self.blob_start + self.offsets[i + 1]]
+
+    def rank(self, token):
+        """Frequency rank of one token (1 = most common), or None if unlisted"""
+        key = token.encode('utf-8')
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.word_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.size and self.word_at(lo) == key:
+            return self.ranks[lo]
+        return None
+
+    def base_rank(self, token):
+        """Rank of a token, falling back to its likely base form for inflections"""
+        rank = self.rank(token)
+        if rank is not None:
+            return rank
+        for suffix, replacement in SUFFIX_BASES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                base = token[:-len(suffix)] + replacement
+                rank = self.rank(base)
+                # Undo consonant doubling (abhorred -> abhorr -> abhor)
+                if rank is None and len(base) > 3 and base[-1] == base[-2]:
+                    rank = self.rank(base[:-1])
+                if rank is not None:
+                    return rank
+        return None
+
+    def word_rank(self, word):
+        """Rank of a vocabulary entry: its rarest content word ("abide by" ranks as "abide").
+        Unlisted words rank after everything in the index."""
+        tokens = tokenize(word)
+        content = [t for t in tokens if t not in FUNCTION_WORDS] or tokens
+        if not content:
+            return self.size + 1
+        return max(self.base_rank(t) or self.size + 1 for t in content)
+
+    def close(self):
+        self.offsets.release()
+        self.ranks.release()
+        self.map.close()
+
+def level_words(words, index, levels=LEVELS):
+    """Frequency-based level (1 = most common) for every word, in equal-sized buckets.
+
+    Words missing from the index all rank after it, so among themselves they're
+    ordered by process_vocab's estimate_difficulty, then length, and spread
+    across the remaining buckets. Listed words with the same rank always land in
+    the same level.
+    """
+    from process_vocab import estimate_difficulty
+
+    ranks = []
+    for word in words:
+        rank = index.word_rank(word)
+        if rank > index.size:
+            ranks.append((rank, estimate_difficulty(word), len(word), word))
+        else:
+            ranks.append((rank, 0, 0, ''))
+    order = sorted(range(len(words)), key=ranks.__getitem__)
+    result = [0] * len(words)
+    bucket = 1
+    for position, i in enumerate(order):
+        if position and ranks[i] != ranks[order[position - 1]]:
+            bucket = 1 + position * levels // len(words)
+        result[i] = bucket
+    return result
+
+def level_counts(levels):
+    counts = {}
+    for level in levels:
+        counts[level] = counts.get(level, 0) + 1
+    return counts
+
+def report(words, index):
+    current = [w.get('level') for w in words]
+    proposed = level_words([w.get('word', '') for w in words], index)
+    unlisted = sum(index.word_rank(w.get('word', '')) > index.size for w in words)
+
+    print(f"Index: {index.path} ({index.size} words)")
+    print(f"Vocabulary: {len(words)} words, {unlisted} not in the frequency list\n")
+    print("Level   current   frequency")
+    current_counts, proposed_counts = level_counts(current), level_counts(proposed)
+    for level in range(1, LEVELS + 1):
+        print(f"  {level}     {current_counts.get(level, 0):>7}   {proposed_counts.get(level, 0):>9}")
+
+    # Rows: current level, columns: frequency level
+    print("\nCurrent (rows) vs frequency (columns):")
+    print("       " + "".join(f"{level:>7}" for level in range(1, LEVELS + 1)))
+    for row in range(1, LEVELS + 1):
+        cells = [sum(1 for c, p in zip(current, proposed) if c == row and p == col) for col in range(1, LEVELS + 1)]
+        print(f"  {row}    " + "".join(f"{n:>7}" for n in cells))
+
+    print("\nSample words per frequency level:")
+    for level in range(1, LEVELS + 1):
+        sample = [w.get('word', '') for w, p in zip(words, proposed) if p == level][:8]
+        print(f"  {level}: {', '.join(sample)}")
+
+def bench(words, index, repeat=5):
+    from process_vocab import estimate_difficulty
+
+    vocabulary = [w.get('word', '') for w in words]
+    start = time.perf_counter()
+    FrequencyIndex(index.path).close()
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        level_words(vocabulary, index)
+    batch = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        [estimate_difficulty(word) for word in vocabulary]
+    heuristic = (time.perf_counter() - start) / repeat
+
+    print(f"Index load (mmap): {load * 1000:.2f} ms")
+    print(f"level_words, {len(vocabulary)} words: {batch * 1000:.1f} ms ({len(vocabulary) / batch:,.0f} words/s)")
+    print(f"estimate_difficulty, {len(vocabulary)} words: {heuristic * 1000:.1f} ms")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('command', choices=['build', 'report', 'level', 'bench'])
+    parser.add_argument('source', nargs='?', help='frequency list to build from')
+    parser.add_argument('--dry-run', action='store_true', help='level: show the change without writing')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    if args.command == 'build':
+        if not args.source:
+            raise SystemExit("build needs a frequency list: py frequency_index.py build path/to/list.txt")
+        start = time.perf_counter()
+        count = build_index(args.source)
+        print(f"Indexed {count} words in {time.perf_counter() - start:.1f}s -> {index_path} "
+              f"({os.path.getsize(index_path) / 1024 / 1024:.1f} MB)")
+        return
+
+    if not os.path.exists(index_path):
+        raise SystemExit(f"No index at {index_path}; run: py frequency_index.py build path/to/list.txt")
+
+    with open(words_path, 'r', encoding='utf-8') as f:
+        words = json.load(f)
+    index = FrequencyIndex()
+
+    if args.command == 'report':
+        report(words, index)
+    elif args.command == 'bench':
+        bench(words, index)
+    else:
+        from journal import atomic_write_json
+
+        levels = level_words([w.get('word', '') for w in words], index)
+        changed = sum(1 for w, level in zip(words, levels) if w.get('level') != level)
+        print(f"{changed} of {len(words)} words change level")
+        if not args.dry_run and changed:
+            for w, level in zip(words, levels):
+                w['level'] = level
+            atomic_write_json(words_path, words, ensure_ascii=False, indent=2)
+            print(f"Saved to: {words_path}")
+            print(f"\nNext step: Export the changes with py firestore_export.py plan, then upload")
+
+    index.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,27 @@
 """
 Generate Example Sentences using Claude API
 Processes words and creates high-quality example sentences for SAT practice.
+
+Every sentence is checked before it is accepted (15-25 words, the word exactly
+once, no echoed definition, no placeholder template); a rejected sentence is
+re-requested straight away, up to MAX_ATTEMPTS times, and never written.
 """
 
+import argparse
+import asyncio
 import json
 import os
 import sys
-import time
-import requests
+from concurrent.futures import ThreadPoolExecutor
+
+import api_client
+from journal import Journal, compact, recover
+from validators import is_placeholder_example, match_items, parse_json_array, validate_example
+from word_store import entries_needing, open_stage
 
 # Fix Unicode encoding for Windows console
 sys.stdout.reconfigure(encoding='utf-8')
 
-# API Configuration
-API_URL = "https://api.anthropic.com/v1/messages"
-
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
 # Load API key from file
@@ -23,9 +30,12 @@ with open(api_key_path, 'r') as f:
     API_KEY = f.read().strip()
 input_path = os.path.join(script_dir, 'data/words_processed.json')
 output_path = os.path.join(script_dir, 'data/words_processed.json')
-progress_path = os.path.join(script_dir, 'data/generation_progress.json')
+journal_path = os.path.join(script_dir, 'data/generation_journal.jsonl')
 
-def generate_example(word, definition, part_of_speech):
+# Requests per word before giving up on it for this run
+MAX_ATTEMPTS = 3
+
+def generate_example(word, definition, part_of_speech, attempt=0):
     """Generate an example sentence using Claude API"""
 
     prompt = f"""Generate ONE example sentence for the vocabulary word "{word}" ({part_of_speech}).
@@ -42,14 +52,8 @@ Requirements:
 
 Return ONLY the example sentence, nothing else."""
 
-    headers = {
-        "x-api-key": API_KEY,
-        "anthropic-version": "2023-06-01",
-        "content-type": "application/json"
-    }
-
     data = {
-        "model": "claude-3-haiku-20240307",
+        "model": api_client.MODEL,
         "max_tokens": 100,
         "messages": [
             {"role": "user", "content": prompt}
@@ -57,7 +61,7 @@ Return ONLY the example sentence, nothing else."""
     }
 
     try:
-        response = requests.post(API_URL, headers=headers, json=data, timeout=30)
+        response = api_client.post_message(API_KEY, data, timeout=30, variant=attempt)
         if response.status_code == 200:
             result = response.json()
             return result['content'][0]['text'].strip()
@@ -68,6 +72,95 @@ Return ONLY the example sentence, nothing else."""
         print(f"  Request error: {e}")
         return None
 
+def generate_valid_example(word, definition, part_of_speech, attempts=MAX_ATTEMPTS):
+    """Request examples until one passes validation.
+
+    Returns (example, None), or (None, reason the last attempt was rejected).
+    """
+    reason = "no response"
+    for attempt in range(attempts):
+        example = generate_example(word, definition, part_of_speech, attempt)
+        if example is None:
+            reason = "no response"
+            continue
+        reason = validate_example(word, example, definition)
+        if reason is None:
+            return example, None
+        if attempt < attempts - 1:
+            print(f"  {word}: retry({reason})")
+    return None, reason
+
+def generate_example_group(entries):
+    """Generate examples for several (word, definition, pos) entries in one request.
+
+    Returns {word: example} for the items that passed validation; callers
+    re-queue the rest individually.
+    """
+    word_lines = "\n".join(f'{n}. "{word}" ({pos}): {definition}'
+                           for n, (word, definition, pos) in enumerate(entries, 1))
+
+    prompt = f"""Generate ONE example sentence for EACH of the vocabulary words below.
+
+Words:
+{word_lines}
+
+Requirements for every sentence:
+- The sentence must clearly demonstrate the meaning of its word
+- Use the word naturally in context (not forced)
+- Make it suitable for SAT-level students
+- The sentence should be 15-25 words long
+- Do NOT include the definition in the sentence
+- The target word MUST appear exactly once in its sentence
+
+Return ONLY a JSON array with one object per word, in the same order:
+[{{"word": "<word>", "example": "<sentence>"}}]"""
+
+    data = {
+        "model": api_client.MODEL,
+        "max_tokens": 70 * len(entries) + 50,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ]
+    }
+
+    try:
+        response = api_client.post_message(API_KEY, data, timeout=60)
+        if response.status_code != 200:
+            print(f"  API Error {response.status_code}: {response.text[:100]}")
+            return {}
+        items = parse_json_array(response.json()['content'][0]['text'])
+    except Exception as e:
+        print(f"  Request error: {e}")
+        return {}
+
+    definitions = {word: definition for word, definition, _ in entries}
+    matched = match_items(list(definitions), items or [], 'example')
+    examples = {}
+    for word, item in matched.items():
+        example = item['example'].strip()
+        if validate_example(word, example, definitions[word]) is None:
+            examples[word] = example
+    return examples
+
+def generate_for_jobs(jobs):
+    """Generate examples for a group of (i, word, definition, pos) jobs.
+
+    Groups go out as one multi-word request; items that fail validation are
+    re-queued as single-word requests. Returns [(i, word, example, reason)],
+    with example None and the rejection reason for words that never passed.
+    """
+    examples = {}
+    if len(jobs) > 1:
+        examples = generate_example_group([(word, definition, pos) for _, word, definition, pos in jobs])
+
+    results = []
+    for i, word, definition, pos in jobs:
+        if word in examples:
+            results.append((i, word, examples[word], None))
+        else:
+            results.append((i, word, *generate_valid_example(word, definition, pos)))
+    return results
+
 def needs_new_example(word_entry):
     """Check if a word needs a new example sentence"""
     example = word_entry.get('example', '')
@@ -77,33 +170,43 @@ def needs_new_example(word_entry):
         return True
 
     # Has placeholder/template example
-    placeholder_phrases = [
-        "The student demonstrated",
-        "It is important to understand",
-        "Many scholars consider",
-        "The concept of",
-        "She showed great"
-    ]
-
-    for phrase in placeholder_phrases:
-        if phrase in example:
-            return True
-
-    return False
-
-def load_progress():
-    """Load progress from previous run"""
-    if os.path.exists(progress_path):
-        with open(progress_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {'processed': [], 'last_index': 0}
-
-def save_progress(progress):
-    """Save progress"""
-    with open(progress_path, 'w', encoding='utf-8') as f:
-        json.dump(progress, f)
+    return is_placeholder_example(example)
+
+def chunk_jobs(jobs, group_size):
+    return [jobs[n:n + group_size] for n in range(0, len(jobs), group_size)]
+
+async def generate_examples_async(jobs, concurrency, group_size=1):
+    """Run (i, word, definition, pos) jobs in groups with bounded concurrency.
+
+    Yields (i, word, example, reason) in completion order; callers use i to write results
+    back into the right slot.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    api_client.get_session(pool_size=concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def run(group):
+            async with semaphore:
+                return await loop.run_in_executor(executor, generate_for_jobs, group)
+
+        tasks = [asyncio.create_task(run(group)) for group in chunk_jobs(jobs, group_size)]
+        for task in asyncio.as_completed(tasks):
+            for result in await task:
+                yield result
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='number of in-flight API requests (1 = sequential)')
+    parser.add_argument('--group-size', type=int, default=1,
+                        help='words packed into each request (1 = one word per request)')
+    parser.add_argument('--level', type=int, help='only generate for words at this level')
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+
     # Load words
     print("Loading words...")
     with open(input_path, 'r', encoding='utf-8') as f:
@@ -111,20 +214,19 @@ def main():
 
     print(f"Loaded {len(words)} words")
 
-    # Load progress
-    progress = load_progress()
-    processed_ids = set(progress.get('processed', []))
+    # Load stage status (plus anything journaled by an interrupted run)
+    store, _ = open_stage('examples', words)
+    recovered = recover(words, journal_path, store, 'examples')
 
     # Count words needing new examples
-    words_to_process = []
-    for i, word in enumerate(words):
-        word_id = word.get('word', str(i))
-        if word_id not in processed_ids and needs_new_example(word):
-            words_to_process.append((i, word))
+    words_to_process = [(i, word) for i, word in entries_needing(store, words, 'examples', args.level)
+                        if needs_new_example(word)]
 
     print(f"Words needing new examples: {len(words_to_process)}")
 
     if len(words_to_process) == 0:
+        if recovered:
+            compact(words, journal_path, output_path)
         print("All words already have good examples!")
         return
 
@@ -132,54 +234,63 @@ def main():
     print("Starting generation...\n")
 
     # Process words
-    updated = 0
-    errors = 0
+    stats = {'updated': 0, 'errors': 0, 'done': 0}
+    total = len(words_to_process)
+    journal = Journal(journal_path, store, 'examples')
+
+    def record_result(i, word, example, reason):
+        stats['done'] += 1
+        print(f"[{stats['done']}/{total}] {word}...", end=" ", flush=True)
 
-    for idx, (i, word_entry) in enumerate(words_to_process):
+        if example:
+            words[i]['example'] = example
+            stats['updated'] += 1
+            print(f"OK")
+        else:
+            stats['errors'] += 1
+            print(f"ERROR ({reason})")
+
+        # Track progress (one fsync'd journal line per word)
+        journal.append(i, word, {'example': example} if example else {})
+
+    jobs = []
+    for i, word_entry in words_to_process:
         word = word_entry.get('word', '')
         definition = word_entry.get('definition', '')
         pos = word_entry.get('partOfSpeech', '')
 
-        print(f"[{idx+1}/{len(words_to_process)}] {word}...", end=" ", flush=True)
-
         if not definition:
-            print("SKIP (no definition)")
+            print(f"{word}... SKIP (no definition)")
             continue
 
-        example = generate_example(word, definition, pos)
+        jobs.append((i, word, definition, pos))
 
-        if example:
-            words[i]['example'] = example
-            updated += 1
-            print(f"OK")
-        else:
-            errors += 1
-            print("ERROR")
+    group_size = max(1, args.group_size)
+    if group_size > 1:
+        print(f"Packing {group_size} words per request\n")
 
-        # Track progress
-        progress['processed'].append(word)
-        progress['last_index'] = i
+    if args.concurrency > 1:
+        print(f"Running with {args.concurrency} concurrent requests\n")
 
-        # Save every 50 words
-        if (idx + 1) % 50 == 0:
-            print(f"\n--- Saving progress ({updated} updated, {errors} errors) ---\n")
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(words, f, ensure_ascii=False, indent=2)
-            save_progress(progress)
+        async def run_all():
+            async for result in generate_examples_async(jobs, args.concurrency, group_size):
+                record_result(*result)
 
-        # Rate limiting - Haiku allows many requests but let's be safe
-        time.sleep(0.2)
+        asyncio.run(run_all())
+    else:
+        for group in chunk_jobs(jobs, group_size):
+            for result in generate_for_jobs(group):
+                record_result(*result)
 
-    # Final save
+    # Final save: fold the journal into the main file
     print(f"\n\nSaving final results...")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(words, f, ensure_ascii=False, indent=2)
-    save_progress(progress)
+    journal.close()
+    compact(words, journal_path, output_path)
 
     print(f"\nDone!")
-    print(f"  Updated: {updated}")
-    print(f"  Errors: {errors}")
-    print(f"\nNext step: Re-import via import.html to update Firebase")
+    print(f"  Updated: {stats['updated']}")
+    print(f"  Errors: {stats['errors']}")
+    print(f"\nNext step: Export the changes with py firestore_export.py plan, then upload")
 
 if __name__ == "__main__":
     main()
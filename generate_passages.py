@@ -3,18 +3,21 @@ Generate Reading Passages and Definitions using Claude API
 Creates 3-sentence college-level passages for SAT practice questions.
 """
 
+import argparse
 import json
 import os
 import sys
 import time
-import requests
+
+import api_client
+from journal import Journal, compact, recover
+from text_normalize import generate_tldr
+from validators import match_items, parse_json_array, passage_violation, validate_passage
+from word_store import entries_needing, open_stage
 
 # Fix Unicode encoding for Windows console
 sys.stdout.reconfigure(encoding='utf-8')
 
-# API Configuration
-API_URL = "https://api.anthropic.com/v1/messages"
-
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
 # Load API key from file
@@ -24,10 +27,17 @@ with open(api_key_path, 'r') as f:
 
 input_path = os.path.join(script_dir, 'data/words_processed.json')
 output_path = os.path.join(script_dir, 'data/words_processed.json')
-progress_path = os.path.join(script_dir, 'data/passage_progress.json')
+journal_path = os.path.join(script_dir, 'data/passage_journal.jsonl')
+batch_requests_path = os.path.join(script_dir, 'data/passage_batch_requests.jsonl')
+batch_state_path = os.path.join(script_dir, 'data/passage_batch.json')
 
-def generate_passage_and_definition(word, current_definition, part_of_speech):
-    """Generate a 3-sentence passage and definition if missing"""
+BATCH_POLL_SECONDS = 30
+
+# Streamed attempts per word before giving up (aborted streams retry immediately)
+STREAM_ATTEMPTS = 3
+
+def build_passage_request(word, current_definition, part_of_speech):
+    """Build the Messages API request body for one word"""
 
     prompt = f"""For the vocabulary word "{word}" ({part_of_speech}):
 
@@ -45,46 +55,75 @@ Format your response EXACTLY like this:
 DEFINITION: [definition here]
 PASSAGE: [3-sentence passage here]"""
 
-    headers = {
-        "x-api-key": API_KEY,
-        "anthropic-version": "2023-06-01",
-        "content-type": "application/json"
-    }
-
-    data = {
-        "model": "claude-3-haiku-20240307",
+    return {
+        "model": api_client.MODEL,
         "max_tokens": 300,
         "messages": [
             {"role": "user", "content": prompt}
         ]
     }
 
+def choose_definition(current_definition, proposed_definition):
+    """Only use a new definition if the current one is missing/poor"""
+    if not current_definition or len(current_definition) < 10 or current_definition.startswith("(Definition needed"):
+        return proposed_definition
+    return current_definition
+
+def parse_passage_response(text, current_definition):
+    """Split a DEFINITION:/PASSAGE: response into (definition, passage)"""
+    definition = ""
+    passage = ""
+
+    if "DEFINITION:" in text and "PASSAGE:" in text:
+        parts = text.split("PASSAGE:")
+        definition_part = parts[0].replace("DEFINITION:", "").strip()
+        passage = parts[1].strip() if len(parts) > 1 else ""
+
+        definition = choose_definition(current_definition, definition_part)
+    else:
+        # Fallback: use whole response as passage
+        passage = text
+        definition = current_definition
+
+    return definition, passage
+
+def passage_check(word):
+    """Streaming check for a DEFINITION:/PASSAGE: response: only the passage part is validated"""
+    def check(text):
+        if "PASSAGE:" not in text:
+            return None
+        return passage_violation(word, text.split("PASSAGE:", 1)[1])
+    return check
+
+def stream_passage_and_definition(word, current_definition, part_of_speech):
+    """Like generate_passage_and_definition, but abandons a passage as soon as it breaks the rules"""
+    data = build_passage_request(word, current_definition, part_of_speech)
+
+    for attempt in range(STREAM_ATTEMPTS):
+        try:
+            text, reason = api_client.stream_message(API_KEY, data, check=passage_check(word), variant=attempt)
+        except Exception as e:
+            print(f"  Request error: {e}")
+            return None, None
+        if not reason:
+            return parse_passage_response(text.strip(), current_definition)
+        print(f"abort({reason})...", end=" ", flush=True)
+
+    return None, None
+
+def generate_passage_and_definition(word, current_definition, part_of_speech, stream=False):
+    """Generate a 3-sentence passage and definition if missing"""
+    if stream:
+        return stream_passage_and_definition(word, current_definition, part_of_speech)
+
+    data = build_passage_request(word, current_definition, part_of_speech)
+
     try:
-        response = requests.post(API_URL, headers=headers, json=data, timeout=30)
+        response = api_client.post_message(API_KEY, data, timeout=30)
         if response.status_code == 200:
             result = response.json()
             text = result['content'][0]['text'].strip()
-
-            # Parse response
-            definition = ""
-            passage = ""
-
-            if "DEFINITION:" in text and "PASSAGE:" in text:
-                parts = text.split("PASSAGE:")
-                definition_part = parts[0].replace("DEFINITION:", "").strip()
-                passage = parts[1].strip() if len(parts) > 1 else ""
-
-                # Only use new definition if current one is missing/poor
-                if not current_definition or len(current_definition) < 10 or current_definition.startswith("(Definition needed"):
-                    definition = definition_part
-                else:
-                    definition = current_definition
-            else:
-                # Fallback: use whole response as passage
-                passage = text
-                definition = current_definition
-
-            return definition, passage
+            return parse_passage_response(text, current_definition)
         else:
             print(f"  API Error {response.status_code}: {response.text[:100]}")
             return None, None
@@ -92,94 +131,236 @@ PASSAGE: [3-sentence passage here]"""
         print(f"  Request error: {e}")
         return None, None
 
-def load_progress():
-    """Load progress from previous run"""
-    if os.path.exists(progress_path):
-        with open(progress_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {'processed': []}
+def generate_passage_group(entries):
+    """Generate passages for several (word, definition, pos) entries in one request.
 
-def save_progress(progress):
-    """Save progress"""
-    with open(progress_path, 'w', encoding='utf-8') as f:
-        json.dump(progress, f)
+    Returns {word: (definition, passage)} for the items that passed validation;
+    callers re-queue the rest individually.
+    """
+    word_lines = "\n".join(f'{n}. "{word}" ({pos}) - current definition: {definition if definition else "MISSING"}'
+                           for n, (word, definition, pos) in enumerate(entries, 1))
 
-def main():
-    # Load words
-    print("Loading words...")
-    with open(input_path, 'r', encoding='utf-8') as f:
-        words = json.load(f)
+    prompt = f"""For EACH vocabulary word below:
 
-    print(f"Loaded {len(words)} words")
+Words:
+{word_lines}
 
-    # Load progress
-    progress = load_progress()
-    processed_words = set(progress.get('processed', []))
+1. If its current definition is missing or poor, provide a clear, concise definition (1 sentence); otherwise repeat the current one.
 
-    # Find words to process
-    words_to_process = []
-    for i, word in enumerate(words):
-        word_text = word.get('word', '')
-        if word_text not in processed_words:
-            words_to_process.append((i, word))
+2. Write a 3-sentence college-level reading passage where the word is used naturally and is ESSENTIAL to understanding the text. The passage should:
+- Be sophisticated and academic in tone
+- Provide enough context that a student could infer the word's meaning
+- Use the word exactly ONCE
+- Be about topics like: science, history, philosophy, literature, social issues, or current events
+- NOT be a simple example sentence - it should read like an excerpt from an academic text
 
-    print(f"Words to process: {len(words_to_process)}")
+Return ONLY a JSON array with one object per word, in the same order:
+[{{"word": "<word>", "definition": "<definition>", "passage": "<3-sentence passage>"}}]"""
 
-    if len(words_to_process) == 0:
-        print("All words already processed!")
-        return
+    data = {
+        "model": api_client.MODEL,
+        "max_tokens": 250 * len(entries) + 50,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ]
+    }
 
-    print(f"\nEstimated cost: ~${len(words_to_process) * 0.0005:.2f}")
-    print("Starting generation...\n")
+    try:
+        response = api_client.post_message(API_KEY, data, timeout=90)
+        if response.status_code != 200:
+            print(f"  API Error {response.status_code}: {response.text[:100]}")
+            return {}
+        items = parse_json_array(response.json()['content'][0]['text'])
+    except Exception as e:
+        print(f"  Request error: {e}")
+        return {}
+
+    current = {word: definition for word, definition, _ in entries}
+    matched = match_items(list(current), items or [], 'passage')
+    results = {}
+    for word, item in matched.items():
+        passage = item['passage'].strip()
+        if validate_passage(word, passage) is None:
+            proposed = item.get('definition') if isinstance(item.get('definition'), str) else ''
+            results[word] = (choose_definition(current[word], proposed.strip()), passage)
+    return results
+
+def apply_passage(word_entry, new_def, passage):
+    """Write a generated passage (and improved definition) into a word entry; returns the changed fields"""
+    fields = {'passage': passage}
+    if new_def and new_def != word_entry.get('definition', ''):
+        fields['definition'] = new_def
+        # Update tldr too (same rule as process_vocab)
+        fields['tldr'] = generate_tldr(new_def) or word_entry.get('tldr', '')
+    word_entry.update(fields)
+    return fields
+
+def build_batch_file(words_to_process):
+    """Write one batch request line per word; custom_id carries the words[] index"""
+    with open(batch_requests_path, 'w', encoding='utf-8') as f:
+        for i, word_entry in words_to_process:
+            params = build_passage_request(word_entry.get('word', ''),
+                                           word_entry.get('definition', ''),
+                                           word_entry.get('partOfSpeech', ''))
+            f.write(json.dumps({"custom_id": f"word-{i}", "params": params}, ensure_ascii=False) + "\n")
+    print(f"Wrote {len(words_to_process)} batch requests to {batch_requests_path}")
+
+def submit_batch():
+    """Submit the batch request file and remember the batch id for resuming"""
+    with open(batch_requests_path, 'r', encoding='utf-8') as f:
+        batch_requests = [json.loads(line) for line in f if line.strip()]
+
+    batch = api_client.create_batch(API_KEY, batch_requests)
+    with open(batch_state_path, 'w', encoding='utf-8') as f:
+        json.dump({'id': batch['id']}, f)
+    print(f"Submitted batch {batch['id']} ({len(batch_requests)} requests)")
+    return batch['id']
+
+def wait_for_batch(batch_id, poll_seconds=BATCH_POLL_SECONDS):
+    """Poll until the batch has ended and return the final batch object"""
+    while True:
+        batch = api_client.get_batch(API_KEY, batch_id)
+        counts = batch.get('request_counts', {})
+        print(f"  {batch.get('processing_status')}: {counts.get('succeeded', 0)} succeeded, "
+              f"{counts.get('errored', 0)} errored, {counts.get('processing', 0)} processing")
+        if batch.get('processing_status') == 'ended':
+            return batch
+        time.sleep(poll_seconds)
+
+def run_batch(words, words_to_process, journal, poll_seconds):
+    """Generate all passages through the Message Batches API"""
+    # Resume a batch submitted by an earlier run instead of paying twice
+    if os.path.exists(batch_state_path):
+        with open(batch_state_path, 'r', encoding='utf-8') as f:
+            batch_id = json.load(f)['id']
+        print(f"Resuming batch {batch_id}")
+    else:
+        build_batch_file(words_to_process)
+        batch_id = submit_batch()
+
+    batch = wait_for_batch(batch_id, poll_seconds)
 
-    # Process words
     updated = 0
     errors = 0
+    for line in api_client.iter_batch_results(API_KEY, batch):
+        i = int(line['custom_id'].split('-', 1)[1])
+        word = words[i].get('word', '')
+        result = line.get('result', {})
+
+        if result.get('type') == 'succeeded':
+            text = result['message']['content'][0]['text'].strip()
+            new_def, passage = parse_passage_response(text, words[i].get('definition', ''))
+            if passage:
+                fields = apply_passage(words[i], new_def, passage)
+                journal.append(i, word, fields)
+                updated += 1
+                continue
+
+        # Errored/expired/canceled entries are marked as errors so the next run retries them
+        journal.append(i, word, {}, status='error')
+        errors += 1
+        print(f"  {word}: {result.get('type', 'missing')}")
+
+    os.remove(batch_state_path)
+    return updated, errors
+
+def run_sequential(words, words_to_process, journal, group_size=1, stream=False):
+    """Generate passages one request per word, or group_size words per request"""
+    updated = 0
+    errors = 0
+    grouped = {}
 
     for idx, (i, word_entry) in enumerate(words_to_process):
         word = word_entry.get('word', '')
         definition = word_entry.get('definition', '')
         pos = word_entry.get('partOfSpeech', '')
 
+        if group_size > 1 and idx % group_size == 0:
+            group = words_to_process[idx:idx + group_size]
+            grouped = generate_passage_group([(w.get('word', ''), w.get('definition', ''), w.get('partOfSpeech', ''))
+                                              for _, w in group])
+
         print(f"[{idx+1}/{len(words_to_process)}] {word}...", end=" ", flush=True)
 
-        new_def, passage = generate_passage_and_definition(word, definition, pos)
+        if word in grouped:
+            new_def, passage = grouped[word]
+        else:
+            # Not grouped, or the group's item failed validation: re-queue on its own
+            new_def, passage = generate_passage_and_definition(word, definition, pos, stream)
 
+        fields = {}
         if passage:
-            words[i]['passage'] = passage
-            if new_def and new_def != definition:
-                words[i]['definition'] = new_def
-                # Update tldr too
-                words[i]['tldr'] = new_def.split('.')[0][:50] if new_def else word
+            fields = apply_passage(words[i], new_def, passage)
             updated += 1
             print(f"OK")
         else:
             errors += 1
             print("ERROR")
 
-        # Track progress
-        progress['processed'].append(word)
+        # Track progress (one fsync'd journal line per word)
+        journal.append(i, word, fields)
+
+    return updated, errors
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch', action='store_true',
+                        help='use the Message Batches API instead of one request per word')
+    parser.add_argument('--poll', type=float, default=BATCH_POLL_SECONDS,
+                        help='seconds between batch status checks')
+    parser.add_argument('--group-size', type=int, default=1,
+                        help='words packed into each request (1 = one word per request)')
+    parser.add_argument('--stream', action='store_true',
+                        help='stream single-word requests and retry as soon as a passage repeats the word')
+    parser.add_argument('--level', type=int, help='only generate for words at this level')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    # Load words
+    print("Loading words...")
+    with open(input_path, 'r', encoding='utf-8') as f:
+        words = json.load(f)
+
+    print(f"Loaded {len(words)} words")
+
+    # Load stage status (plus anything journaled by an interrupted run)
+    store, _ = open_stage('passages', words)
+    recovered = recover(words, journal_path, store, 'passages')
+
+    # Find words to process
+    words_to_process = list(entries_needing(store, words, 'passages', args.level))
+
+    print(f"Words to process: {len(words_to_process)}")
+
+    if len(words_to_process) == 0 and not os.path.exists(batch_state_path):
+        if recovered:
+            compact(words, journal_path, output_path)
+        print("All words already processed!")
+        return
 
-        # Save every 50 words
-        if (idx + 1) % 50 == 0:
-            print(f"\n--- Saving progress ({updated} updated, {errors} errors) ---\n")
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(words, f, ensure_ascii=False, indent=2)
-            save_progress(progress)
+    journal = Journal(journal_path, store, 'passages')
 
-        # Rate limiting
-        time.sleep(0.2)
+    if args.batch:
+        # Batches are billed at half the per-request price
+        print(f"\nEstimated cost: ~${len(words_to_process) * 0.00025:.2f}")
+        print("Starting batch generation...\n")
+        updated, errors = run_batch(words, words_to_process, journal, args.poll)
+    else:
+        print(f"\nEstimated cost: ~${len(words_to_process) * 0.0005:.2f}")
+        print("Starting generation...\n")
+        updated, errors = run_sequential(words, words_to_process, journal, max(1, args.group_size), args.stream)
 
-    # Final save
+    # Final save: fold the journal into the main file
     print(f"\n\nSaving final results...")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(words, f, ensure_ascii=False, indent=2)
-    save_progress(progress)
+    journal.close()
+    compact(words, journal_path, output_path)
 
     print(f"\nDone!")
     print(f"  Updated: {updated}")
     print(f"  Errors: {errors}")
-    print(f"\nNext step: Clear Firebase and re-import via import.html")
+    print(f"\nNext step: Export the changes with py firestore_export.py plan, then upload")
 
 if __name__ == "__main__":
     main()
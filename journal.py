@@ -0,0 +1,171 @@
+"""
+Append-only result journal for the Ad Infinitum generators.
+Each finished word is appended as one fsync'd JSONL line (and its stage status
+recorded in the word store) instead of re-dumping words_processed.json every
+50 words. At the end of a run (or on demand) the journal is compacted into the
+main file with an atomic rename.
+
+Compact any leftover journals by hand:
+    py journal.py compact
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+words_path = os.path.join(script_dir, 'data/words_processed.json')
+
+# Journal used by each generator stage
+JOURNALS = {
+    'examples': 'data/generation_journal.jsonl',
+    'passages': 'data/passage_journal.jsonl',
+    'fix': 'data/fix_passage_journal.jsonl',
+    'enrich': 'data/enrich_journal.jsonl',
+}
+
+def atomic_write_json(path, obj, **dump_kwargs):
+    """Write JSON to a temp file in the same directory, fsync, then rename over path"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def record_status(record):
+    """Stage status for a journal record: explicit, else done/error by whether fields were produced"""
+    return record.get('status') or ('done' if record['fields'] else 'error')
+
+def repair_tail(path):
+    """Cut a journal back to its last complete record, so new records start on a line of their own.
+
+    read_journal stops at the first unreadable line, so anything appended after
+    a torn line would otherwise be lost on the next recovery.
+    """
+    if not os.path.exists(path):
+        return
+    valid = 0
+    ends_line = True
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                json.loads(line)
+            except ValueError:
+                break
+            valid += len(line)
+            ends_line = line.endswith(b'\n')
+    with open(path, 'r+b') as f:
+        f.truncate(valid)
+        if not ends_line:
+            # A complete record whose newline never made it to disk
+            f.seek(valid)
+            f.write(b'\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+class Journal:
+    """Crash-safe append-only log of per-word results for one stage"""
+
+    def __init__(self, path, store=None, stage=None):
+        self.path = path
+        self.store = store
+        self.stage = stage
+        repair_tail(path)
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def append(self, i, word, fields=None, status=None):
+        """Record that words[i] was processed, with the fields it should be updated with"""
+        record = {'i': i, 'word': word, 'fields': fields or {}}
+        if status:
+            record['status'] = status
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        if self.store is not None:
+            self.store.mark(self.stage, word, record_status(record), record['fields'])
+
+    def close(self):
+        self.file.close()
+
+def read_journal(path):
+    """Load journal records, ignoring a torn final line from a crash mid-write"""
+    records = []
+    if not os.path.exists(path):
+        return records
+    # Binary, so a line torn inside a multibyte character fails on its own
+    # instead of breaking the decoding of the whole file
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+    return records
+
+def replay(words, records):
+    """Apply journal records to words in place; returns the records that matched a word"""
+    index_by_word = None
+    applied = []
+    for record in records:
+        i = record['i']
+        if i >= len(words) or words[i].get('word') != record['word']:
+            # The words file was rebuilt since the journal was written; fall back to lookup by word
+            if index_by_word is None:
+                index_by_word = {w.get('word'): n for n, w in enumerate(words)}
+            i = index_by_word.get(record['word'])
+            if i is None:
+                continue
+        words[i].update(record['fields'])
+        applied.append(record)
+    return applied
+
+def recover(words, journal_path, store, stage):
+    """Fold a journal left behind by an interrupted run into words and the store"""
+    records = read_journal(journal_path)
+    if records:
+        applied = replay(words, records)
+        for record in applied:
+            store.mark(stage, record['word'], record_status(record), record['fields'])
+        print(f"Recovered {len(applied)} results from {os.path.basename(journal_path)}")
+    return len(records)
+
+def compact(words, journal_path, output_path):
+    """Atomically write the words file, then drop the journal"""
+    atomic_write_json(output_path, words, ensure_ascii=False, indent=2)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
+
+def compact_all():
+    """Fold every leftover journal into words_processed.json"""
+    from word_store import WordStore
+
+    with open(words_path, 'r', encoding='utf-8') as f:
+        words = json.load(f)
+
+    store = WordStore()
+    for stage, journal_rel in JOURNALS.items():
+        journal_path = os.path.join(script_dir, journal_rel)
+        if not os.path.exists(journal_path):
+            continue
+
+        recover(words, journal_path, store, stage)
+        compact(words, journal_path, words_path)
+        print(f"Compacted {stage} journal")
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'compact'
+    if command != 'compact':
+        print(f"Unknown command: {command} (expected compact)")
+        sys.exit(1)
+    compact_all()
+
+if __name__ == "__main__":
+    main()
@@ -137,6 +137,8 @@ const TOTAL_MODULES = 5;
 
 let quizAllWords = []; // All available words for current filter
 let allWordsCache = []; // Cache of all words for distractors
+let quizShardIndex; // data/quiz/index.json (null when shards aren't published)
+let quizShards = {}; // level -> words from data/quiz/level-N.json
 let moduleQueue = []; // Current module's question queue
 let wrongAnswers = []; // Words answered incorrectly (to repeat)
 let usedWordIds = new Set(); // Track words used across all modules in session
@@ -190,31 +192,62 @@ function restoreQuizCard() {
     }
 }
 
+// Per-level quiz shards with precomputed distractors (built by quiz_shards.py)
+async function loadQuizShard(level) {
+    if (quizShardIndex === undefined) {
+        try {
+            const response = await fetch('data/quiz/index.json', { cache: 'no-cache' });
+            quizShardIndex = response.ok ? await response.json() : null;
+        } catch (e) {
+            quizShardIndex = null;
+        }
+    }
+    const entry = quizShardIndex?.levels?.[level];
+    if (!entry) return null;
+
+    if (!quizShards[level]) {
+        // The content hash in the URL lets the browser cache each shard until it is rebuilt
+        const response = await fetch(`data/quiz/${entry.file}?v=${entry.hash}`);
+        if (!response.ok) return null;
+        quizShards[level] = (await response.json()).words;
+    }
+    return quizShards[level];
+}
+
+// All words (cached): from the shards when published, else the whole words collection
+async function loadAllWords() {
+    if (allWordsCache.length === 0) {
+        await loadQuizShard(1);
+        if (quizShardIndex) {
+            const shards = await Promise.all(Object.keys(quizShardIndex.levels).map(loadQuizShard));
+            allWordsCache = shards.filter(Boolean).flat();
+        } else {
+            const allSnapshot = await db.collection('words').get();
+            allWordsCache = [];
+            allSnapshot.forEach(doc => {
+                allWordsCache.push({ id: doc.id, ...doc.data() });
+            });
+        }
+    }
+    return allWordsCache;
+}
+
 async function loadQuizQuestion() {
     const filter = document.getElementById('level-select').value;
 
     // Reload difficult words in case they were updated in flashcards
     await loadDifficultWords();
 
-    // Load all words for distractor pool (cached)
-    if (allWordsCache.length === 0) {
-        const allSnapshot = await db.collection('words').get();
-        allWordsCache = [];
-        allSnapshot.forEach(doc => {
-            allWordsCache.push({ id: doc.id, ...doc.data() });
-        });
-    }
-
     // Load words based on filter
     if (filter === 'difficult') {
         if (difficultWords.length === 0) {
             showQuizMessage('bookmark', 'No difficult words marked yet.', 'Mark words as difficult in Flashcards to practice them here.');
             return;
         }
-        quizAllWords = allWordsCache.filter(w => difficultWords.includes(w.id));
+        quizAllWords = (await loadAllWords()).filter(w => difficultWords.includes(w.id));
     } else {
         const level = parseInt(filter);
-        quizAllWords = allWordsCache.filter(w => w.level === level);
+        quizAllWords = await loadQuizShard(level) || (await loadAllWords()).filter(w => w.level === level);
     }
 
     if (quizAllWords.length < 4) {
@@ -277,6 +310,14 @@ function initializeModule() {
 }
 
 async function loadDistractors() {
+    // Precomputed distractors from the quiz shards: any 3 of them
+    if (currentWord.distractors?.length >= 3) {
+        const picks = [...currentWord.distractors].sort(() => Math.random() - 0.5).slice(0, 3);
+        currentOptions = [currentWord, ...picks].sort(() => Math.random() - 0.5);
+        return;
+    }
+    await loadAllWords();
+
     const currentPOS = currentWord.partOfSpeech?.toLowerCase() || '';
     const currentLevel = currentWord.level || 1;
 
@@ -951,6 +992,27 @@ function updateSessionStats() {
     document.getElementById('streak-count').textContent = userProfile.currentStreak || 0;
 }
 
+// ==================== PROGRESS SUMMARY ====================
+
+// users/{uid}/summary/progress, written by progress_rollups.py: per-level counts,
+// the level of every word with progress, and review words with their fields
+async function loadProgressSummary() {
+    try {
+        const doc = await db.collection('users').doc(currentUser.uid)
+            .collection('summary').doc('progress').get();
+        return doc.exists ? doc.data() : null;
+    } catch (e) {
+        return null;
+    }
+}
+
+// Word fields from the summary when it has them, otherwise one read
+async function getReviewWord(wordId, summaryWords) {
+    if (summaryWords.has(wordId)) return summaryWords.get(wordId);
+    const wordDoc = await db.collection('words').doc(wordId).get();
+    return wordDoc.exists ? wordDoc.data() : null;
+}
+
 // ==================== REVIEW SECTION ====================
 
 let reviewQueue = [];
@@ -961,17 +1023,23 @@ async function loadReviewWords() {
     reviewQueue = [];
     const addedIds = new Set();
 
+    // Wrong answers and due dates come from live data; word fields from the summary
+    const [userDoc, summary] = await Promise.all([
+        db.collection('users').doc(currentUser.uid).get(),
+        loadProgressSummary()
+    ]);
+    const summaryWords = new Map((summary?.review || []).map(({ id, ...fields }) => [id, fields]));
+
     // First, load wrong answers from practice (priority)
-    const userDoc = await db.collection('users').doc(currentUser.uid).get();
     const savedWrongAnswers = userDoc.data()?.wrongAnswers || [];
 
     for (const wrong of savedWrongAnswers) {
         if (!addedIds.has(wrong.wordId)) {
-            const wordDoc = await db.collection('words').doc(wrong.wordId).get();
-            if (wordDoc.exists) {
+            const wordData = await getReviewWord(wrong.wordId, summaryWords);
+            if (wordData) {
                 reviewQueue.push({
                     id: wrong.wordId,
-                    ...wordDoc.data(),
+                    ...wordData,
                     isWrongAnswer: true,
                     wrongTimestamp: wrong.timestamp
                 });
@@ -983,9 +1051,9 @@ async function loadReviewWords() {
     // Then add spaced repetition due words
     for (const [wordId, progress] of Object.entries(userProgress)) {
         if (!addedIds.has(wordId) && progress.nextReview && progress.nextReview.toDate() <= now) {
-            const wordDoc = await db.collection('words').doc(wordId).get();
-            if (wordDoc.exists) {
-                reviewQueue.push({ id: wordId, ...wordDoc.data(), progress });
+            const wordData = await getReviewWord(wordId, summaryWords);
+            if (wordData) {
+                reviewQueue.push({ id: wordId, ...wordData, progress });
                 addedIds.add(wordId);
             }
         }
@@ -1122,20 +1190,34 @@ async function loadLevelProgress() {
     const levelBars = document.getElementById('level-bars');
     levelBars.innerHTML = '<p style="color: var(--gray-500); text-align: center;">Loading...</p>';
 
-    let html = '';
+    const summary = await loadProgressSummary();
+    const totals = {};
     for (let level = 1; level <= 5; level++) {
-        const totalSnapshot = await db.collection('words')
-            .where('level', '==', level)
-            .get();
-        const totalWords = totalSnapshot.size;
+        if (summary) {
+            totals[level] = summary.levels?.[level]?.total || 0;
+        } else {
+            const totalSnapshot = await db.collection('words')
+                .where('level', '==', level)
+                .get();
+            totals[level] = totalSnapshot.size;
+        }
+    }
 
-        let learnedCount = 0;
-        for (const [wordId, progress] of Object.entries(userProgress)) {
+    // Words with progress since the summary was built (or without a summary) are read once each
+    const wordLevels = { ...(summary?.wordLevels || {}) };
+    const learned = {};
+    for (const wordId of Object.keys(userProgress)) {
+        if (!(wordId in wordLevels)) {
             const wordDoc = await db.collection('words').doc(wordId).get();
-            if (wordDoc.exists && wordDoc.data().level === level) {
-                learnedCount++;
-            }
+            wordLevels[wordId] = wordDoc.exists ? wordDoc.data().level : null;
         }
+        learned[wordLevels[wordId]] = (learned[wordLevels[wordId]] || 0) + 1;
+    }
+
+    let html = '';
+    for (let level = 1; level <= 5; level++) {
+        const totalWords = totals[level];
+        const learnedCount = learned[level] || 0;
 
         const percentage = totalWords > 0 ? Math.round((learnedCount / totalWords) * 100) : 0;
         const levelNames = ['', 'Basic', 'Elementary', 'Intermediate', 'Advanced', 'Expert'];
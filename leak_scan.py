@@ -0,0 +1,118 @@
+"""
+Corpus-wide vocabulary leak scanner for Ad Infinitum.
+Compiles every vocabulary entry (with its inflected and phrasal-verb forms) into
+one word_matcher automaton, then scans every passage and example in a single
+pass. Reports:
+  - self-repeats: the target word appears more than once, or not at all
+  - leaks: another quiz word appears in the text and could be shown as one of
+    the answer choices (same level, or a level 4/5 word - see the distractor
+    pool in js/app.js), giving the question away
+
+Run before importing; exits 1 on self-repeats (and on leaks with --strict):
+    py leak_scan.py
+    py leak_scan.py --strict --json data/leak_report.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from word_matcher import WordMatcher, match_key, tokenize
+
+# Fix Unicode encoding for Windows console
+sys.stdout.reconfigure(encoding='utf-8')
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+words_path = os.path.join(script_dir, 'data/words_processed.json')
+
+FIELDS = ('passage', 'example')
+
+# Levels always in the distractor pool, whatever the target word's level
+HARD_LEVELS = {4, 5}
+
+def scan_text(matcher, tokens, key):
+    """Return (self_count, leaked keys) for one text whose target word is `key`"""
+    hits = matcher.outputs(tokens)
+    # Another entry matching exactly where the target does ("contented" for content) is the target
+    own = {(end, length) for end, matches in hits for length, entry in matches if entry == key}
+
+    count = 0
+    leaked = set()
+    # Sweep from the end, longest match first: a match starting at or after
+    # `covered` lies inside one already seen ("account" within "account for")
+    covered = len(tokens)
+    for end, matches in reversed(hits):
+        for length, entry in matches:
+            start = end - length + 1
+            if entry == key:
+                count += 1
+            elif (end, length) not in own and start < covered:
+                leaked.add(entry)
+            covered = min(covered, start)
+    return count, leaked
+
+def could_be_choice(target_level, other_level):
+    """Whether a word at other_level can appear among the answer choices for target_level"""
+    return other_level == target_level or other_level in HARD_LEVELS
+
+def scan_corpus(words):
+    """Scan every passage/example; returns a list of issue dicts"""
+    matcher = WordMatcher(w.get('word', '') for w in words)
+    levels = {match_key(w.get('word', '')): w.get('level') for w in words}
+
+    issues = []
+    for i, w in enumerate(words):
+        word = w.get('word', '')
+        key = match_key(word)
+        for field in FIELDS:
+            text = w.get(field) or ''
+            if not text.strip():
+                continue
+            count, leaked = scan_text(matcher, tokenize(text), key)
+            if count != 1:
+                issues.append({'i': i, 'word': word, 'field': field, 'type': 'self', 'count': count})
+            spoilers = sorted(k for k in leaked if could_be_choice(w.get('level'), levels.get(k)))
+            if spoilers:
+                issues.append({'i': i, 'word': word, 'field': field, 'type': 'leak', 'leaked': spoilers})
+    return issues
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--input', default=words_path, help='words file to scan')
+    parser.add_argument('--strict', action='store_true', help='also fail on leaked quiz words')
+    parser.add_argument('--show', type=int, default=20, help='issues to print per category')
+    parser.add_argument('--json', metavar='PATH', help='write the full issue list to PATH')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    with open(args.input, 'r', encoding='utf-8') as f:
+        words = json.load(f)
+
+    start = time.perf_counter()
+    issues = scan_corpus(words)
+    elapsed = time.perf_counter() - start
+
+    repeats = [issue for issue in issues if issue['type'] == 'self']
+    leaks = [issue for issue in issues if issue['type'] == 'leak']
+
+    print(f"Scanned {len(words)} words in {elapsed:.2f}s")
+    print(f"  Self-repeats / missing: {len(repeats)}")
+    for issue in repeats[:args.show]:
+        print(f"    {issue['word']} ({issue['field']}): x{issue['count']}")
+    print(f"  Leaked quiz words: {len(leaks)}")
+    for issue in leaks[:args.show]:
+        print(f"    {issue['word']} ({issue['field']}): {', '.join(issue['leaked'])}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(issues, f, ensure_ascii=False, indent=2)
+        print(f"\nWrote {len(issues)} issues to {args.json}")
+
+    if repeats or (args.strict and leaks):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
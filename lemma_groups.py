@@ -0,0 +1,116 @@
+"""
+Lemma grouping for the Ad Infinitum word list.
+Normalizes words_raw.json (case, spacing, exact duplicates) and clusters -s
+inflections under one lemma - "accounts for" under "account for", "fads" under
+"fad" - so process_vocab fetches one dictionary definition per cluster and
+reuses it for the members when the lemma is a noun or verb.
+
+-ed/-ing headwords ("Exacting", "daunting"), derived words ("abjectly") and
+phrasal verbs ("abide by") are listed for a meaning of their own, so they keep
+their own lookup.
+
+Report the clusters:
+    py lemma_groups.py
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from word_matcher import FUNCTION_WORDS, apply_suffix, match_key
+
+# Fix Unicode encoding for Windows console
+sys.stdout.reconfigure(encoding='utf-8')
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+raw_path = os.path.join(script_dir, 'data/words_raw.json')
+
+# Suffixes that change a word's form but not its dictionary meaning
+INFLECTIONS = ('s',)
+
+def inflections(key):
+    """Regularly inflected keys of a normalized word or phrase.
+
+    Phrases inflect their first content word ("account for" -> "accounts for").
+    """
+    tokens = key.split()
+    positions = [n for n, token in enumerate(tokens) if token not in FUNCTION_WORDS]
+    if not positions:
+        return set()
+    n = positions[0]
+    return {' '.join(tokens[:n] + [apply_suffix(tokens[n], suffix)] + tokens[n + 1:]) for suffix in INFLECTIONS}
+
+def normalize_words(raw_words):
+    """Strip blanks and drop case/spacing duplicates, keeping the first spelling"""
+    seen = set()
+    words = []
+    for word in raw_words:
+        word = ' '.join(word.split())
+        key = match_key(word)
+        if key and key not in seen:
+            seen.add(key)
+            words.append(word)
+    return words
+
+def lemma_map(words):
+    """{word: lemma word} for every word whose lemma is another listed word"""
+    by_key = {match_key(word): word for word in words}
+    base_of = {}
+    for key in by_key:
+        for form in inflections(key):
+            if form != key:
+                base_of.setdefault(form, key)
+
+    lemmas = {}
+    for key, word in by_key.items():
+        lemma = key
+        seen = {key}
+        # Follow chains without looping (a listed word can also look like an inflection of another)
+        while lemma in base_of and base_of[lemma] not in seen:
+            lemma = base_of[lemma]
+            seen.add(lemma)
+        if lemma != key:
+            lemmas[word] = by_key[lemma]
+    return lemmas
+
+def group_words(raw_words):
+    """Cluster words by lemma; returns [(lemma, [members...])] in first-seen order.
+
+    The lemma itself is always the first member.
+    """
+    words = normalize_words(raw_words)
+    lemmas = lemma_map(words)
+    groups = {}
+    for word in words:
+        lemma = lemmas.get(word, word)
+        groups.setdefault(lemma, [lemma])
+        if word != lemma:
+            groups[lemma].append(word)
+    return list(groups.items())
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--input', default=raw_path, help='raw word list')
+    parser.add_argument('--show', type=int, default=30, help='multi-word clusters to print')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    with open(args.input, 'r', encoding='utf-8') as f:
+        raw_words = json.load(f)
+
+    words = normalize_words(raw_words)
+    groups = group_words(raw_words)
+    clustered = [(lemma, members) for lemma, members in groups if len(members) > 1]
+
+    print(f"Raw words: {len(raw_words)}")
+    print(f"After normalization: {len(words)} ({len(raw_words) - len(words)} duplicates dropped)")
+    print(f"Lemma clusters: {len(groups)} ({len(words) - len(groups)} dictionary lookups saved)")
+    for lemma, members in clustered[:args.show]:
+        print(f"  {lemma}: {', '.join(members[1:])}")
+    if len(clustered) > args.show:
+        print(f"  ... and {len(clustered) - args.show} more")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+Local stand-in for the Anthropic Messages API and the free dictionary API.
+Answers /v1/messages, the Message Batches endpoints and
+/api/v2/entries/en/{word} with canned text so the scripts can be exercised
+without spending money:
+
+    py mock_api_server.py --port 8765 --stream-delay 0.02
+    set ANTHROPIC_BASE_URL=http://127.0.0.1:8765
+    set DICTIONARY_BASE_URL=http://127.0.0.1:8765
+    py generate_passages.py --batch --poll 1
+
+Messages and dictionary requests can be made slow and unreliable: a log-normal
+latency (--latency is the median, --latency-sigma the spread) and a share of
+429s, 5xx errors and malformed bodies:
+
+    py mock_api_server.py --latency 0.2 --latency-sigma 0.8 --rate-429 0.02 --rate-5xx 0.01 --malformed 0.005
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+def extract_word(prompt):
+    """The target word is the first double-quoted string in every prompt"""
+    match = re.search(r'"([^"]+)"', prompt)
+    return match.group(1) if match else "word"
+
+def fake_passage(word):
+    return (f"Historians studying the period observed how reformers chose to {word} when confronted with uncertainty. "
+            "Their decisions reshaped civic institutions for several generations. "
+            "Modern scholars continue to debate whether those choices were wise or merely expedient.")
+
+def fake_example(word):
+    return (f"During the long debate, the committee decided to {word} the proposal after weighing "
+            "every argument that the students had carefully presented.")
+
+def fake_completion(prompt):
+    """Produce a plausible response for whichever generator sent the prompt"""
+    if "JSON array" in prompt:
+        # Multi-word prompts list their words as: 1. "word" (pos)...
+        words = re.findall(r'^\d+\. "([^"]+)"', prompt, re.MULTILINE)
+        if '"passage"' in prompt:
+            items = [{"word": w, "definition": f"A stand-in definition for {w}.", "passage": fake_passage(w)} for w in words]
+        else:
+            items = [{"word": w, "example": fake_example(w)} for w in words]
+        return json.dumps(items)
+
+    word = extract_word(prompt)
+    if "JSON object" in prompt:
+        return json.dumps({
+            "definition": f"A stand-in definition for {word}.",
+            "partOfSpeech": "verb",
+            "tldr": "Stand-in meaning",
+            "example": fake_example(word),
+            "passage": fake_passage(word),
+            "korean": "대체 의미"
+        }, ensure_ascii=False)
+    if "DEFINITION:" in prompt:
+        return f"DEFINITION: A stand-in definition for {word}.\nPASSAGE: {fake_passage(word)}"
+    if "passage" in prompt.lower():
+        return fake_passage(word)
+    return fake_example(word)
+
+def dictionary_response(word):
+    """A dictionaryapi.dev-style payload (no example, like many real entries)"""
+    return [{
+        "word": word,
+        "phonetic": "",
+        "meanings": [{
+            "partOfSpeech": "verb",
+            "definitions": [{"definition": f"To {word} something, in a stand-in sense used for testing."}]
+        }]
+    }]
+
+def message_response(body):
+    """Build a Messages API response object for a request body"""
+    prompt = body['messages'][-1]['content']
+    text = fake_completion(prompt)
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get('model', ''),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4}
+    }
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # Set by make_server
+    batches = None
+    batch_delay = 0.0
+    stream_delay = 0.0
+    faults = None
+    seed = None
+    seen = None
+    seen_lock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get('content-length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def request_rng(self, body):
+        """Random source for one request.
+
+        With a seed, it depends only on the request and how often it was sent
+        before, so a run gets the same latencies and faults whatever order its
+        threads send in (a retry draws again).
+        """
+        if self.seed is None:
+            return random
+        digest = hashlib.sha1(self.path.encode('utf-8') + body).hexdigest()
+        with self.seen_lock:
+            count = self.seen[digest] = self.seen.get(digest, 0) + 1
+        return random.Random(f"{self.seed}:{digest}:{count}")
+
+    def inject_fault(self, body=b''):
+        """Wait out the simulated latency, then maybe answer with an error.
+
+        Returns 'malformed' if the caller should send a broken body, True if an
+        error response was already sent.
+        """
+        faults = self.faults
+        rng = self.request_rng(body)
+        if faults['latency'] > 0:
+            time.sleep(rng.lognormvariate(0, faults['latency_sigma']) * faults['latency'])
+        roll = rng.random()
+        if roll < faults['rate_429']:
+            self.send_response(429)
+            body = json.dumps({"type": "error", "error": {"type": "rate_limit_error", "message": "mock"}}).encode()
+            self.send_header('retry-after', str(faults['retry_after']))
+            self.send_header('content-type', 'application/json')
+            self.send_header('content-length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return True
+        roll -= faults['rate_429']
+        if roll < faults['rate_5xx']:
+            status = rng.choice((500, 503, 529))
+            self.send_json(status, {"type": "error", "error": {"type": "api_error", "message": "mock"}})
+            return True
+        roll -= faults['rate_5xx']
+        if roll < faults['malformed']:
+            return 'malformed'
+        return False
+
+    def send_malformed(self):
+        """200 with a truncated JSON body"""
+        body = b'{"id": "msg_mock", "type": "message", "content": [{"type": "te'
+        self.send_response(200)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path == '/v1/messages':
+            body = self.read_json()
+            fault = self.inject_fault(json.dumps(body, sort_keys=True).encode('utf-8'))
+            if fault is True:
+                return
+            if body.get('stream'):
+                self.send_stream(message_response(body), malformed=fault == 'malformed')
+            elif fault == 'malformed':
+                self.send_malformed()
+            else:
+                self.send_json(200, message_response(body))
+        elif self.path == '/v1/messages/batches':
+            self.create_batch(self.read_json())
+        else:
+            self.send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+    def send_stream(self, message, malformed=False):
+        """Send a message as server-sent events, a few words per text delta.
+
+        A malformed stream breaks off with an unparseable event halfway through.
+        """
+        text = message['content'][0]['text']
+        start = dict(message, content=[], stop_reason=None)
+        events = [
+            ('message_start', {"type": "message_start", "message": start}),
+            ('content_block_start', {"type": "content_block_start", "index": 0,
+                                     "content_block": {"type": "text", "text": ""}}),
+        ]
+        for piece in re.findall(r'\S+(?:\s+\S+){0,2}\s*', text):
+            events.append(('content_block_delta', {"type": "content_block_delta", "index": 0,
+                                                   "delta": {"type": "text_delta", "text": piece}}))
+        if malformed:
+            events = events[:len(events) // 2 + 1] + [('content_block_delta', '{"type": "content_block_de')]
+        else:
+            events += [
+                ('content_block_stop', {"type": "content_block_stop", "index": 0}),
+                ('message_delta', {"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                                   "usage": {"output_tokens": message['usage']['output_tokens']}}),
+                ('message_stop', {"type": "message_stop"}),
+            ]
+
+        # No content-length: the stream ends when the connection closes
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('content-type', 'text/event-stream')
+        self.send_header('connection', 'close')
+        self.end_headers()
+        try:
+            for name, payload in events:
+                data = payload if isinstance(payload, str) else json.dumps(payload)
+                self.wfile.write(f"event: {name}\ndata: {data}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                if name == 'content_block_delta':
+                    time.sleep(self.stream_delay)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client abandoned the stream
+            pass
+
+    def do_GET(self):
+        entry = re.fullmatch(r'/api/v2/entries/en/([^/?]+)', self.path)
+        if entry:
+            self.send_dictionary_entry(unquote(entry.group(1)))
+            return
+        match = re.fullmatch(r'/v1/messages/batches/([\w-]+)(/results)?', self.path)
+        if not match or match.group(1) not in self.batches:
+            self.send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+        elif match.group(2):
+            self.send_batch_results(match.group(1))
+        else:
+            self.send_json(200, self.batch_status(match.group(1)))
+
+    def send_dictionary_entry(self, word):
+        fault = self.inject_fault()
+        if fault is True:
+            return
+        if fault == 'malformed':
+            self.send_malformed()
+        # The same words are always missing, like real gaps in the dictionary
+        elif zlib.crc32(word.lower().encode('utf-8')) % 10000 < self.faults['not_found'] * 10000:
+            self.send_json(404, {"title": "No Definitions Found", "message": "mock", "resolution": ""})
+        else:
+            self.send_json(200, dictionary_response(word))
+
+    def create_batch(self, body):
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        self.batches[batch_id] = {'requests': body.get('requests', []), 'created': time.monotonic()}
+        self.send_json(200, self.batch_status(batch_id))
+
+    def batch_status(self, batch_id):
+        batch = self.batches[batch_id]
+        ended = time.monotonic() - batch['created'] >= self.batch_delay
+        count = len(batch['requests'])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else count,
+                "succeeded": count if ended else 0,
+                "errored": 0, "canceled": 0, "expired": 0
+            },
+            "results_url": f"http://{self.headers['Host']}/v1/messages/batches/{batch_id}/results" if ended else None
+        }
+
+    def send_batch_results(self, batch_id):
+        lines = []
+        for entry in self.batches[batch_id]['requests']:
+            lines.append(json.dumps({
+                "custom_id": entry['custom_id'],
+                "result": {"type": "succeeded", "message": message_response(entry['params'])}
+            }))
+        body = ("\n".join(lines) + "\n").encode('utf-8')
+        self.send_response(200)
+        self.send_header('content-type', 'application/x-jsonl')
+        self.send_header('content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def make_server(port=8765, batch_delay=2.0, stream_delay=0.0, latency=0.0, latency_sigma=0.5,
+                rate_429=0.0, rate_5xx=0.0, malformed=0.0, not_found=0.0, retry_after=1.0, seed=None):
+    """Create (but don't start) a mock server on 127.0.0.1:port.
+
+    latency is the median delay in seconds of messages and dictionary requests;
+    rate_429 / rate_5xx / malformed / not_found are fractions of requests (not_found:
+    of dictionary words). seed makes the fault sequence repeatable.
+    """
+    faults = {'latency': latency, 'latency_sigma': latency_sigma, 'rate_429': rate_429, 'rate_5xx': rate_5xx,
+              'malformed': malformed, 'not_found': not_found, 'retry_after': retry_after}
+    handler = type('Handler', (MockAPIHandler,), {'batches': {}, 'batch_delay': batch_delay,
+                                                  'stream_delay': stream_delay, 'faults': faults,
+                                                  'seed': seed, 'seen': {}, 'seen_lock': threading.Lock()})
+    return ThreadingHTTPServer(('127.0.0.1', port), handler)
+
+def start_in_thread(port=0, **options):
+    """Start a mock server in a daemon thread; returns (server, base_url)"""
+    server = make_server(port, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def add_fault_arguments(parser, latency=0.0, rate_429=0.0, rate_5xx=0.0, malformed=0.0):
+    """Latency and fault options, shared with benchmark.py"""
+    parser.add_argument('--latency', type=float, default=latency, help='median response delay in seconds')
+    parser.add_argument('--latency-sigma', type=float, default=0.5,
+                        help='spread of the log-normal delay (0 = always the median)')
+    parser.add_argument('--rate-429', type=float, default=rate_429, help='fraction of requests answered with 429')
+    parser.add_argument('--rate-5xx', type=float, default=rate_5xx, help='fraction answered with 500/503/529')
+    parser.add_argument('--malformed', type=float, default=malformed,
+                        help='fraction answered with a truncated body or stream')
+    parser.add_argument('--not-found', type=float, default=0.0, help='fraction of words the dictionary lacks')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='retry-after seconds sent with 429s')
+    parser.add_argument('--seed', type=int, help='seed for repeatable latencies and faults')
+
+def fault_options(args):
+    return {'latency': args.latency, 'latency_sigma': args.latency_sigma, 'rate_429': args.rate_429,
+            'rate_5xx': args.rate_5xx, 'malformed': args.malformed, 'not_found': args.not_found,
+            'retry_after': args.retry_after, 'seed': args.seed}
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Anthropic and dictionary APIs")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--batch-delay', type=float, default=2.0,
+                        help='seconds before a submitted batch reports "ended"')
+    parser.add_argument('--stream-delay', type=float, default=0.0,
+                        help='seconds between streamed text deltas')
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    server = make_server(args.port, batch_delay=args.batch_delay, stream_delay=args.stream_delay,
+                         **fault_options(args))
+    print(f"Mock API listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
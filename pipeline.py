@@ -0,0 +1,228 @@
+"""
+Streaming build pipeline for Ad Infinitum.
+Runs process -> fill -> examples -> passages -> fix as concurrent stages: each
+word moves on to the next stage as soon as the previous one is done with it,
+so a full rebuild takes about as long as the slowest stage instead of the sum.
+
+    py pipeline.py                                   # full rebuild from words_raw.json
+    py pipeline.py --workers examples=16 --workers passages=16
+    py pipeline.py --stages examples,passages,fix    # run on existing words_processed.json
+    py pipeline.py --stages process,fill,enrich      # one combined call per word instead
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from journal import Journal, compact, read_journal, replay
+from lemma_groups import lemma_map, normalize_words
+from word_store import WordStore
+
+# Fix Unicode encoding for Windows console
+sys.stdout.reconfigure(encoding='utf-8')
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+raw_path = os.path.join(script_dir, 'data/words_raw.json')
+words_path = os.path.join(script_dir, 'data/words_processed.json')
+journal_path = os.path.join(script_dir, 'data/pipeline_journal.jsonl')
+
+STAGES = ['process', 'fill', 'enrich', 'examples', 'passages', 'fix']
+DEFAULT_STAGES = ['process', 'fill', 'examples', 'passages', 'fix']
+API_STAGES = {'enrich', 'examples', 'passages', 'fix'}
+
+# Default worker count per stage
+DEFAULT_WORKERS = {'process': 4, 'fill': 1, 'enrich': 8, 'examples': 8, 'passages': 8, 'fix': 4}
+
+# {word: lemma} for rebuilds, so inflected duplicates share one dictionary lookup
+LEMMAS = {}
+
+# ---- stage functions: each takes a word entry, updates it in place and returns a status ----
+
+def run_process(entry):
+    import process_vocab
+    built, found = process_vocab.build_entry(entry['word'], LEMMAS.get(entry['word']))
+    entry.update(built)
+    return 'done' if found else 'error'
+
+def run_fill(entry):
+    import fill_missing
+    fill_missing.fill_entry(entry)
+    return 'done'
+
+def run_enrich(entry):
+    import enrich
+    fields, problems = enrich.enrich_word(entry['word'], entry.get('definition', ''), entry.get('partOfSpeech', ''))
+    enrich.apply_enrichment(entry, fields)
+    return enrich.enrichment_status(problems)
+
+def run_examples(entry):
+    import generate_examples
+    if not entry.get('definition') or not generate_examples.needs_new_example(entry):
+        return 'skipped'
+    example, _ = generate_examples.generate_valid_example(entry['word'], entry['definition'], entry.get('partOfSpeech', ''))
+    if not example:
+        return 'error'
+    entry['example'] = example
+    return 'done'
+
+def run_passages(entry):
+    import generate_passages
+    new_def, passage = generate_passages.generate_passage_and_definition(
+        entry['word'], entry.get('definition', ''), entry.get('partOfSpeech', ''))
+    if not passage:
+        return 'error'
+    generate_passages.apply_passage(entry, new_def, passage)
+    return 'done'
+
+def run_fix(entry):
+    import fix_passages
+    word = entry['word']
+    if not entry.get('passage') or fix_passages.count_word_occurrences(word, entry['passage']) <= 1:
+        return 'skipped'
+    passage, status = fix_passages.fix_passage(word, entry.get('definition', ''), entry.get('partOfSpeech', ''))
+    if passage:
+        entry['passage'] = passage
+    return status
+
+STAGE_FUNCTIONS = {
+    'process': run_process,
+    'fill': run_fill,
+    'enrich': run_enrich,
+    'examples': run_examples,
+    'passages': run_passages,
+    'fix': run_fix,
+}
+
+async def run_pipeline(items, stages, workers, on_stage_done, on_word_done):
+    """Stream (i, entry) items through `stages`, each with its own worker pool.
+
+    on_stage_done(stage, entry, status) runs after every stage; on_word_done(i, entry, statuses)
+    once a word has left the last stage. Both are called on the event loop thread.
+    """
+    loop = asyncio.get_running_loop()
+    queues = [asyncio.Queue() for _ in stages]
+    executors = [ThreadPoolExecutor(max_workers=workers[stage]) for stage in stages]
+
+    async def worker(index):
+        stage = stages[index]
+        func = STAGE_FUNCTIONS[stage]
+        while True:
+            item = await queues[index].get()
+            if item is None:
+                return
+            i, entry, statuses = item
+            try:
+                status = await loop.run_in_executor(executors[index], func, entry)
+            except Exception as e:
+                print(f"  {stage} failed for {entry.get('word')}: {e}")
+                status = 'error'
+            statuses[stage] = status
+            on_stage_done(stage, entry, status)
+
+            if index + 1 < len(stages):
+                await queues[index + 1].put(item)
+            else:
+                on_word_done(i, entry, statuses)
+
+    tasks = [[asyncio.create_task(worker(index)) for _ in range(workers[stage])]
+             for index, stage in enumerate(stages)]
+
+    for i, entry in items:
+        await queues[0].put((i, entry, {}))
+
+    # Shut stages down in order: once a stage drains, nothing more can reach the next one
+    for index, stage_tasks in enumerate(tasks):
+        for _ in stage_tasks:
+            await queues[index].put(None)
+        await asyncio.gather(*stage_tasks)
+
+    for executor in executors:
+        executor.shutdown()
+
+def parse_workers(values):
+    workers = dict(DEFAULT_WORKERS)
+    for value in values:
+        stage, _, count = value.partition('=')
+        if stage not in STAGES or not count.isdigit() or int(count) < 1:
+            raise SystemExit(f"Invalid --workers value: {value} (expected stage=N, stage one of {', '.join(STAGES)})")
+        workers[stage] = int(count)
+    return workers
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stages', default=','.join(DEFAULT_STAGES),
+                        help='comma-separated stages to run, in pipeline order')
+    parser.add_argument('--workers', action='append', default=[], metavar='STAGE=N',
+                        help='concurrency for one stage (repeatable)')
+    return parser.parse_args()
+
+def load_words(stages):
+    """Seed entries from words_raw.json for a rebuild, else from words_processed.json"""
+    if 'process' in stages:
+        with open(raw_path, 'r', encoding='utf-8') as f:
+            words = normalize_words(json.load(f))
+        LEMMAS.update(lemma_map(words))
+        return [{'word': w} for w in words]
+    with open(words_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def main():
+    args = parse_args()
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(unknown)}")
+    stages = [s for s in STAGES if s in stages]
+    workers = parse_workers(args.workers)
+
+    words = load_words(stages)
+    print(f"Loaded {len(words)} words")
+
+    # Resume: words journaled by an interrupted run already went through every stage
+    finished = {record['word'] for record in replay(words, read_journal(journal_path))}
+    if finished:
+        print(f"Resuming: {len(finished)} words already built")
+    items = [(i, entry) for i, entry in enumerate(words) if entry['word'] not in finished]
+
+    if any(stage in API_STAGES for stage in stages):
+        import api_client
+        api_client.get_session(pool_size=sum(workers[s] for s in stages if s in API_STAGES))
+
+    print(f"Stages: {' -> '.join(f'{s}({workers[s]})' for s in stages)}")
+    print(f"Words to build: {len(items)}\n")
+
+    store = WordStore()
+    journal = Journal(journal_path)
+    counts = {stage: {} for stage in stages}
+    done = [0]
+
+    def on_stage_done(stage, entry, status):
+        counts[stage][status] = counts[stage].get(status, 0) + 1
+        if status != 'skipped':
+            store.mark(stage, entry['word'], status)
+
+    def on_word_done(i, entry, statuses):
+        journal.append(i, entry['word'], entry)
+        done[0] += 1
+        summary = ' '.join(f"{stage}={status}" for stage, status in statuses.items())
+        print(f"[{done[0]}/{len(items)}] {entry['word']}: {summary}")
+
+    asyncio.run(run_pipeline(items, stages, workers, on_stage_done, on_word_done))
+
+    # Final flush
+    print(f"\n\nSaving final results...")
+    journal.close()
+    compact(words, journal_path, words_path)
+    store.sync_words(words)
+
+    print(f"\nDone!")
+    for stage in stages:
+        summary = ', '.join(f"{status} {n}" for status, n in sorted(counts[stage].items()))
+        print(f"  {stage}: {summary or 'nothing to do'}")
+    print(f"\nNext step: Export the changes with py firestore_export.py plan, then upload")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,32 @@
 """
 Vocabulary Processor for Ad Infinitum
 Generates definitions, Korean translations, example sentences, and difficulty levels.
+
+Dictionary lookups run concurrently on a pooled session, paced by their own
+rate limiter (DICTIONARY_RPM) with the shared retry/backoff policy. Every
+finished word is journaled, so an interrupted run resumes where it stopped, and
+words already in words_processed.json are kept unless --rebuild is given.
+
+    py process_vocab.py                  # look up new words only
+    py process_vocab.py --concurrency 16
+    py process_vocab.py --rebuild        # redo every word (cached responses are reused)
 """
 
+import argparse
+import asyncio
 import json
-import requests
-import time
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from api_client import get_session
+from dict_archive import get_archive
+from journal import Journal, compact, read_journal
+from lemma_groups import lemma_map, normalize_words
+from rate_limiter import Hedger, RateLimiter, request_with_retry
+from response_cache import cached_request, get_cache
+from text_normalize import generate_tldr
+from word_store import normalize_key
 
 # Fix Unicode encoding for Windows console
 sys.stdout.reconfigure(encoding='utf-8')
@@ -18,27 +37,36 @@ print = functools.partial(print, flush=True)
 
 # Get the script's directory
 script_dir = os.path.dirname(os.path.abspath(__file__))
+raw_path = os.path.join(script_dir, 'data/words_raw.json')
+output_path = os.path.join(script_dir, 'data/words_processed.json')
+journal_path = os.path.join(script_dir, 'data/process_journal.jsonl')
+
+# DICTIONARY_BASE_URL lets the lookups run against a local stand-in server (see mock_api_server.py)
+DICTIONARY_BASE = os.environ.get('DICTIONARY_BASE_URL', 'https://api.dictionaryapi.dev').rstrip('/')
+DICTIONARY_URL = DICTIONARY_BASE + "/api/v2/entries/en/{word}"
 
-# Load raw words
-with open(os.path.join(script_dir, 'data/words_raw.json'), 'r', encoding='utf-8') as f:
-    raw_words = json.load(f)
+# Be nice to the free dictionary API (override with DICTIONARY_RPM)
+DICTIONARY_RPM = int(os.environ.get('DICTIONARY_RPM', 600))
+dictionary_limiter = RateLimiter(DICTIONARY_RPM, DICTIONARY_RPM)
+dictionary_hedger = Hedger()
 
-print(f"Loaded {len(raw_words)} words")
+DEFAULT_CONCURRENCY = 8
+
+# A lemma's dictionary entry is reused for its -s forms only if it is one of these
+SHARED_POS = {'noun', 'verb'}
+
+# Very common words for the length-based fallback (frequency_index.py levels from real frequency data)
+BASIC_WORDS = {'a', 'the', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+               'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+               'could', 'should', 'may', 'might', 'must', 'shall', 'can',
+               'ability', 'about', 'above', 'accept', 'account', 'across',
+               'act', 'action', 'add', 'admit', 'adult', 'affect', 'after'}
 
-# Word frequency list for difficulty assignment (common words = easier)
-# Using a simplified approach based on word length and common patterns
 def estimate_difficulty(word):
     """Estimate difficulty 1-5 based on word characteristics"""
     word_lower = word.lower().strip()
 
-    # Very common/basic words
-    basic_words = {'a', 'the', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
-                   'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
-                   'could', 'should', 'may', 'might', 'must', 'shall', 'can',
-                   'ability', 'about', 'above', 'accept', 'account', 'across',
-                   'act', 'action', 'add', 'admit', 'adult', 'affect', 'after'}
-
-    if word_lower in basic_words or len(word_lower) <= 4:
+    if word_lower in BASIC_WORDS or len(word_lower) <= 4:
         return 1
 
     # Check for common prefixes/suffixes that indicate difficulty
@@ -63,122 +91,97 @@ def estimate_difficulty(word):
     else:
         return 5
 
-def generate_tldr(definition):
-    """Generate a 1-3 word TL;DR from a definition"""
-    if not definition:
-        return ''
-
-    # Common words to skip
-    skip_words = {
-        'a', 'an', 'the', 'to', 'of', 'in', 'on', 'at', 'for', 'with', 'by',
-        'from', 'as', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
-        'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
-        'should', 'may', 'might', 'must', 'shall', 'can', 'that', 'which',
-        'who', 'whom', 'whose', 'this', 'these', 'those', 'it', 'its',
-        'or', 'and', 'but', 'if', 'then', 'than', 'so', 'very', 'just',
-        'also', 'only', 'even', 'more', 'most', 'other', 'some', 'any',
-        'no', 'not', 'such', 'what', 'when', 'where', 'how', 'why',
-        'all', 'each', 'every', 'both', 'few', 'many', 'much', 'own',
-        'same', 'something', 'someone', 'anything', 'nothing', 'one',
-        'two', 'first', 'into', 'about', 'over', 'after', 'before',
-        'between', 'under', 'again', 'further', 'once', 'here', 'there',
-        'because', 'while', 'although', 'though', 'until', 'unless',
-        'whether', 'since', 'during', 'within', 'without', 'through',
-        'act', 'make', 'cause', 'give', 'take', 'get', 'put', 'become',
-        'come', 'go', 'see', 'show', 'let', 'begin', 'seem', 'help',
-        'try', 'leave', 'call', 'need', 'feel', 'high', 'long', 'way',
-        'thing', 'things', 'manner', 'state', 'quality', 'process',
-        'relating', 'characterized', 'involving', 'marked', 'having'
-    }
+def extract_fields(data):
+    """Pick definition/partOfSpeech/example out of a dictionary API payload"""
+    if data and len(data) > 0:
+        entry = data[0]
+        meanings = entry.get('meanings', [])
+        if meanings:
+            meaning = meanings[0]
+            pos = meaning.get('partOfSpeech', '')
+            definitions = meaning.get('definitions', [])
+            if definitions:
+                definition = definitions[0].get('definition', '')
+                example = definitions[0].get('example', '')
+                return {
+                    'definition': definition,
+                    'partOfSpeech': pos,
+                    'example': example
+                }
+    return None
 
-    # Clean the definition
-    clean_def = definition.lower().strip()
-
-    # Remove common starting phrases
-    starters_to_remove = [
-        'the act of', 'the process of', 'the state of', 'the quality of',
-        'to be', 'to make', 'to cause', 'to give', 'relating to',
-        'characterized by', 'having the quality of', 'in a manner that',
-        'the ability to', 'a person who', 'one who', 'someone who',
-        'something that', 'a thing that', 'an act of'
-    ]
-
-    for starter in starters_to_remove:
-        if clean_def.startswith(starter):
-            clean_def = clean_def[len(starter):].strip()
-
-    # Split into words and filter
-    import re
-    words = re.findall(r'[a-zA-Z]+', clean_def)
-
-    # Get meaningful words (not in skip list, at least 3 chars)
-    meaningful = []
-    for w in words:
-        if w.lower() not in skip_words and len(w) >= 3:
-            meaningful.append(w)
-            if len(meaningful) >= 3:
-                break
-
-    # If we got nothing, just take the first meaningful-looking word
-    if not meaningful and words:
-        for w in words:
-            if len(w) >= 3:
-                meaningful = [w]
-                break
-
-    # Join with spaces, capitalize first letter
-    if meaningful:
-        result = ' '.join(meaningful[:3])
-        return result.capitalize()
-
-    return ''
-
-def get_definition_from_api(word):
-    """Try to get definition from free dictionary API"""
+def parse_dictionary_body(text):
+    """Entries from a dictionary API body, or None if it doesn't parse as a list of them"""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    return data if isinstance(data, list) else None
+
+def valid_dictionary_response(response):
+    return response.status_code != 200 or parse_dictionary_body(response.text) is not None
+
+def dictionary_fields(status, body):
+    """extract_fields for a 200 body, or None (404s and bodies that don't parse)"""
+    data = parse_dictionary_body(body) if status == 200 else None
+    return extract_fields(data) if data else None
+
+@functools.lru_cache(maxsize=None)
+def get_definition_from_api(word, fetch=True):
+    """Try to get definition from free dictionary API (once per word per run).
+
+    The full payload is kept in the dictionary archive (only once it yields a
+    definition, or for a 404) and read back from there on later runs; with
+    fetch=False only the archive is consulted.
+    """
     try:
-        url = f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}"
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            if data and len(data) > 0:
-                entry = data[0]
-                meanings = entry.get('meanings', [])
-                if meanings:
-                    meaning = meanings[0]
-                    pos = meaning.get('partOfSpeech', '')
-                    definitions = meaning.get('definitions', [])
-                    if definitions:
-                        definition = definitions[0].get('definition', '')
-                        example = definitions[0].get('example', '')
-                        return {
-                            'definition': definition,
-                            'partOfSpeech': pos,
-                            'example': example
-                        }
+        archive = get_archive()
+        archived = archive.get(word)
+        if archived is not None:
+            fields = dictionary_fields(*archived)
+            if archived[0] != 200 or (fields and fields['definition']):
+                return fields
+            # A broken payload archived by an older run: look the word up again
+            archive.delete(word)
+        if not fetch:
+            return None
+
+        url = DICTIONARY_URL.format(word=word)
+        session = get_session()
+
+        # "No definitions found" (404) is a stable answer too, so cache it
+        response = cached_request(
+            get_cache(), url, None,
+            lambda: request_with_retry(
+                lambda: dictionary_hedger.send(DICTIONARY_URL, lambda: session.get(url, timeout=5),
+                                               before_hedge=dictionary_limiter.acquire),
+                dictionary_limiter, validate=valid_dictionary_response),
+            cache_status=(200, 404), validate=valid_dictionary_response)
+        fields = dictionary_fields(response.status_code, response.text)
+        if response.status_code == 404 or (fields and fields['definition']):
+            archive.put(word, response.status_code, response.text)
+        return fields
     except Exception as e:
         pass
     return None
 
-# Process words in batches
-processed_words = []
-failed_words = []
-
-# Process all words
-BATCH_SIZE = len(raw_words)
-words_to_process = raw_words
-
-print(f"\nProcessing {len(words_to_process)} words...")
-print("This may take a while due to API rate limits.\n")
-
-for i, word in enumerate(words_to_process):
-    word_clean = word.strip()
-    if not word_clean:
-        continue
+def build_entry(word_clean, lemma=None, fetch=True):
+    """Build the processed entry for one word; returns (entry, found_definition).
 
-    print(f"[{i+1}/{len(words_to_process)}] Processing: {word_clean}")
+    If `lemma` is given (see lemma_groups) and its definition is a noun or verb
+    sense, that definition is reused instead of looking the word up separately.
+    fetch=False builds from the dictionary archive only (see dict_archive rederive).
+    """
+    api_data = None
+    if lemma:
+        lemma_data = get_definition_from_api(lemma, fetch)
+        if lemma_data and lemma_data.get('partOfSpeech') in SHARED_POS:
+            # The lemma's example uses the lemma, not this word, so leave it for generate_examples
+            api_data = dict(lemma_data, example='')
 
     # Get definition from API
-    api_data = get_definition_from_api(word_clean)
+    if api_data is None:
+        api_data = get_definition_from_api(word_clean, fetch)
 
     word_entry = {
         'word': word_clean,
@@ -197,30 +200,117 @@ for i, word in enumerate(words_to_process):
         # Create TLDR (1-3 key words from definition)
         if word_entry['definition']:
             word_entry['tldr'] = generate_tldr(word_entry['definition'])
-    else:
-        failed_words.append(word_clean)
-
-    processed_words.append(word_entry)
 
-    # Rate limiting - be nice to the free API
-    time.sleep(0.3)
+    return word_entry, api_data is not None
+
+async def build_entries_async(jobs, concurrency):
+    """Run build_entry for (i, word, lemma) jobs with bounded concurrency.
+
+    Yields (i, entry, found) in completion order.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    get_session(pool_size=concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def run(i, word, lemma):
+            async with semaphore:
+                entry, found = await loop.run_in_executor(executor, build_entry, word, lemma)
+            return i, entry, found
+
+        tasks = [asyncio.create_task(run(*job)) for job in jobs]
+        for task in asyncio.as_completed(tasks):
+            yield await task
+
+def run_dictionary_stage(raw_words, existing=(), concurrency=DEFAULT_CONCURRENCY, on_result=None):
+    """Build processed entries for raw_words; returns (entries, failed_words).
+
+    Entries in `existing` (matched case-insensitively by word) are kept as they
+    are, and results journaled by an interrupted run are picked up instead of
+    being looked up again. on_result(done, total, entry, found) is called as
+    each new word finishes.
+    """
+    words = normalize_words(raw_words)
+    lemmas = lemma_map(words)
+
+    known = {normalize_key(entry['word']): entry for entry in existing}
+    for record in read_journal(journal_path):
+        known[normalize_key(record['word'])] = record['fields']
+
+    entries = [known.get(normalize_key(word)) for word in words]
+    failed_words = [entry['word'] for entry in entries if entry is not None and not entry.get('definition')]
+    jobs = [(i, word, lemmas.get(word)) for i, word in enumerate(words) if entries[i] is None]
+
+    journal = Journal(journal_path)
+
+    async def run_all():
+        done = 0
+        async for i, entry, found in build_entries_async(jobs, concurrency):
+            entries[i] = entry
+            if not found:
+                failed_words.append(entry['word'])
+            journal.append(i, entry['word'], entry, status='done' if found else 'error')
+            done += 1
+            if on_result:
+                on_result(done, len(jobs), entry, found)
 
-# Save processed words
-output_path = os.path.join(script_dir, 'data/words_processed.json')
-with open(output_path, 'w', encoding='utf-8') as f:
-    json.dump(processed_words, f, ensure_ascii=False, indent=2)
-
-print(f"\n\nProcessed {len(processed_words)} words")
-print(f"Failed to get definitions for {len(failed_words)} words")
-print(f"Saved to: {output_path}")
-
-if failed_words:
-    print(f"\nWords without definitions (will need manual entry):")
-    for w in failed_words[:20]:
-        print(f"  - {w}")
-    if len(failed_words) > 20:
-        print(f"  ... and {len(failed_words) - 20} more")
-
-print(f"\nNext steps:")
-print(f"1. Set up Firebase (see instructions)")
-print(f"2. Run the import script to upload words to Firebase")
+    try:
+        asyncio.run(run_all())
+    finally:
+        journal.close()
+    return entries, failed_words
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='number of dictionary lookups in flight')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='look up every word again instead of keeping existing entries')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    # Load raw words
+    with open(raw_path, 'r', encoding='utf-8') as f:
+        raw_words = json.load(f)
+
+    print(f"Loaded {len(raw_words)} words")
+
+    # Keep what an earlier run already produced (passages, examples, ...)
+    existing = []
+    if os.path.exists(output_path) and not args.rebuild:
+        with open(output_path, 'r', encoding='utf-8') as f:
+            existing = json.load(f)
+        print(f"Keeping {len(existing)} existing entries")
+
+    print(f"\nProcessing with {args.concurrency} concurrent lookups ({DICTIONARY_RPM}/min)...\n")
+
+    def report(done, total, entry, found):
+        print(f"[{done}/{total}] {entry['word']}{'' if found else ' (no definition)'}")
+
+    processed_words, failed_words = run_dictionary_stage(raw_words, existing, args.concurrency, report)
+
+    # Save processed words and drop the journal
+    compact(processed_words, journal_path, output_path)
+
+    print(f"\n\nProcessed {len(processed_words)} words")
+    print(f"Failed to get definitions for {len(failed_words)} words")
+    if dictionary_hedger.counts['hedged']:
+        print(f"Hedged {dictionary_hedger.counts['hedged']} slow lookups "
+              f"({dictionary_hedger.counts['won']} answered by the duplicate)")
+    print(f"Saved to: {output_path}")
+
+    if failed_words:
+        print(f"\nWords without definitions (will need manual entry):")
+        for w in failed_words[:20]:
+            print(f"  - {w}")
+        if len(failed_words) > 20:
+            print(f"  ... and {len(failed_words) - 20} more")
+
+    print(f"\nNext steps:")
+    print(f"1. Set up Firebase (see instructions)")
+    print(f"2. Run the import script to upload words to Firebase")
+
+if __name__ == "__main__":
+    main()
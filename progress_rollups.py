@@ -0,0 +1,219 @@
+"""
+Per-student progress rollups for Ad Infinitum.
+The progress and review screens used to read one words document per
+wordProgress entry (and run a query per level), so opening them cost hundreds
+of reads for an active student. This job writes one summary document per
+student, users/{uid}/summary/progress, holding:
+  - levels: total / learned / mastered words per level
+  - wordLevels: the level of every word the student has progress on, so
+    learned counts stay right between runs from the live wordProgress
+  - review: wrong answers and words due within REVIEW_HORIZON_DAYS, with the
+    fields the review card shows embedded
+  - score / attempts / accuracy: the leaderboard numbers
+The client reads it alongside the user document and only falls back to
+per-word reads for words the summary doesn't cover yet.
+
+Runs are incremental: a student is rebuilt only when their user document
+changed since the last run (every answer updates its counters), when their
+summary is older than REFRESH_DAYS, or when the exported words changed.
+
+    py progress_rollups.py            # rebuild changed students
+    py progress_rollups.py --all
+    py progress_rollups.py --dry-run
+
+Word fields and levels come from words_processed.json via firestore_export's
+manifest, so run this after uploading word changes. Uses the same
+FIRESTORE_EMULATOR_HOST / FIRESTORE_TOKEN settings as firestore_export.py.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from firestore_export import BATCH_LIMIT, get_client, load_manifest
+from journal import atomic_write_json
+from word_store import content_hash, normalize_key
+
+# Fix Unicode encoding for Windows console
+sys.stdout.reconfigure(encoding='utf-8')
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+words_path = os.path.join(script_dir, 'data/words_processed.json')
+state_path = os.path.join(script_dir, 'data/progress_rollups.json')
+
+SUMMARY_PATH = 'users/{uid}/summary/progress'
+
+LEVELS = 5
+
+# Fields the review card shows
+REVIEW_FIELDS = ('word', 'partOfSpeech', 'definition', 'tldr', 'korean', 'example', 'level')
+
+# Words due this soon are embedded, so the summary still covers reviews that come due between runs
+REVIEW_HORIZON_DAYS = 7
+# Keeps the summary document well under Firestore's 1 MiB limit
+REVIEW_LIMIT = 200
+# Summaries older than this are rebuilt even without new answers
+REFRESH_DAYS = 3
+
+# User document fields that change whenever the student answers or clears a wrong answer
+SIGNATURE_FIELDS = ('totalAttempts', 'totalCorrect', 'wordsLearned', 'wordsMastered', 'wrongAnswers')
+
+def parse_timestamp(value):
+    """datetime (UTC) from a Firestore timestamp or ISO string, or None"""
+    if not value or not isinstance(value, str):
+        return None
+    value = value.replace('Z', '+00:00')
+    # Firestore sends up to nanoseconds; fromisoformat takes at most microseconds
+    if '.' in value:
+        head, rest = value.split('.', 1)
+        digits = len(rest) - len(rest.lstrip('0123456789'))
+        value = f"{head}.{rest[:min(digits, 6)].ljust(6, '0')}{rest[digits:]}"
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def format_timestamp(moment):
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def load_words(words, manifest):
+    """{document id: review fields} for every exported word"""
+    by_key = {}
+    for entry in words:
+        key = normalize_key(entry.get('word', ''))
+        if key and key not in by_key:
+            by_key[key] = entry
+    result = {}
+    for key, exported in manifest.items():
+        entry = by_key.get(key)
+        if entry is not None:
+            fields = {field: entry.get(field) or '' for field in REVIEW_FIELDS}
+            fields['level'] = entry.get('level') or 1
+            result[exported['id']] = fields
+    return result
+
+def words_signature(manifest):
+    """Changes whenever an exported word's content or ID changes"""
+    return content_hash({entry['id']: entry.get('hash', '') for entry in manifest.values()})[:16]
+
+def user_signature(fields):
+    return content_hash({field: fields.get(field) for field in SIGNATURE_FIELDS})[:16]
+
+def build_summary(user, progress, words, level_totals, now):
+    """Summary document for one student.
+
+    `user` is the user document's fields, `progress` {word id: wordProgress
+    fields}, `words` {word id: review fields}.
+    """
+    levels = {str(level): {'total': level_totals.get(level, 0), 'learned': 0, 'mastered': 0}
+              for level in range(1, LEVELS + 1)}
+    word_levels = {}
+    for word_id, entry in progress.items():
+        word = words.get(word_id)
+        if word is None:
+            continue
+        word_levels[word_id] = word['level']
+        counts = levels.get(str(word['level']))
+        if counts:
+            counts['learned'] += 1
+            counts['mastered'] += 1 if entry.get('mastered') else 0
+
+    # Wrong answers first (oldest first, like the client), then the soonest due words
+    review, seen = [], set()
+    for wrong in user.get('wrongAnswers') or []:
+        word_id = wrong.get('wordId') if isinstance(wrong, dict) else None
+        if word_id in words and word_id not in seen:
+            review.append(word_id)
+            seen.add(word_id)
+    horizon = now + timedelta(days=REVIEW_HORIZON_DAYS)
+    due = []
+    for word_id, entry in progress.items():
+        next_review = parse_timestamp(entry.get('nextReview'))
+        if word_id in words and word_id not in seen and next_review and next_review <= horizon:
+            due.append((next_review, word_id))
+    review.extend(word_id for _, word_id in sorted(due))
+
+    attempts = user.get('totalAttempts') or 0
+    correct = user.get('totalCorrect') or 0
+    return {
+        'levels': levels,
+        'wordLevels': word_levels,
+        'review': [{'id': word_id, **words[word_id]} for word_id in review[:REVIEW_LIMIT]],
+        'score': correct,
+        'attempts': attempts,
+        'accuracy': round(correct / attempts, 4) if attempts else 0,
+        'builtAt': format_timestamp(now),
+    }
+
+def load_state(path=state_path):
+    if not os.path.exists(path):
+        return {'words': None, 'users': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def is_stale(record, signature, words_changed, now):
+    if words_changed or record is None or record.get('signature') != signature:
+        return True
+    built = parse_timestamp(record.get('builtAt'))
+    return built is None or now - built > timedelta(days=REFRESH_DAYS)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--project', help='Firebase project ID (default: projectId in js/config.js)')
+    parser.add_argument('--all', action='store_true', help='rebuild every student, not just changed ones')
+    parser.add_argument('--dry-run', action='store_true', help='report what would be rebuilt without writing')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    client = get_client(args.project)
+    manifest = load_manifest()
+    if not manifest:
+        raise SystemExit("No export manifest; run: py firestore_export.py adopt (or plan + upload) first")
+    with open(words_path, 'r', encoding='utf-8') as f:
+        words = load_words(json.load(f), manifest)
+    level_totals = {}
+    for fields in words.values():
+        level_totals[fields['level']] = level_totals.get(fields['level'], 0) + 1
+
+    state = load_state()
+    signature = words_signature(manifest)
+    words_changed = args.all or state.get('words') != signature
+    now = datetime.now(timezone.utc)
+
+    start = time.perf_counter()
+    users = list(client.list_documents('users'))
+    stale = [(uid, fields) for uid, fields in users
+             if is_stale(state['users'].get(uid), user_signature(fields), words_changed, now)]
+    print(f"{len(users)} users, {len(stale)} to rebuild"
+          f"{' (words changed)' if words_changed and not args.all else ''}")
+    if args.dry_run or not stale:
+        return
+
+    # Commit and record each batch as soon as it's built, so memory stays bounded by
+    # BATCH_LIMIT summaries and an interrupted run picks up where it stopped
+    writes, records, reads, written = [], {}, len(users), 0
+    for n, (uid, fields) in enumerate(stale, 1):
+        progress = dict(client.list_documents(f'users/{uid}/wordProgress'))
+        reads += max(len(progress), 1)
+        summary = build_summary(fields, progress, words, level_totals, now)
+        writes.append(client.update_write(SUMMARY_PATH.format(uid=uid), summary))
+        records[uid] = {'signature': user_signature(fields), 'builtAt': summary['builtAt']}
+        if len(writes) == BATCH_LIMIT or n == len(stale):
+            client.commit_writes(writes)
+            state['users'].update(records)
+            atomic_write_json(state_path, state, indent=1, sort_keys=True)
+            written += len(writes)
+            writes, records = [], {}
+    state['words'] = signature
+    atomic_write_json(state_path, state, indent=1, sort_keys=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {written} summaries ({reads} documents read) in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Quiz shards for the Ad Infinitum client.
+Writes one compact JSON file per level (data/quiz/level-N.json) holding the
+fields the quiz shows, plus a precomputed distractor list for every word, so
+starting a quiz is one static fetch instead of reading the whole words
+collection. Distractors share the word's part of speech where possible, sit at
+most LEVEL_SPREAD levels away, have a dissimilar definition, and are never an
+inflection of the word, a phrase sharing its content words, or a word used in
+its passage/example.
+
+Word IDs are the Firestore document IDs from firestore_export's manifest, so
+progress is still recorded against the same documents. Rebuild after every
+export:
+    py quiz_shards.py
+    py quiz_shards.py --distractors 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+from firestore_export import doc_id, load_manifest
+from journal import atomic_write_json
+from leak_scan import scan_text
+from lemma_groups import lemma_map
+from text_normalize import STOP_WORDS
+from word_matcher import FUNCTION_WORDS, WordMatcher, match_key, tokenize
+from word_store import normalize_key
+
+# Fix Unicode encoding for Windows console
+sys.stdout.reconfigure(encoding='utf-8')
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+words_path = os.path.join(script_dir, 'data/words_processed.json')
+output_dir = os.path.join(script_dir, 'data/quiz')
+
+# Fields the quiz card and feedback panel use
+QUIZ_FIELDS = ('word', 'level', 'partOfSpeech', 'definition', 'example', 'passage')
+
+DISTRACTORS = 6
+LEVEL_SPREAD = 1
+# Definitions sharing more than this fraction of their content words are too close
+DEFINITION_OVERLAP = 0.25
+
+def definition_terms(definition):
+    return {t.rstrip('s') for t in tokenize(definition or '') if t not in STOP_WORDS and len(t) > 2}
+
+def overlap(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def content_tokens(key):
+    return {t for t in key.split() if t not in FUNCTION_WORDS}
+
+def candidate_order(word, by_group, levels):
+    """Candidate indexes, best first: same part of speech before others, nearer levels first.
+
+    Each group is shuffled with a per-word seed, so rebuilds pick the same distractors.
+    """
+    rng = random.Random(word['key'])
+    pos = word['pos']
+    for same_pos in (True, False):
+        for distance in range(LEVEL_SPREAD + 1):
+            for level in sorted({word['level'] - distance, word['level'] + distance}):
+                if level not in levels:
+                    continue
+                if same_pos:
+                    group = list(by_group.get((pos, level), ()))
+                else:
+                    group = [i for (p, l), members in by_group.items() if l == level and p != pos for i in members]
+                rng.shuffle(group)
+                yield from group
+
+def build_distractors(words, k=DISTRACTORS):
+    """[[index, ...]] of up to k distractors for every word"""
+    lemmas = lemma_map([w['word'] for w in words])
+    matcher = WordMatcher(w['word'] for w in words)
+    index_of = {w['key']: i for i, w in enumerate(words)}
+
+    by_group = {}
+    for i, w in enumerate(words):
+        w['lemma'] = match_key(lemmas.get(w['word'], w['word']))
+        w['terms'] = definition_terms(w['definition'])
+        w['content'] = content_tokens(w['key'])
+        by_group.setdefault((w['pos'], w['level']), []).append(i)
+    levels = {w['level'] for w in words}
+
+    table = []
+    for i, w in enumerate(words):
+        # Other quiz words used in this word's passage/example would give the answer away
+        used = set()
+        for field in ('passage', 'example'):
+            if w[field]:
+                used |= scan_text(matcher, tokenize(w[field]), w['key'])[1]
+        excluded = {i} | {index_of[key] for key in used if key in index_of}
+
+        chosen = []
+        for j in candidate_order(w, by_group, levels):
+            other = words[j]
+            if (j in excluded or other['lemma'] == w['lemma'] or other['content'] & w['content']
+                    or overlap(other['terms'], w['terms']) > DEFINITION_OVERLAP):
+                continue
+            chosen.append(j)
+            excluded.add(j)
+            if len(chosen) == k:
+                break
+        table.append(chosen)
+    return table
+
+def load_quiz_words(raw_words, manifest):
+    """Normalized quiz entries (first spelling of each word wins), with their document IDs.
+
+    Words not in the manifest get the ID the next firestore_export upload will
+    create them under (see unexported_count).
+    """
+    words = []
+    seen = set()
+    for entry in raw_words:
+        key = match_key(entry.get('word', ''))
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        word = {field: entry.get(field) or '' for field in QUIZ_FIELDS}
+        word['level'] = entry.get('level') or 1
+        word['key'] = key
+        word['pos'] = (entry.get('partOfSpeech') or '').lower()
+        exported = manifest.get(normalize_key(entry['word']))
+        word['id'] = exported['id'] if exported else doc_id(entry['word'])
+        words.append(word)
+    return words
+
+def unexported_count(words, manifest):
+    """Quiz words whose document doesn't exist in Firestore yet"""
+    return sum(1 for w in words if normalize_key(w['word']) not in manifest)
+
+def build_shards(words, table):
+    """{level: shard dict}"""
+    shards = {}
+    for w, distractors in zip(words, table):
+        item = {'id': w['id'], **{field: w[field] for field in QUIZ_FIELDS},
+                'distractors': [{'id': words[j]['id'], 'word': words[j]['word']} for j in distractors]}
+        shards.setdefault(w['level'], []).append(item)
+    return {level: {'level': level, 'words': items} for level, items in sorted(shards.items())}
+
+def write_shards(shards, directory=output_dir):
+    """Write level-N.json files and index.json (with content hashes for cache busting)"""
+    os.makedirs(directory, exist_ok=True)
+    index = {'levels': {}}
+    for level, shard in shards.items():
+        body = json.dumps(shard, ensure_ascii=False, separators=(',', ':'))
+        name = f'level-{level}.json'
+        atomic_write_json(os.path.join(directory, name), shard, ensure_ascii=False, separators=(',', ':'))
+        index['levels'][str(level)] = {
+            'file': name,
+            'count': len(shard['words']),
+            'hash': hashlib.sha1(body.encode('utf-8')).hexdigest()[:12],
+            'bytes': len(body.encode('utf-8')),
+        }
+    # Drop shards for levels that no longer have words
+    for name in os.listdir(directory):
+        if name.startswith('level-') and name not in {entry['file'] for entry in index['levels'].values()}:
+            os.remove(os.path.join(directory, name))
+    atomic_write_json(os.path.join(directory, 'index.json'), index, indent=1)
+    return index
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--input', default=words_path, help='words file to shard')
+    parser.add_argument('--output', default=output_dir, help='directory for the shard files')
+    parser.add_argument('--distractors', type=int, default=DISTRACTORS, help='distractors stored per word')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    with open(args.input, 'r', encoding='utf-8') as f:
+        raw_words = json.load(f)
+
+    manifest = load_manifest()
+    if not manifest:
+        # The collection was imported with random IDs; shard IDs must match them
+        raise SystemExit("The export manifest is empty, so the shards' word IDs wouldn't match Firestore. "
+                         "Run: py firestore_export.py adopt (then plan + upload) first")
+
+    start = time.perf_counter()
+    words = load_quiz_words(raw_words, manifest)
+    unexported = unexported_count(words, manifest)
+    table = build_distractors(words, args.distractors)
+    index = write_shards(build_shards(words, table), args.output)
+    elapsed = time.perf_counter() - start
+
+    short = sum(1 for distractors in table if len(distractors) < 3)
+    print(f"Built {len(index['levels'])} shards for {len(words)} words in {elapsed:.1f}s -> {args.output}")
+    for level, entry in index['levels'].items():
+        print(f"  Level {level}: {entry['count']} words, {entry['bytes'] / 1024:.0f} KB")
+    if short:
+        print(f"{short} words have fewer than 3 distractors (the client fills those from the shard)")
+    if unexported:
+        print(f"\nWARNING: {unexported} words aren't in Firestore yet, so progress on them wouldn't resolve. "
+              f"Run py firestore_export.py plan, then upload, before deploying these shards")
+
+if __name__ == "__main__":
+    main()
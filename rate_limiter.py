@@ -0,0 +1,286 @@
+"""
+Adaptive rate limiter shared by the Ad Infinitum API scripts.
+Token buckets for requests/minute and tokens/minute, tuned from the API's
+rate-limit headers, plus retry with jittered backoff on 429/5xx responses and
+hedging: a request still outstanding past its endpoint's p95 latency gets one
+duplicate, and whichever answers first is used.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeout
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# Account limits (override with ANTHROPIC_RPM / ANTHROPIC_TPM)
+DEFAULT_RPM = int(os.environ.get('ANTHROPIC_RPM', 50))
+DEFAULT_TPM = int(os.environ.get('ANTHROPIC_TPM', 50000))
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+# Hedging: duplicate a request once it has been out longer than this percentile
+# of recent latencies for its endpoint (AD_MAX_HEDGES=0 turns hedging off)
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MAX_IN_FLIGHT = int(os.environ.get('AD_MAX_HEDGES', 2))
+LATENCY_WINDOW = 200
+
+# Retries so far by reason (HTTP status or exception name), e.g. for benchmark reports
+retry_counts = {}
+_retry_lock = threading.Lock()
+
+class TokenBucket:
+    """Bucket refilled continuously at `per_minute` units per minute"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def resize(self, per_minute, now):
+        """Adopt a new limit reported by the server"""
+        self._refill(now)
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = min(self.tokens, self.capacity)
+
+    def reserve(self, amount, now):
+        """Take `amount` (possibly going into debt) and return seconds to wait"""
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+class RateLimiter:
+    """Thread-safe limiter combining request and token buckets"""
+
+    def __init__(self, requests_per_minute=DEFAULT_RPM, tokens_per_minute=DEFAULT_TPM):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.pause_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until one request using `tokens` tokens may be sent"""
+        with self.lock:
+            now = time.monotonic()
+            wait = max(self.requests.reserve(1, now),
+                       self.tokens.reserve(tokens, now),
+                       self.pause_until - now)
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop all callers for `seconds` (e.g. after a 429)"""
+        with self.lock:
+            self.pause_until = max(self.pause_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers):
+        """Adapt bucket sizes and pauses to anthropic-ratelimit-* headers"""
+        now = time.monotonic()
+        with self.lock:
+            for kind, bucket in (('requests', self.requests), ('tokens', self.tokens)):
+                limit = _to_number(headers.get(f'anthropic-ratelimit-{kind}-limit'))
+                if limit and limit != bucket.capacity:
+                    bucket.resize(limit, now)
+
+                remaining = _to_number(headers.get(f'anthropic-ratelimit-{kind}-remaining'))
+                reset = parse_reset(headers.get(f'anthropic-ratelimit-{kind}-reset'))
+                if remaining is not None and remaining <= 0 and reset:
+                    self.pause_until = max(self.pause_until, now + reset)
+
+def _to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_reset(value):
+    """Seconds until an RFC 3339 reset timestamp, or None"""
+    if not value:
+        return None
+    try:
+        reset_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    seconds = _to_number(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def count_retry(reason):
+    with _retry_lock:
+        retry_counts[reason] = retry_counts.get(reason, 0) + 1
+
+def request_with_retry(send, limiter, tokens=1, max_retries=MAX_RETRIES, validate=None):
+    """Call send() under the limiter, retrying throttled/failed requests.
+
+    validate(response) checks a 200's body (e.g. that it parses); a 200 that
+    fails it is retried like a 5xx. Returns the last response (which may still
+    be an error once retries run out); connection errors are re-raised after the
+    final attempt.
+    """
+    for attempt in range(max_retries + 1):
+        limiter.acquire(tokens)
+        try:
+            response = send()
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff_delay(attempt)
+            count_retry(type(e).__name__)
+            print(f"retry({type(e).__name__}, {delay:.1f}s)...", end=" ", flush=True)
+            time.sleep(delay)
+            continue
+
+        limiter.update_from_headers(response.headers)
+        malformed = response.status_code == 200 and validate is not None and not validate(response)
+        if (response.status_code not in RETRYABLE_STATUS and not malformed) or attempt == max_retries:
+            return response
+
+        retry_after = parse_retry_after(response.headers.get('retry-after'))
+        delay = retry_after if retry_after is not None else backoff_delay(attempt)
+        # Jitter so parallel workers don't all come back at the same instant
+        delay += random.uniform(0, 0.5)
+        if response.status_code == 429:
+            limiter.pause(delay)
+        reason = 'malformed' if malformed else response.status_code
+        count_retry(reason)
+        print(f"retry({reason}, {delay:.1f}s)...", end=" ", flush=True)
+        time.sleep(delay)
+
+class LatencyTracker:
+    """Recent response times per endpoint"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds):
+        with self.lock:
+            self.samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, endpoint, q, min_samples=HEDGE_MIN_SAMPLES):
+        """Latency at quantile q (0-1), or None until min_samples responses were seen"""
+        with self.lock:
+            samples = sorted(self.samples.get(endpoint, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+class Hedger:
+    """Sends a duplicate of slow requests and returns whichever response arrives first.
+
+    At most max_in_flight duplicates run at once; past that, slow requests are
+    simply waited for. The losing request is left to finish in the background.
+    The worker pool grows with the number of unfinished requests, so a request
+    never waits in a queue (which would count against its hedge delay).
+    """
+
+    def __init__(self, max_in_flight=HEDGE_MAX_IN_FLIGHT, percentile=HEDGE_PERCENTILE):
+        self.tracker = LatencyTracker()
+        self.percentile = percentile
+        self.slots = threading.BoundedSemaphore(max_in_flight) if max_in_flight > 0 else None
+        self.executor = None
+        self.workers = 0
+        self.running = 0
+        self.lock = threading.Lock()
+        self.counts = {'hedged': 0, 'won': 0}
+
+    def _submit(self, fn, *args):
+        """Run fn on a free worker, replacing the pool with a larger one when it's full"""
+        with self.lock:
+            self.running += 1
+            if self.executor is None or self.running > self.workers:
+                # Work already on the old pool keeps its threads until it finishes
+                if self.executor is not None:
+                    self.executor.shutdown(wait=False)
+                self.workers = max(2 * self.workers, self.running, 16)
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hedge')
+            future = self.executor.submit(fn, *args)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        with self.lock:
+            self.running -= 1
+
+    def _timed(self, endpoint, send):
+        start = time.monotonic()
+        response = send()
+        self.tracker.record(endpoint, time.monotonic() - start)
+        return response
+
+    def send(self, endpoint, send, before_hedge=None):
+        """Call send() for a request to `endpoint`, hedging it if it runs past the p95.
+
+        before_hedge() runs before the duplicate goes out (e.g. to take a rate
+        limiter slot). Errors and retryable responses only win if the other
+        request fails too.
+        """
+        delay = self.tracker.percentile(endpoint, self.percentile) if self.slots else None
+        if delay is None:
+            return self._timed(endpoint, send)
+
+        primary = self._submit(self._timed, endpoint, send)
+        try:
+            return primary.result(timeout=delay)
+        except FuturesTimeout:
+            pass
+        if not self.slots.acquire(blocking=False):
+            return primary.result()
+
+        def hedge():
+            try:
+                if before_hedge:
+                    before_hedge()
+                return self._timed(endpoint, send)
+            finally:
+                self.slots.release()
+
+        duplicate = self._submit(hedge)
+        with self.lock:
+            self.counts['hedged'] += 1
+
+        pending = {primary, duplicate}
+        last = primary
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                last = future
+                if future.exception() is None and future.result().status_code not in RETRYABLE_STATUS:
+                    if future is duplicate:
+                        with self.lock:
+                            self.counts['won'] += 1
+                    return future.result()
+        return last.result()
@@ -0,0 +1,208 @@
+"""
+Persistent response cache for Ad Infinitum API calls.
+Stores successful LLM and dictionary responses in SQLite, keyed by a hash of
+endpoint + request payload, so re-runs after a crash or a parser fix are free.
+
+Configure with environment variables:
+    AD_CACHE         readwrite (default) | readonly | offline | off
+    AD_CACHE_TTL     max age in seconds (default: never expires)
+    AD_CACHE_MAX_MB  size cap before least-recently-used entries are evicted (default 200)
+
+Maintenance:
+    py response_cache.py stats
+    py response_cache.py purge     # drop expired entries and enforce the size cap
+    py response_cache.py clear
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.join(script_dir, 'data/response_cache.sqlite')
+
+MODES = ('readwrite', 'readonly', 'offline', 'off')
+
+# Check the size cap every N writes rather than on every put
+EVICT_CHECK_EVERY = 100
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a response is not cached"""
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response built from a cache hit"""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+        self.headers = {}
+        self.from_cache = True
+
+    def json(self):
+        return json.loads(self.text)
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_PATH, mode='readwrite', ttl=None, max_bytes=200 * 1024 * 1024):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode: {mode} (expected one of {', '.join(MODES)})")
+        self.path = path
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+
+        if mode != 'off':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    body TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+            self.conn.commit()
+
+    @staticmethod
+    def make_key(endpoint, payload, variant=0):
+        """Content hash of endpoint + canonical payload (+ variant for deliberate re-samples)"""
+        canonical = json.dumps({'endpoint': endpoint, 'payload': payload, 'variant': variant},
+                               sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return a CachedResponse, or None on a miss (CacheMiss in offline mode)"""
+        if self.conn is None:
+            return None
+
+        with self.lock:
+            row = self.conn.execute("SELECT status, body, created FROM responses WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row and self.ttl is not None and now - row[2] > self.ttl:
+                row = None
+            if row:
+                self.hits += 1
+                if self.mode == 'readwrite':
+                    self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                    self.conn.commit()
+                return CachedResponse(row[0], row[1])
+            self.misses += 1
+
+        if self.mode == 'offline':
+            raise CacheMiss(key)
+        return None
+
+    def put(self, key, status, body):
+        """Store a response body (no-op unless the cache is writable)"""
+        if self.conn is None or self.mode != 'readwrite':
+            return
+
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, status, body, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, status, body, len(body.encode('utf-8')), now, now))
+            self.conn.commit()
+            self.writes += 1
+            if self.writes % EVICT_CHECK_EVERY == 0:
+                self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then least-recently-used ones until under the size cap"""
+        if self.ttl is not None:
+            self.conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            # Free down to 90% of the cap so we don't evict on every write
+            excess = total - int(self.max_bytes * 0.9)
+            freed = 0
+            victims = []
+            for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+                if freed >= excess:
+                    break
+                victims.append((key,))
+                freed += size
+            self.conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.conn.commit()
+
+    def purge(self):
+        with self.lock:
+            self._evict()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+    def stats(self):
+        with self.lock:
+            count, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {'entries': count, 'bytes': size, 'hits': self.hits, 'misses': self.misses}
+
+def cached_request(cache, endpoint, payload, send, cache_status=(200,), variant=0, validate=None):
+    """Serve `payload` from the cache, or call send() and store cacheable responses.
+
+    validate(response), if given, must pass for a response to be stored or
+    served, so a truncated body is neither cached nor replayed from an older entry.
+    """
+    key = cache.make_key(endpoint, payload, variant)
+    hit = cache.get(key)
+    if hit is not None and (validate is None or validate(hit)):
+        return hit
+
+    response = send()
+    if response.status_code in cache_status and (validate is None or validate(response)):
+        cache.put(key, response.status_code, response.text)
+    return response
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Process-wide cache configured from the AD_CACHE* environment variables"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            ttl = os.environ.get('AD_CACHE_TTL')
+            _cache = ResponseCache(
+                path=os.environ.get('AD_CACHE_PATH', DEFAULT_PATH),
+                mode=os.environ.get('AD_CACHE', 'readwrite'),
+                ttl=float(ttl) if ttl else None,
+                max_bytes=int(float(os.environ.get('AD_CACHE_MAX_MB', 200)) * 1024 * 1024))
+        return _cache
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+    cache = get_cache()
+    if cache.conn is None:
+        print("Cache is disabled (AD_CACHE=off)")
+        return
+
+    if command == 'purge':
+        cache.purge()
+    elif command == 'clear':
+        cache.clear()
+    elif command != 'stats':
+        print(f"Unknown command: {command} (expected stats, purge or clear)")
+        sys.exit(1)
+
+    stats = cache.stats()
+    print(f"Cache: {cache.path}")
+    print(f"  Entries: {stats['entries']}")
+    print(f"  Size: {stats['bytes'] / 1024 / 1024:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Definition normalization for Ad Infinitum.
+One TL;DR rule (1-3 key words of a definition) shared by process_vocab and
+generate_passages. Stop words, starter phrases and the word pattern are
+compiled once at import; tldr_many() handles a whole corpus, optionally
+spread over a process pool.
+
+Re-derive every TL;DR from the current definitions:
+    py text_normalize.py --dry-run
+    py text_normalize.py --processes 4
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Fix Unicode encoding for Windows console
+sys.stdout.reconfigure(encoding='utf-8')
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+words_path = os.path.join(script_dir, 'data/words_processed.json')
+
+# Common words to skip
+STOP_WORDS = frozenset({
+    'a', 'an', 'the', 'to', 'of', 'in', 'on', 'at', 'for', 'with', 'by',
+    'from', 'as', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+    'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
+    'should', 'may', 'might', 'must', 'shall', 'can', 'that', 'which',
+    'who', 'whom', 'whose', 'this', 'these', 'those', 'it', 'its',
+    'or', 'and', 'but', 'if', 'then', 'than', 'so', 'very', 'just',
+    'also', 'only', 'even', 'more', 'most', 'other', 'some', 'any',
+    'no', 'not', 'such', 'what', 'when', 'where', 'how', 'why',
+    'all', 'each', 'every', 'both', 'few', 'many', 'much', 'own',
+    'same', 'something', 'someone', 'anything', 'nothing', 'one',
+    'two', 'first', 'into', 'about', 'over', 'after', 'before',
+    'between', 'under', 'again', 'further', 'once', 'here', 'there',
+    'because', 'while', 'although', 'though', 'until', 'unless',
+    'whether', 'since', 'during', 'within', 'without', 'through',
+    'act', 'make', 'cause', 'give', 'take', 'get', 'put', 'become',
+    'come', 'go', 'see', 'show', 'let', 'begin', 'seem', 'help',
+    'try', 'leave', 'call', 'need', 'feel', 'high', 'long', 'way',
+    'thing', 'things', 'manner', 'state', 'quality', 'process',
+    'relating', 'characterized', 'involving', 'marked', 'having'
+})
+
+# Starting phrases removed before picking words, checked in this order
+STARTERS = (
+    'the act of', 'the process of', 'the state of', 'the quality of',
+    'to be', 'to make', 'to cause', 'to give', 'relating to',
+    'characterized by', 'having the quality of', 'in a manner that',
+    'the ability to', 'a person who', 'one who', 'someone who',
+    'something that', 'a thing that', 'an act of'
+)
+
+WORD = re.compile(r'[a-zA-Z]+')
+
+TLDR_WORDS = 3
+
+# Below this many definitions a process pool costs more than it saves
+POOL_THRESHOLD = 20000
+
+def generate_tldr(definition):
+    """Generate a 1-3 word TL;DR from a definition"""
+    if not definition:
+        return ''
+
+    clean_def = definition.lower().strip()
+    for starter in STARTERS:
+        if clean_def.startswith(starter):
+            clean_def = clean_def[len(starter):].strip()
+
+    words = WORD.findall(clean_def)
+
+    # Meaningful words: not stop words, at least 3 chars
+    meaningful = [w for w in words if w not in STOP_WORDS and len(w) >= 3][:TLDR_WORDS]
+
+    # If we got nothing, just take the first meaningful-looking word
+    if not meaningful:
+        meaningful = [w for w in words if len(w) >= 3][:1]
+
+    return ' '.join(meaningful).capitalize()
+
+def tldr_many(definitions, processes=None):
+    """generate_tldr for every definition, in order.
+
+    With processes > 1 and a large enough corpus, the work is split across a
+    process pool in large chunks.
+    """
+    definitions = list(definitions)
+    if not processes or processes <= 1 or len(definitions) < POOL_THRESHOLD:
+        return [generate_tldr(d) for d in definitions]
+    chunksize = max(1, len(definitions) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(generate_tldr, definitions, chunksize=chunksize))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--input', default=words_path, help='words file to re-derive')
+    parser.add_argument('--processes', type=int, default=1, help='worker processes for large corpora')
+    parser.add_argument('--dry-run', action='store_true', help='report changes without writing')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    with open(args.input, 'r', encoding='utf-8') as f:
+        words = json.load(f)
+
+    start = time.perf_counter()
+    tldrs = tldr_many((w.get('definition', '') for w in words), args.processes)
+    elapsed = time.perf_counter() - start
+
+    # An empty result (no definition) never replaces an existing TL;DR
+    changed = [(w, tldr) for w, tldr in zip(words, tldrs) if tldr and tldr != w.get('tldr')]
+    print(f"Derived {len(tldrs)} TL;DRs in {elapsed * 1000:.0f} ms: {len(changed)} changed")
+    for w, tldr in changed[:10]:
+        print(f"  {w.get('word', '')}: {w.get('tldr', '')!r} -> {tldr!r}")
+
+    if not args.dry_run and changed:
+        from journal import atomic_write_json
+
+        for w, tldr in changed:
+            w['tldr'] = tldr
+        atomic_write_json(args.input, words, ensure_ascii=False, indent=2)
+        print(f"Saved to: {args.input}")
+
+if __name__ == "__main__":
+    main()
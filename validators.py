@@ -0,0 +1,186 @@
+"""
+Local validation for generated Ad Infinitum content.
+Checks model output before it is accepted so bad items can be re-queued
+immediately instead of being found later by hand.
+"""
+
+import json
+import re
+
+from word_matcher import count_occurrences, vocabulary_matcher
+
+# Length limits the prompts ask for
+EXAMPLE_MIN_WORDS = 15
+EXAMPLE_MAX_WORDS = 25
+PASSAGE_MIN_SENTENCES = 2
+PASSAGE_MAX_SENTENCES = 4
+DEFINITION_MAX_WORDS = 40
+TLDR_MAX_WORDS = 3
+
+PARTS_OF_SPEECH = {
+    'noun', 'verb', 'adjective', 'adverb', 'pronoun', 'preposition', 'conjunction',
+    'interjection', 'phrase', 'phrasal verb', 'idiom'
+}
+
+HANGUL = re.compile(r'[\uac00-\ud7a3]')
+
+# Template sentences left by earlier bulk fills; an example containing one is replaced
+PLACEHOLDER_PHRASES = (
+    "The student demonstrated",
+    "It is important to understand",
+    "Many scholars consider",
+    "The concept of",
+    "She showed great"
+)
+
+# Consecutive definition words an example may not repeat
+ECHO_WORDS = 5
+
+def count_word_occurrences(word, text):
+    """Count how many times word appears in text (whole words, any inflection: "abhorred" counts for "abhor")"""
+    return count_occurrences(word, text)
+
+def count_word_occurrences_many(pairs):
+    """count_word_occurrences for many (word, text) pairs, scanning each text once"""
+    return vocabulary_matcher().count_many(pairs)
+
+def word_count(text):
+    return len(re.findall(r"[A-Za-z0-9'-]+", text))
+
+def sentence_count(text):
+    return len([s for s in re.split(r'(?<=[.!?])\s+', text.strip()) if s])
+
+def is_placeholder_example(example):
+    return any(phrase in example for phrase in PLACEHOLDER_PHRASES)
+
+def echoes_definition(definition, text):
+    """Whether text repeats the definition: ECHO_WORDS consecutive words of it
+    (or all of it, for definitions of 3-4 words)"""
+    definition_words = re.findall(r"[a-z0-9'-]+", definition.lower())
+    n = min(ECHO_WORDS, len(definition_words))
+    if n < 3:
+        return False
+    runs = {tuple(definition_words[k:k + n]) for k in range(len(definition_words) - n + 1)}
+    text_words = re.findall(r"[a-z0-9'-]+", text.lower())
+    return any(tuple(text_words[k:k + n]) in runs for k in range(len(text_words) - n + 1))
+
+def validate_example(word, example, definition=''):
+    """Return None if the example sentence is acceptable, else a short reason"""
+    if not example or not example.strip():
+        return "empty"
+    if is_placeholder_example(example):
+        return "placeholder"
+    occurrences = count_word_occurrences(word, example)
+    if occurrences != 1:
+        return f"word x{occurrences}"
+    words = word_count(example)
+    if not EXAMPLE_MIN_WORDS <= words <= EXAMPLE_MAX_WORDS:
+        return f"{words} words"
+    if definition and echoes_definition(definition, example):
+        return "echoes definition"
+    return None
+
+def validate_passage(word, passage):
+    """Return None if the passage is acceptable, else a short reason"""
+    if not passage or not passage.strip():
+        return "empty"
+    occurrences = count_word_occurrences(word, passage)
+    if occurrences != 1:
+        return f"word x{occurrences}"
+    sentences = sentence_count(passage)
+    if not PASSAGE_MIN_SENTENCES <= sentences <= PASSAGE_MAX_SENTENCES:
+        return f"{sentences} sentences"
+    return None
+
+def passage_violation(word, partial):
+    """Check a passage while it is still being generated.
+
+    Returns a reason once the text can no longer become a valid passage (the word
+    already used twice, or too many finished sentences), else None. The trailing
+    token is ignored since it may still grow into a different word.
+    """
+    settled = re.sub(r"[\w'-]+$", '', partial)
+    occurrences = count_word_occurrences(word, settled)
+    if occurrences > 1:
+        return f"word x{occurrences}"
+    finished = len(re.findall(r'[.!?](?=\s)', settled))
+    if finished > PASSAGE_MAX_SENTENCES:
+        return f"{finished}+ sentences"
+    return None
+
+def validate_definition(word, definition):
+    if not definition or not definition.strip():
+        return "empty"
+    if definition.startswith("(Definition needed"):
+        return "placeholder"
+    words = word_count(definition)
+    if words > DEFINITION_MAX_WORDS:
+        return f"{words} words"
+    return None
+
+def validate_part_of_speech(word, part_of_speech):
+    if not part_of_speech or part_of_speech.strip().lower() not in PARTS_OF_SPEECH:
+        return f"unknown part of speech {part_of_speech!r}"
+    return None
+
+def validate_tldr(word, tldr):
+    if not tldr or not tldr.strip():
+        return "empty"
+    words = word_count(tldr)
+    if words > TLDR_MAX_WORDS:
+        return f"{words} words"
+    return None
+
+def validate_korean(word, korean):
+    if not korean or not HANGUL.search(korean):
+        return "no Hangul"
+    if len(korean) > 40:
+        return "too long"
+    return None
+
+def parse_json_object(text):
+    """Extract the JSON object from a model response (tolerating prose or code fences around it)"""
+    start = text.find('{')
+    end = text.rfind('}')
+    if start == -1 or end <= start:
+        return None
+    try:
+        obj = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+def parse_json_array(text):
+    """Extract the JSON array from a model response (tolerating prose or code fences around it)"""
+    start = text.find('[')
+    end = text.rfind(']')
+    if start == -1 or end <= start:
+        return None
+    try:
+        items = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return items if isinstance(items, list) else None
+
+def match_items(requested_words, items, key):
+    """Map each requested word to the `key` field of its returned item.
+
+    Items are matched by their "word" field (case-insensitively); anything
+    missing, duplicated or malformed is simply absent from the result.
+    """
+    wanted = {w.casefold(): w for w in requested_words}
+    matched = {}
+    seen = set()
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get('word'), str) or not isinstance(item.get(key), str):
+            continue
+        folded = item['word'].strip().casefold()
+        if folded not in wanted:
+            continue
+        if folded in seen:
+            # The same word answered twice: trust neither
+            matched.pop(wanted[folded], None)
+            continue
+        seen.add(folded)
+        matched[wanted[folded]] = item
+    return matched
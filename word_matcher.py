@@ -0,0 +1,272 @@
+"""
+Inflection-aware word matching for Ad Infinitum.
+Compiles vocabulary words, their inflected forms (the applySuffix rules in
+js/app.js, plus the spellings those rules miss) and phrasal-verb forms
+("accounted for") into one token-level Aho-Corasick automaton. Validators count
+occurrences through one matcher shared by the process, compiled for the whole
+vocabulary in words_processed.json; count_many checks a batch of texts with one
+pass over each.
+
+Show the forms a word is matched by:
+    py word_matcher.py abhor "account for"
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+from collections import deque
+from functools import lru_cache
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+vocabulary_path = os.path.join(script_dir, 'data/words_processed.json')
+
+SUFFIXES = ('s', 'ed', 'ing', 'ly', 'er', 'est')
+
+# Particles, prepositions and articles inside phrases never take a suffix
+FUNCTION_WORDS = {
+    'a', 'an', 'the', 'of', 'for', 'to', 'in', 'on', 'at', 'by', 'up', 'out', 'off', 'with',
+    'about', 'over', 'away', 'down', 'back', 'into', 'onto', 'upon', 'through', 'from', 'as', 'and', 'or'
+}
+
+TOKEN = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+
+def tokenize(text):
+    """Case-folded word tokens (hyphenated words and contractions stay whole)"""
+    return TOKEN.findall(text.casefold().replace('’', "'"))
+
+def match_key(word):
+    """Key a word is matched under: its tokens, so spacing/case variants are the same word"""
+    return ' '.join(tokenize(word))
+
+def apply_suffix(word, suffix):
+    """Python port of applySuffix in js/app.js"""
+    if not suffix:
+        return word
+    lower = word.lower()
+
+    if suffix == 'ing':
+        if lower.endswith('ie'):
+            return word[:-2] + 'ying'
+        if lower.endswith('e') and not lower.endswith('ee'):
+            return word[:-1] + 'ing'
+        if re.search(r'[aeiou][bcdfghjklmnpqrstvwxyz]$', lower) and len(lower) <= 6:
+            # Double final consonant for short words (run -> running)
+            return word + word[-1] + 'ing'
+        return word + 'ing'
+
+    if suffix == 'ed':
+        if lower.endswith('e'):
+            return word + 'd'
+        if lower.endswith('y') and not re.search(r'[aeiou]y$', lower):
+            return word[:-1] + 'ied'
+        if re.search(r'[aeiou][bcdfghjklmnpqrstvwxyz]$', lower) and len(lower) <= 6:
+            return word + word[-1] + 'ed'
+        return word + 'ed'
+
+    if suffix == 's':
+        if re.search(r'[sxz]$', lower) or re.search(r'[cs]h$', lower):
+            return word + 'es'
+        if lower.endswith('y') and not re.search(r'[aeiou]y$', lower):
+            return word[:-1] + 'ies'
+        return word + 's'
+
+    if suffix in ('er', 'est'):
+        if lower.endswith('e'):
+            return word + suffix[1:]
+        if lower.endswith('y') and not re.search(r'[aeiou]y$', lower):
+            return word[:-1] + 'i' + suffix
+        return word + suffix
+
+    if suffix == 'ly':
+        if lower.endswith('le'):
+            return word[:-2] + 'ly'
+        if lower.endswith('y'):
+            return word[:-1] + 'ily'
+        return word + 'ly'
+
+    return word + suffix
+
+def token_forms(token):
+    """Every spelling of one token we treat as the same word.
+
+    applySuffix picks a single spelling per suffix (e.g. it only doubles the
+    final consonant of short words); matching is more forgiving and accepts the
+    plain, doubled and e-dropped spellings too, since forms that aren't real
+    words never appear in text anyway.
+    """
+    forms = {token, token + "'s"}
+    for suffix in SUFFIXES:
+        forms.add(apply_suffix(token, suffix))
+        forms.add(token + suffix)
+    if token.endswith('e'):
+        forms.update(token[:-1] + suffix for suffix in ('ed', 'ing', 'er', 'est'))
+    if re.search(r'[aeiou][bcdfghjklmnpqrstvwxyz]$', token):
+        forms.update(token + token[-1] + suffix for suffix in ('ed', 'ing', 'er', 'est'))
+    if re.search(r'[^aeiou]y$', token):
+        forms.update(token[:-1] + suffix for suffix in ('ied', 'ies', 'ier', 'iest', 'ily'))
+    if re.search(r'([sxz]|[cs]h)$', token):
+        forms.add(token + 'es')
+    return forms
+
+def inflected_forms(word):
+    """Token tuples that count as an occurrence of `word`.
+
+    Single words get all token_forms. Phrases inflect either their first token
+    (phrasal verbs: "accounted for") or their last ("a predicaments"-style noun
+    phrases), unless that token is a function word ("for", "of").
+    """
+    tokens = tuple(tokenize(word))
+    if not tokens:
+        return set()
+    forms = {tokens}
+    if len(tokens) == 1:
+        forms.update((form,) for form in token_forms(tokens[0]))
+        return forms
+    if tokens[0] not in FUNCTION_WORDS:
+        forms.update((form,) + tokens[1:] for form in token_forms(tokens[0]))
+    if tokens[-1] not in FUNCTION_WORDS:
+        forms.update(tokens[:-1] + (form,) for form in token_forms(tokens[-1]))
+    return forms
+
+class TokenAutomaton:
+    """Aho-Corasick automaton whose alphabet is word tokens, so matches are always whole words"""
+
+    def __init__(self, patterns):
+        """patterns: iterable of (token tuple, entry id)"""
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+        for tokens, entry in patterns:
+            state = 0
+            for token in tokens:
+                next_state = self.goto[state].get(token)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][token] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = next_state
+            self.out[state].append((len(tokens), entry))
+
+        # Breadth-first fail links; each state inherits the outputs of its fail state
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(token, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def outputs(self, tokens):
+        """Walk a token list; returns [(end, [(length, entry), ...])] for positions where
+        matches end, each list longest match first"""
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        hits = []
+        for pos, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if out[state]:
+                hits.append((pos, out[state]))
+        return hits
+
+class WordMatcher:
+    """Inflection-aware matcher for a fixed vocabulary, compiled once"""
+
+    def __init__(self, words):
+        self.keys = set()
+        # A form can belong to several entries ("contented" is both a word and content+ed)
+        patterns = set()
+        for word in words:
+            key = match_key(word)
+            self.keys.add(key)
+            patterns.update((form, key) for form in inflected_forms(word))
+        self.automaton = TokenAutomaton(patterns)
+
+    def outputs(self, tokens):
+        return self.automaton.outputs(tokens)
+
+    def count_tokens(self, key, tokens):
+        """Occurrences of the word keyed `key` in a token list (nested matches count once)"""
+        count = 0
+        covered = len(tokens)
+        for end, matches in reversed(self.automaton.outputs(tokens)):
+            for length, entry in matches:
+                start = end - length + 1
+                if entry == key and start < covered:
+                    count += 1
+                    covered = start
+        return count
+
+    def count_all(self, tokens):
+        """{key: occurrences} for every vocabulary word in a token list, from one pass"""
+        counts = {}
+        covered = {}
+        for end, matches in reversed(self.automaton.outputs(tokens)):
+            for length, entry in matches:
+                start = end - length + 1
+                if start < covered.get(entry, len(tokens)):
+                    counts[entry] = counts.get(entry, 0) + 1
+                    covered[entry] = start
+        return counts
+
+    def count(self, word, text):
+        """Occurrences of `word` (any inflection) in text"""
+        key = match_key(word)
+        if key not in self.keys:
+            return matcher_for(word).count(word, text)
+        return self.count_tokens(key, tokenize(text))
+
+    def count_many(self, pairs):
+        """Batch version of count() for (word, text) pairs: each distinct text is
+        tokenized and scanned once, however many words are counted in it"""
+        scanned = {}
+        results = []
+        for word, text in pairs:
+            key = match_key(word)
+            if key not in self.keys:
+                results.append(matcher_for(word).count(word, text))
+                continue
+            if text not in scanned:
+                scanned[text] = self.count_all(tokenize(text))
+            results.append(scanned[text].get(key, 0))
+        return results
+
+@lru_cache(maxsize=8192)
+def matcher_for(word):
+    """Compiled single-word matcher for a word outside the shared vocabulary"""
+    return WordMatcher([word])
+
+_vocabulary = None
+_vocabulary_lock = threading.Lock()
+
+def vocabulary_matcher():
+    """Process-wide matcher for every word in words_processed.json, compiled on first use"""
+    global _vocabulary
+    with _vocabulary_lock:
+        if _vocabulary is None:
+            words = []
+            if os.path.exists(vocabulary_path):
+                with open(vocabulary_path, 'r', encoding='utf-8') as f:
+                    words = [entry.get('word', '') for entry in json.load(f)]
+            _vocabulary = WordMatcher(words)
+        return _vocabulary
+
+def count_occurrences(word, text):
+    return vocabulary_matcher().count(word, text)
+
+def main():
+    for word in sys.argv[1:]:
+        forms = sorted(' '.join(form) for form in inflected_forms(word))
+        print(f"{word}: {json.dumps(forms)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Indexed SQLite word store for Ad Infinitum.
+Holds every word's fields plus per-stage status, attempts, timestamps and
+content hashes, replacing the generation/passage progress JSON files.
+Words are keyed case-insensitively, so "Abide" and "abide" are one entry.
+
+    py word_store.py import    # load words_processed.json + legacy progress files
+    py word_store.py status    # per-stage counts
+    py word_store.py export    # write words_processed.json from the store
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.join(script_dir, 'data/words.db')
+words_path = os.path.join(script_dir, 'data/words_processed.json')
+
+WORD_FIELDS = ['word', 'level', 'definition', 'tldr', 'korean', 'partOfSpeech', 'example', 'passage']
+
+# Progress files written by the generators before the store existed
+LEGACY_PROGRESS = {
+    'examples': 'data/generation_progress.json',
+    'passages': 'data/passage_progress.json',
+    'fix': 'data/fix_passage_progress.json',
+}
+
+def normalize_key(word):
+    """Case-folded, whitespace-trimmed key for a word"""
+    return ' '.join(word.split()).casefold()
+
+def content_hash(fields):
+    """Stable hash of a dict of word fields"""
+    canonical = json.dumps(fields, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+class WordStore:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS words (
+                key TEXT PRIMARY KEY,
+                word TEXT NOT NULL,
+                position INTEGER,
+                level INTEGER,
+                definition TEXT,
+                tldr TEXT,
+                korean TEXT,
+                partOfSpeech TEXT,
+                example TEXT,
+                passage TEXT,
+                content_hash TEXT,
+                updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS stages (
+                key TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL,
+                content_hash TEXT,
+                PRIMARY KEY (key, stage)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_words_level ON words(level);
+            CREATE INDEX IF NOT EXISTS idx_words_position ON words(position);
+            CREATE INDEX IF NOT EXISTS idx_stages_stage_status ON stages(stage, status);
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # ---- words ----
+
+    def sync_words(self, words):
+        """Upsert the full word list (in order) in one transaction"""
+        now = time.time()
+        rows = []
+        for position, entry in enumerate(words):
+            fields = {name: entry.get(name, '') for name in WORD_FIELDS}
+            rows.append((normalize_key(fields['word']), fields['word'], position, fields['level'] or None,
+                         fields['definition'], fields['tldr'], fields['korean'], fields['partOfSpeech'],
+                         fields['example'], fields['passage'], content_hash(fields), now))
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO words (key, word, position, level, definition, tldr, korean, partOfSpeech,
+                                   example, passage, content_hash, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    word = excluded.word, position = excluded.position, level = excluded.level,
+                    definition = excluded.definition, tldr = excluded.tldr, korean = excluded.korean,
+                    partOfSpeech = excluded.partOfSpeech, example = excluded.example, passage = excluded.passage,
+                    updated_at = CASE WHEN words.content_hash = excluded.content_hash
+                                      THEN words.updated_at ELSE excluded.updated_at END,
+                    content_hash = excluded.content_hash
+            """, rows)
+
+    def export_words(self):
+        """All words as dicts in their original order"""
+        rows = self.conn.execute(f"SELECT {', '.join(WORD_FIELDS)} FROM words ORDER BY position")
+        return [{name: (row[name] if row[name] is not None else '') for name in WORD_FIELDS} for row in rows]
+
+    def words_needing(self, stage, level=None):
+        """Yield word rows that have not completed `stage` (optionally for one level)"""
+        sql = """
+            SELECT w.* FROM words w
+            LEFT JOIN stages s ON s.key = w.key AND s.stage = ? AND s.status = 'done'
+            WHERE s.key IS NULL"""
+        params = [stage]
+        if level is not None:
+            sql += " AND w.level = ?"
+            params.append(level)
+        sql += " ORDER BY w.position"
+        yield from self.conn.execute(sql, params)
+
+    # ---- stage status ----
+
+    def mark(self, stage, word, status='done', fields=None):
+        """Record an attempt at `stage` for `word`, saving any produced fields"""
+        key = normalize_key(word)
+        now = time.time()
+        fields = fields or {}
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO stages (key, stage, status, attempts, updated_at, content_hash)
+                VALUES (?, ?, ?, 1, ?, ?)
+                ON CONFLICT(key, stage) DO UPDATE SET
+                    status = excluded.status, attempts = stages.attempts + 1,
+                    updated_at = excluded.updated_at, content_hash = excluded.content_hash
+            """, (key, stage, status, now, content_hash(fields) if fields else None))
+
+            columns = [name for name in fields if name in WORD_FIELDS and name != 'word']
+            if columns:
+                assignments = ', '.join(f"{name} = ?" for name in columns)
+                self.conn.execute(f"UPDATE words SET {assignments}, updated_at = ? WHERE key = ?",
+                                  [fields[name] for name in columns] + [now, key])
+
+    def done_keys(self, stage):
+        """Keys of words that completed `stage`"""
+        rows = self.conn.execute("SELECT key FROM stages WHERE stage = ? AND status = 'done'", (stage,))
+        return {row['key'] for row in rows}
+
+    def keys_with_results(self, stages):
+        """Keys of words with a done or partial result from any of `stages`"""
+        marks = ', '.join('?' for _ in stages)
+        rows = self.conn.execute(f"SELECT DISTINCT key FROM stages WHERE stage IN ({marks}) "
+                                 f"AND status IN ('done', 'partial')", list(stages))
+        return {row['key'] for row in rows}
+
+    def is_done(self, stage, word):
+        row = self.conn.execute("SELECT 1 FROM stages WHERE key = ? AND stage = ? AND status = 'done'",
+                                (normalize_key(word), stage)).fetchone()
+        return row is not None
+
+    def stage_counts(self):
+        """{stage: {status: count}}"""
+        counts = {}
+        for row in self.conn.execute("SELECT stage, status, COUNT(*) AS n FROM stages GROUP BY stage, status"):
+            counts.setdefault(row['stage'], {})[row['status']] = row['n']
+        return counts
+
+    # ---- legacy progress files ----
+
+    def migrate_progress(self, stage, progress_path=None):
+        """One-time import of a legacy {'processed': [...]} progress file for `stage`"""
+        if progress_path is None:
+            progress_path = os.path.join(script_dir, LEGACY_PROGRESS[stage])
+        flag = f"migrated:{stage}"
+        if self.conn.execute("SELECT 1 FROM meta WHERE name = ?", (flag,)).fetchone():
+            return 0
+        processed = []
+        if os.path.exists(progress_path):
+            with open(progress_path, 'r', encoding='utf-8') as f:
+                processed = json.load(f).get('processed', [])
+
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("""
+                INSERT OR IGNORE INTO stages (key, stage, status, attempts, updated_at)
+                VALUES (?, ?, 'done', 1, ?)
+            """, [(normalize_key(word), stage, now) for word in processed])
+            self.conn.execute("INSERT INTO meta (name, value) VALUES (?, ?)", (flag, progress_path))
+        return len(processed)
+
+def open_stage(stage, words):
+    """Open the store for a generator: sync words, migrate legacy progress, return (store, done_keys)"""
+    store = WordStore()
+    store.sync_words(words)
+    # Stages newer than the progress files have nothing to migrate
+    migrated = store.migrate_progress(stage) if stage in LEGACY_PROGRESS else 0
+    if migrated:
+        print(f"Imported {migrated} entries from {LEGACY_PROGRESS[stage]}")
+    return store, store.done_keys(stage)
+
+def entries_needing(store, words, stage, level=None):
+    """Yield (index, entry) for the words in `words` that haven't completed `stage`.
+
+    Selected by words_needing, so only the pending rows are read; rows for words
+    no longer in the list are skipped.
+    """
+    for row in store.words_needing(stage, level):
+        i = row['position']
+        if i < len(words) and normalize_key(words[i].get('word', '')) == row['key']:
+            yield i, words[i]
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    store = WordStore()
+
+    if command == 'import':
+        with open(words_path, 'r', encoding='utf-8') as f:
+            words = json.load(f)
+        store.sync_words(words)
+        print(f"Synced {len(words)} words")
+        for stage in LEGACY_PROGRESS:
+            migrated = store.migrate_progress(stage)
+            if migrated:
+                print(f"  {stage}: imported {migrated} entries")
+    elif command == 'export':
+        from journal import atomic_write_json
+        words = store.export_words()
+        atomic_write_json(words_path, words, ensure_ascii=False, indent=2)
+        print(f"Exported {len(words)} words to {words_path}")
+    elif command != 'status':
+        print(f"Unknown command: {command} (expected import, status or export)")
+        sys.exit(1)
+
+    total = store.conn.execute("SELECT COUNT(*) FROM words").fetchone()[0]
+    print(f"Words: {total}")
+    for stage, counts in sorted(store.stage_counts().items()):
+        summary = ', '.join(f"{status} {n}" for status, n in sorted(counts.items()))
+        print(f"  {stage}: {summary}")
+
+if __name__ == "__main__":
+    main()